@@ -1,6 +1,7 @@
 # heso/settings.py
 
 from pathlib import Path
+import datetime
 import os
 import dj_database_url
 
@@ -46,6 +47,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Counts the SQL queries of every request, see heso/utils/query_budget.py
+    'heso.utils.query_budget.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -105,6 +108,37 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# CACHES configures the cache used for serialized schedule payloads.
+# Payloads are keyed by the schedule version, which is kept in the database, so
+# invalidations reach every worker whatever the backend. The local-memory cache
+# is per process; setting REDIS_URL (with the redis package installed) shares the
+# payloads between workers instead.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+# How long (in seconds) a serialized schedule payload may stay cached.
+# Payloads are invalidated on every change anyway, see scheduling/signals.py.
+SCHEDULE_CACHE_TIMEOUT = 60 * 60
+
+
+# Per-request SQL query budget, see heso/utils/query_budget.py.
+# Requests running more queries than their view's budget (declared with
+# @query_budget, or QUERY_BUDGET_DEFAULT otherwise) are logged.
+QUERY_BUDGET_DEFAULT = 30
+# When True, exceeding a declared budget raises instead of logging.
+QUERY_BUDGET_ENFORCE = False
+
+
 # Internationalization settings
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
@@ -121,6 +155,70 @@ STATICFILES_DIRS = [
 # The absolute path to the directory where collectstatic will
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# Uploaded files (lesson materials) configuration
+# MEDIA_ROOT is the directory where uploaded files are kept by default.
+MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_URL = "media/"
+# STORAGES configures the file storage backends. Lesson materials use their own
+# "materials" alias, so they can be moved to another backend (e.g. S3 through
+# django-storages) without touching the rest of the project. Material files are
+# not served directly under MEDIA_URL.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "materials": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": MEDIA_ROOT / "private"},
+    },
+}
+
+# Lesson materials are streamed to temporary files on disk, never held in memory, and
+# checked against MATERIAL_UPLOAD_MAX_SIZE and MATERIAL_UPLOAD_EXTENSIONS while they
+# stream in. Only the views taking materials install that upload handler (see
+# scheduling/uploads.py); other uploads use Django's default FILE_UPLOAD_HANDLERS.
+MATERIAL_UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+# Largest chunk accepted by the resumable upload API, and the default chunk size
+MATERIAL_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Unfinished resumable uploads idle for longer than this are removed by the
+# cleanup_upload_sessions command
+MATERIAL_UPLOAD_SESSION_TTL = datetime.timedelta(days=1)
+MATERIAL_UPLOAD_EXTENSIONS = [
+    # Documents and books
+    ".pdf", ".doc", ".docx", ".odt", ".rtf", ".txt", ".md", ".epub", ".mobi",
+    ".ppt", ".pptx", ".odp", ".xls", ".xlsx", ".ods", ".csv",
+    # Images
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg",
+    # Audio and video
+    ".mp3", ".wav", ".ogg", ".m4a", ".mp4", ".m4v", ".mov", ".webm", ".avi", ".mkv",
+    # Archives
+    ".zip",
+]
+
+# Material files are compressed in storage when a probe of their first bytes shrinks
+# to MATERIAL_COMPRESSION_RATIO of their size or less, with whichever of the available
+# MATERIAL_COMPRESSION_CODECS does best ("zstd" needs the optional zstandard package).
+# An empty list turns compression off. See scheduling/compression.py.
+MATERIAL_COMPRESSION_CODECS = ["zstd", "zlib"]
+MATERIAL_COMPRESSION_RATIO = 0.8
+
+# Server-side directory imported by the "Import materials" admin action on classes,
+# laid out as <class title>/<lesson title or YYYY-MM-DD>/<files>. The action queues
+# the import for "import_materials --queued"; the command also takes any directory
+# or CSV manifest.
+MATERIAL_IMPORT_ROOT = MEDIA_ROOT / "imports"
+
+# MATERIALS_SENDFILE hands material downloads over to the front-end server once the
+# permission check is done: "x-accel-redirect" (nginx) or "x-sendfile" (Apache,
+# lighttpd, which need a filesystem storage). Unset, Django streams the file itself.
+# With nginx, MATERIALS_SENDFILE_PREFIX is the "internal" location aliased to the
+# materials storage directory.
+MATERIALS_SENDFILE = os.environ.get("MATERIALS_SENDFILE") or None
+MATERIALS_SENDFILE_PREFIX = "/protected/"
+
 # Default primary key field type for new models
 # BigAutoField is a 64-bit integer, much like AutoField except it's guaranteed to
 # fit numbers from 1 to 9223372036854775807.
@@ -9,3 +9,12 @@ DATABASES = {
         "NAME": BASE_DIR / "db_test.sqlite3",  # noqa:
     }
 }
+
+# Keep uploaded test materials in memory instead of on disk
+STORAGES = {
+    **STORAGES,  # noqa:
+    "materials": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
+
+# Fail the tests when a view runs more queries than its declared budget
+QUERY_BUDGET_ENFORCE = True
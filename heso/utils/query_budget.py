@@ -0,0 +1,92 @@
+# heso/utils/query_budget.py
+
+"""
+Per-request SQL query budget: QueryBudgetMiddleware counts the queries of each
+request and logs, or with QUERY_BUDGET_ENFORCE raises, when a view exceeds it.
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("heso.query_budget")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view runs more queries than its declared budget."""
+
+
+def query_budget(max_queries):
+    """
+    Declare the maximum number of SQL queries a view may run per request. A view
+    can hold one of its paths to a tighter budget by setting request.query_budget.
+
+    Args:
+        max_queries: The number of queries, including session and user lookups.
+
+    Returns:
+        The decorator, which marks the view and returns it unchanged.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting queries and their total duration.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware counting the queries of every request and checking them against
+    the view's budget. Queries run while a streaming response is consumed are
+    not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+
+        declared = getattr(request, "query_budget", None)
+        budget = declared if declared is not None else settings.QUERY_BUDGET_DEFAULT
+        if counter.count > budget:
+            message = (
+                f"{request.method} {request.path} ran {counter.count} queries "
+                f"({counter.duration * 1000:.1f} ms), over its budget of {budget}."
+            )
+            if declared is not None and settings.QUERY_BUDGET_ENFORCE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        if settings.DEBUG:
+            response["X-DB-Query-Count"] = str(counter.count)
+            response["X-DB-Time"] = f"{counter.duration * 1000:.1f}ms"
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, "query_budget", None)
@@ -6,13 +6,13 @@ import random
 
 # Django utilities
 from django.utils import timezone
-from django.utils.timezone import make_aware
 
 # Django authentication
 from django.contrib.auth import get_user_model
 
 # Local Django app imports
 from scheduling.models import EnglishClass, Lesson, Schedule, Material
+from scheduling.recurrence import generate_lessons
 
 
 def create_users():
@@ -131,47 +131,34 @@ def create_lessons_for_class(english_class, schedule, lesson_titles):
     """
     Create lessons for a given class and schedule.
 
+    The schedule gets a weekly recurrence rule on two or three random weekdays
+    (Sundays excluded) and its lessons are generated with bulk inserts.
+
     Args:
         english_class (EnglishClass): The English class for which lessons are to be created.
         schedule (Schedule): The schedule for the lessons.
         lesson_titles (list): A list of lesson titles.
     """
-    current_date = schedule.start_date
-    while current_date <= schedule.end_date:
-        if current_date.weekday() < 6:  # Exclude Sundays
-            start_time = make_aware(
-                datetime.datetime.combine(
-                    current_date, datetime.time(random.choice(range(9, 17)), 0)
-                )
-            )
-            end_time = start_time + datetime.timedelta(
-                hours=2
-            )  # Assuming each lesson lasts 2 hours
-            lesson_title = random.choice(lesson_titles)
-            location = random.choice(["on-site", "online"])
-            # Generate meeting link only if location is 'online'
-            meeting_link = generate_meeting_link() if location == "online" else ""
-
-            lesson = Lesson.objects.create(
-                english_class=english_class,
-                title=lesson_title,
-                description=f"Description for {lesson_title}",
-                start_time=start_time,
-                end_time=end_time,
-                location=location,
-                meeting_link=meeting_link,
-                status="planned",
-            )
-
-            create_materials_for_lesson(
-                lesson
-            )  # Move this line here, outside the if statement
-
-            current_date += datetime.timedelta(
-                random.choice(range(2, 4))
-            )  # Schedule next lesson 2-3 days apart
-        else:
-            current_date += datetime.timedelta(days=1)  # Skip to next day if Sunday
+    weekdays = random.sample(["MO", "TU", "WE", "TH", "FR", "SA"], k=random.randint(2, 3))
+    schedule.recurrence = f"FREQ=WEEKLY;BYDAY={','.join(weekdays)}"
+    schedule.lesson_start = datetime.time(random.choice(range(9, 17)), 0)
+    schedule.lesson_duration = datetime.timedelta(hours=2)  # Assuming each lesson lasts 2 hours
+    schedule.save()
+    generate_lessons(schedule)
+
+    lessons = list(schedule.generated_lessons.all())
+    for lesson in lessons:
+        lesson.title = random.choice(lesson_titles)
+        lesson.description = f"Description for {lesson.title}"
+        lesson.location = random.choice(["on-site", "online"])
+        # Generate meeting link only if location is 'online'
+        lesson.meeting_link = generate_meeting_link() if lesson.location == "online" else ""
+    Lesson.objects.bulk_update(
+        lessons, ["title", "description", "location", "meeting_link"], batch_size=500
+    )
+
+    for lesson in lessons:
+        create_materials_for_lesson(lesson)
 
 
 # create superadmin
@@ -1,5 +1,19 @@
-from django.contrib import admin
-from .models import EnglishClass, Schedule, Lesson, Material
+import os
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import transaction
+from .cache import bump_schedule_version
+from .models import (
+    EnglishClass,
+    Schedule,
+    Lesson,
+    Material,
+    MaterialImport,
+    renumber_lessons,
+)
+from .recurrence import generate_lessons
 
 
 @admin.register(EnglishClass)
@@ -11,10 +25,36 @@ class EnglishClassAdmin(admin.ModelAdmin):
     - Which columns to display in the admin list view ('list_display').
     - How to filter the list view ('list_filter').
     - Which fields to search ('search_fields').
+    - An action queueing the import of the selected classes' materials from
+      MATERIAL_IMPORT_ROOT.
     """
     list_display = ["title", "teacher"]
     list_filter = ["teacher"]
     search_fields = ["title", "description"]
+    actions = ["import_materials"]
+
+    @admin.action(description="Import materials from the import directory")
+    def import_materials(self, request, queryset):
+        """
+        Queues the import of MATERIAL_IMPORT_ROOT/<class title>/<lesson title or date>/
+        for the selected classes; "python manage.py import_materials --queued" runs it
+        (see scheduling/imports.py).
+        """
+        root = settings.MATERIAL_IMPORT_ROOT
+        if not os.path.isdir(root):
+            self.message_user(
+                request, f'The import directory "{root}" does not exist.', messages.ERROR
+            )
+            return
+        MaterialImport.objects.create(
+            class_titles=sorted(queryset.values_list("title", flat=True)),
+            requested_by=request.user,
+        )
+        self.message_user(
+            request,
+            "The import was queued; its report is shown under Material Imports once it has run.",
+            messages.SUCCESS,
+        )
 
 
 @admin.register(Schedule)
@@ -23,10 +63,30 @@ class ScheduleAdmin(admin.ModelAdmin):
     Admin interface options for Schedule model.
 
     Defines list display, filtering options based on terms and dates, allowing
-    administrators to easily navigate through different schedules.
+    administrators to easily navigate through different schedules, and an action
+    generating the lessons of recurring schedules.
     """
-    list_display = ["english_class", "term", "start_date", "end_date"]
+    list_display = ["english_class", "term", "start_date", "end_date", "recurrence"]
     list_filter = ["term", "start_date", "end_date"]
+    actions = ["generate_lessons"]
+
+    @admin.action(description="Generate lessons from the recurrence rule")
+    def generate_lessons(self, request, queryset):
+        """
+        Creates the missing lessons of the selected recurring schedules and moves the
+        generated ones back to the rule's times.
+        """
+        created = conflicts = 0
+        for schedule in queryset.exclude(recurrence="").exclude(lesson_start=None):
+            report = generate_lessons(schedule)
+            created += report["created"]
+            conflicts += len(report["conflicts"])
+        self.message_user(request, f"{created} lesson(s) created.", messages.SUCCESS)
+        if conflicts:
+            self.message_user(
+                request, f"{conflicts} double-booking(s) of teachers or students.",
+                messages.WARNING,
+            )
 
 
 @admin.register(Lesson)
@@ -41,6 +101,34 @@ class LessonAdmin(admin.ModelAdmin):
     list_filter = ["english_class", "start_time", "end_time"]
     search_fields = ["title", "description"]
 
+    def delete_queryset(self, request, queryset):
+        """
+        Deletes the selected lessons in bulk, which bypasses Lesson.delete(), then
+        renumbers the lessons left in their classes.
+        """
+        class_ids = set(queryset.values_list("english_class_id", flat=True))
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            renumber_lessons(class_ids)
+        bump_schedule_version()
+
+
+class MaterialAdminForm(forms.ModelForm):
+    """
+    Admin form of a material. The stored file and what is derived from it (digest,
+    size, compression, processing status) are read-only; a new file is given
+    through 'upload' and stored like lesson uploads are.
+    """
+    upload = forms.FileField(
+        required=False,
+        label="Upload file",
+        help_text="Replaces the material's file.",
+    )
+
+    class Meta:
+        model = Material
+        fields = "__all__"
+
 
 @admin.register(Material)
 class MaterialAdmin(admin.ModelAdmin):
@@ -48,8 +136,36 @@ class MaterialAdmin(admin.ModelAdmin):
     Admin interface options for Material model.
 
     Focuses on categorizing materials by type and facilitating the search process through
-    titles, enhancing the material management process.
+    titles, enhancing the material management process. Uploaded files are hashed and
+    compressed by Material.store_file(), so the stored fields stay consistent.
     """
+    form = MaterialAdminForm
     list_display = ["title", "type"]
     list_filter = ["type"]
     search_fields = ["title"]
+    readonly_fields = ["file", "sha256", "size", "compression", "processing_status"]
+
+    def save_model(self, request, obj, form, change):
+        """Stores the uploaded file, if any, before saving the material."""
+        upload = form.cleaned_data.get("upload")
+        if upload:
+            obj.store_file(upload)
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(MaterialImport)
+class MaterialImportAdmin(admin.ModelAdmin):
+    """
+    Admin interface options for MaterialImport model.
+
+    Lists the imports queued from the class admin with their status and report;
+    they are created by the class action only.
+    """
+    list_display = ["__str__", "requested_by", "status", "created_at", "finished_at"]
+    list_filter = ["status"]
+    readonly_fields = [
+        "class_titles", "requested_by", "status", "report", "created_at", "finished_at"
+    ]
+
+    def has_add_permission(self, request):
+        return False
@@ -14,6 +14,10 @@ class SchedulingConfig(AppConfig):
     It also specifies the app's name, 'scheduling', which Django uses in various
     parts of the framework,
     like when referring to the app in settings or migrations.
+    The signal handlers that invalidate cached schedule data are connected in 'ready'.
     """
     default_auto_field = "django.db.models.BigAutoField"
     name = "scheduling"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,182 @@
+# scheduling/cache.py
+
+"""
+Caching of serialized schedule payloads, keyed by the user and a schedule version
+kept in the database, and the row-based validators of the lesson views.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Count, F, Max
+
+from .models import ScheduleVersion
+
+
+def get_schedule_version():
+    """
+    Return the current schedule version, initialising it if needed.
+
+    The initial value is time based, so a version lost with the database never
+    restarts at a number that may still have payloads cached under it.
+
+    Returns:
+        int: The current schedule version.
+    """
+    version = ScheduleVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+    if version is None:
+        version = ScheduleVersion.objects.get_or_create(
+            pk=1, defaults={"version": time.time_ns()}
+        )[0].version
+    return version
+
+
+def bump_schedule_version():
+    """
+    Invalidate every cached schedule payload by moving to a new version, with a
+    single UPDATE that every worker process sees.
+    """
+    if not ScheduleVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        get_schedule_version()
+
+
+def user_cache_role(user):
+    """
+    Return a short role label for the given user.
+
+    Args:
+        user: The requesting user, possibly anonymous.
+
+    Returns:
+        str: One of 'superuser', 'teacher', 'student', 'user' or 'anonymous'.
+    """
+    if not user.is_authenticated:
+        return "anonymous"
+    if user.is_superuser:
+        return "superuser"
+    if user.is_teacher:
+        return "teacher"
+    if user.is_student:
+        return "student"
+    return "user"
+
+
+def schedule_cache_key(user, params, version=None):
+    """
+    Build the cache key of a schedule payload.
+
+    Args:
+        user: The requesting user, possibly anonymous.
+        params: An iterable of (name, value) pairs describing the request.
+        version: The schedule version to use, the current one by default.
+
+    Returns:
+        str: The cache key.
+    """
+    if version is None:
+        version = get_schedule_version()
+    digest = hashlib.md5(
+        repr(sorted(params)).encode("utf-8"), usedforsecurity=False
+    ).hexdigest()
+    return f"scheduling:events:{version}:{user_cache_role(user)}:{user.pk or 0}:{digest}"
+
+
+def get_cached_schedule(user, params, build):
+    """
+    Return a cached schedule payload, building and caching it on a miss.
+
+    Args:
+        user: The requesting user, possibly anonymous.
+        params: An iterable of (name, value) pairs describing the request.
+        build: A callable returning the payload to cache.
+
+    Returns:
+        The cached or freshly built payload.
+    """
+    key = schedule_cache_key(user, params)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, settings.SCHEDULE_CACHE_TIMEOUT)
+    return payload
+
+
+def schedule_etag(request, *args, **kwargs):
+    """
+    Compute an ETag for a scheduling view from the schedule version.
+
+    Meant to be used as the 'etag_func' of django.views.decorators.http.condition.
+    The tag covers the user, the path and the query string, so it only matches
+    when the same user asks for the same data and nothing has changed since.
+    No tag is produced while flash messages are pending, so that they are
+    always rendered.
+
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        str: The ETag value, or None.
+    """
+    if len(get_messages(request)):
+        return None
+    return hashlib.md5(
+        schedule_cache_key(request.user, [(request.path, request.GET.urlencode())]).encode(
+            "utf-8"
+        ),
+        usedforsecurity=False,
+    ).hexdigest()
+
+
+def lesson_validators(lessons):
+    """
+    Compute the validators of a response built from lessons, from their rows: the
+    number of lessons and the latest update time of the lessons and their classes.
+    Changes to materials, enrollments and users touch these rows (see
+    scheduling/signals.py).
+
+    Args:
+        lessons: The Lesson queryset the response is built from.
+
+    Returns:
+        dict: The 'count' and the 'last_modified' time (None without lessons).
+    """
+    rows = lessons.aggregate(
+        count=Count("pk"),
+        lesson=Max("updated_at"),
+        english_class=Max("english_class__updated_at"),
+    )
+    return {
+        "count": rows["count"],
+        "last_modified": max(filter(None, (rows["lesson"], rows["english_class"])), default=None),
+    }
+
+
+def lesson_etag(request, validators):
+    """
+    Compute the ETag of a response from the validators of its lessons.
+
+    Like schedule_etag(), the tag covers the user, the path and the query string,
+    and no tag is produced while flash messages are pending.
+
+    Args:
+        request: HttpRequest object.
+        validators: The result of lesson_validators().
+
+    Returns:
+        str: The ETag value, or None.
+    """
+    if len(get_messages(request)):
+        return None
+    last_modified = validators["last_modified"]
+    tag = (
+        user_cache_role(request.user),
+        request.user.pk,
+        request.path,
+        request.GET.urlencode(),
+        validators["count"],
+        last_modified.isoformat() if last_modified else None,
+    )
+    return hashlib.md5(repr(tag).encode("utf-8"), usedforsecurity=False).hexdigest()
@@ -0,0 +1,139 @@
+# scheduling/compression.py
+
+"""
+Transparent compression of material files in storage: choose_codec() picks a codec
+from a sample of the file and open_decompressed() restores the bytes as they are read.
+"""
+
+import io
+import zlib
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.temp import NamedTemporaryFile
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+
+# Bytes sampled by the compressibility probe
+PROBE_SIZE = 64 * 1024
+
+# Bytes read from the source or the stored file per compression step
+COMPRESSION_CHUNK_SIZE = 64 * 1024
+
+
+def available_codecs():
+    """
+    Returns the configured codecs that can be used in this environment.
+    """
+    return [
+        codec
+        for codec in settings.MATERIAL_COMPRESSION_CODECS
+        if codec == "zlib" or (codec == "zstd" and zstandard is not None)
+    ]
+
+
+def compressor(codec):
+    """
+    Returns a new streaming compressor (with compress() and flush()) for a codec.
+    """
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return zlib.compressobj(6)
+
+
+def choose_codec(file):
+    """
+    Probe how well a file compresses and pick the codec to store it with.
+
+    Args:
+        file: A binary file-like object, left at its start.
+
+    Returns:
+        str: The best codec, or "" if the file should be stored uncompressed.
+    """
+    codecs = available_codecs()
+    if not codecs:
+        return ""
+    file.seek(0)
+    sample = file.read(PROBE_SIZE)
+    file.seek(0)
+    if not sample:
+        return ""
+    ratios = {}
+    for codec in codecs:
+        probe = compressor(codec)
+        ratios[codec] = len(probe.compress(sample) + probe.flush()) / len(sample)
+    best = min(ratios, key=ratios.get)
+    return best if ratios[best] <= settings.MATERIAL_COMPRESSION_RATIO else ""
+
+
+def compress_file(file, codec):
+    """
+    Compress a file, chunk by chunk, into a temporary file.
+
+    Args:
+        file: A binary file-like object, read from its start.
+        codec: The codec returned by choose_codec().
+
+    Returns:
+        File: The compressed temporary file, positioned at its start. It is
+        deleted when closed.
+    """
+    file.seek(0)
+    stream = compressor(codec)
+    compressed = NamedTemporaryFile(suffix=".upload")
+    for chunk in iter(lambda: file.read(COMPRESSION_CHUNK_SIZE), b""):
+        compressed.write(stream.compress(chunk))
+    compressed.write(stream.flush())
+    compressed.seek(0)
+    return File(compressed)
+
+
+class ZlibReader(io.RawIOBase):
+    """
+    Read-only file object decompressing a zlib stream as it is read.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.decompressor = zlib.decompressobj()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while True:
+            data = self.decompressor.unconsumed_tail
+            if not data and not self.decompressor.eof:
+                data = self.file.read(COMPRESSION_CHUNK_SIZE)
+            if not data:
+                return 0
+            # max_length bounds the output of highly compressible input
+            output = self.decompressor.decompress(data, len(buffer))
+            if output:
+                buffer[:len(output)] = output
+                return len(output)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def open_decompressed(file, codec):
+    """
+    Wrap a stored, compressed file in a reader returning the original bytes.
+
+    Args:
+        file: The open stored file.
+        codec: The codec the file was compressed with.
+
+    Returns:
+        A binary, forward-only file-like object; closing it closes the stored file.
+    """
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().stream_reader(file, closefd=True)
+    return io.BufferedReader(ZlibReader(file), COMPRESSION_CHUNK_SIZE)
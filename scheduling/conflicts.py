@@ -0,0 +1,146 @@
+# scheduling/conflicts.py
+
+"""
+Double-booking checks of teachers and students, for any number of lessons with a
+fixed number of queries.
+"""
+
+from collections import defaultdict
+
+from django.utils import timezone
+
+from users.models import User
+from .models import EnglishClass, Lesson
+
+
+def find_conflicts(lessons, exclude=()):
+    """
+    Find the overlaps of lessons with the other lessons of their teachers and students.
+
+    Args:
+        lessons: The Lessons to check, with their new times; unsaved lessons are allowed.
+        exclude: Primary keys of stored lessons to ignore, e.g. lessons being replaced.
+
+    Returns:
+        list: One dictionary per person and pair of overlapping lessons: the checked
+        'lesson', the 'other' lesson (stored, or another checked lesson), the
+        'user_id' and the person's 'role' ("teacher" or "student") in the checked lesson.
+    """
+    lessons = [
+        lesson for lesson in lessons
+        if lesson.start_time < lesson.end_time and lesson.status != "cancelled"
+    ]
+    if not lessons:
+        return []
+    class_ids = {lesson.english_class_id for lesson in lessons}
+    # Callers moving lessons usually loaded their classes already
+    teacher_of = {
+        lesson.english_class_id: lesson.english_class.teacher_id
+        for lesson in lessons
+        if Lesson.english_class.is_cached(lesson)
+    }
+    if class_ids - set(teacher_of):
+        teacher_of.update(
+            EnglishClass.objects.filter(pk__in=class_ids - set(teacher_of)).values_list(
+                "pk", "teacher_id"
+            )
+        )
+    enrollments = EnglishClass.students.through.objects
+    students = set(
+        enrollments.filter(englishclass_id__in=class_ids).values_list("user_id", flat=True)
+    )
+    students_of = defaultdict(set)
+    for class_id, user_id in enrollments.filter(user_id__in=students).values_list(
+        "englishclass_id", "user_id"
+    ):
+        students_of[class_id].add(user_id)
+    # Students may teach classes of their own, too
+    teacher_of.update(
+        EnglishClass.objects.filter(teacher_id__in=set(teacher_of.values()) | students)
+        .values_list("pk", "teacher_id")
+    )
+
+    stored = (
+        Lesson.objects.filter(
+            english_class_id__in=set(teacher_of) | set(students_of),
+            end_time__gt=min(lesson.start_time for lesson in lessons),
+            start_time__lt=max(lesson.end_time for lesson in lessons),
+        )
+        .exclude(pk__in={lesson.pk for lesson in lessons if lesson.pk} | set(exclude))
+        .exclude(status="cancelled")
+        .only("pk", "english_class_id", "title", "start_time", "end_time")
+    )
+
+    def people(lesson):
+        """Returns the checked people of a lesson's class, by id, with their role."""
+        roles = {user_id: "student" for user_id in students_of[lesson.english_class_id]}
+        if lesson.english_class_id in teacher_of:
+            roles[teacher_of[lesson.english_class_id]] = "teacher"
+        return roles
+
+    # Each person's lessons, as (start, end, whether it is checked, lesson, role)
+    schedules = defaultdict(list)
+    for is_checked, group in ((True, lessons), (False, stored)):
+        for lesson in group:
+            for user_id, role in people(lesson).items():
+                schedules[user_id].append(
+                    (lesson.start_time, lesson.end_time, is_checked, lesson, role)
+                )
+
+    conflicts = []
+    for user_id, entries in schedules.items():
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        # The lessons started so far that have not ended yet
+        active = []
+        for entry in entries:
+            active = [previous for previous in active if previous[1] > entry[0]]
+            for previous in active:
+                # Report every overlap once, from the side of a checked lesson
+                first, second = (entry, previous) if entry[2] else (previous, entry)
+                if first[2]:
+                    conflicts.append(
+                        {"lesson": first[3], "other": second[3], "user_id": user_id,
+                         "role": first[4]}
+                    )
+            active.append(entry)
+    return conflicts
+
+
+def serialize_conflicts(conflicts):
+    """
+    Describe conflicts for JSON responses and messages, loading the usernames with
+    one query.
+
+    Args:
+        conflicts: The result of find_conflicts().
+
+    Returns:
+        list: One dictionary per conflict with the 'lesson_id', 'conflicting_lesson_id',
+        'user_id', 'username', 'role', the conflicting lesson's 'start' and 'end', and
+        a readable 'message'.
+    """
+    if not conflicts:
+        return []
+    usernames = dict(
+        User.objects.filter(pk__in={conflict["user_id"] for conflict in conflicts}).values_list(
+            "pk", "username"
+        )
+    )
+    result = []
+    for conflict in conflicts:
+        other = conflict["other"]
+        username = usernames.get(conflict["user_id"], "")
+        start = timezone.localtime(other.start_time)
+        end = timezone.localtime(other.end_time)
+        result.append({
+            "lesson_id": conflict["lesson"].pk,
+            "conflicting_lesson_id": other.pk,
+            "user_id": conflict["user_id"],
+            "username": username,
+            "role": conflict["role"],
+            "start": other.start_time.isoformat(),
+            "end": other.end_time.isoformat(),
+            "message": f'{conflict["role"].capitalize()} {username} already has "{other.title}" '
+            f'on {start:%Y-%m-%d} from {start:%H:%M} to {end:%H:%M}.',
+        })
+    return result
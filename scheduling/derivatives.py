@@ -0,0 +1,220 @@
+# scheduling/derivatives.py
+
+"""
+Derivatives of material files (text, preview, page count, metadata, thumbnail),
+extracted by the process_materials worker; Pillow and pypdf are optional.
+"""
+
+import io
+import itertools
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from html import unescape
+
+try:
+    from PIL import Image
+except ImportError:  # image thumbnails are optional
+    Image = None
+
+try:
+    import pypdf
+except ImportError:  # PDF text extraction is optional
+    pypdf = None
+
+
+# Characters of extracted text kept on the material
+MAX_TEXT_LENGTH = 200000
+
+# Characters of text shown as a preview
+PREVIEW_LENGTH = 300
+
+# Largest side of image thumbnails, in pixels
+THUMBNAIL_SIZE = (320, 320)
+
+# Bytes of a material kept in memory before it is spooled to disk
+SPOOL_SIZE = 4 * 1024 * 1024
+
+TEXT_EXTENSIONS = {".txt", ".md", ".csv"}
+OFFICE_EXTENSIONS = {".docx", ".pptx", ".odt", ".odp", ".epub"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+EXTRACTED_EXTENSIONS = TEXT_EXTENSIONS | OFFICE_EXTENSIONS | {".pdf"} | IMAGE_EXTENSIONS
+
+TAG_RE = re.compile(r"<[^>]+>")
+PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+# Paragraph-like elements of office and EPUB XML, turned into line breaks
+BREAK_RE = re.compile(r"</(?:w:p|text:p|text:h|a:p|p|div|h\d|li|br)\s*>|<br\s*/?>")
+
+
+def xml_text(markup):
+    """
+    Returns the text content of an XML or XHTML document.
+    """
+    text = TAG_RE.sub("", BREAK_RE.sub("\n", markup))
+    return unescape(text)
+
+
+def office_text(archive, extension):
+    """
+    Extract the text and page count of a zipped office document or EPUB book.
+
+    Args:
+        archive: The open zipfile.ZipFile.
+        extension: The file extension, e.g. ".docx".
+
+    Returns:
+        tuple: The text and the page (or slide) count, which may be None.
+    """
+    names = archive.namelist()
+    page_count = None
+    if extension == ".docx":
+        parts = ["word/document.xml"]
+        if "docProps/app.xml" in names:
+            pages = re.search(r"<Pages>(\d+)</Pages>", read_part(archive, "docProps/app.xml"))
+            page_count = int(pages.group(1)) if pages else None
+    elif extension == ".pptx":
+        parts = sorted(
+            (name for name in names if re.match(r"ppt/slides/slide\d+\.xml$", name)),
+            key=lambda name: int(re.search(r"(\d+)\.xml$", name).group(1)),
+        )
+        page_count = len(parts)
+    elif extension in (".odt", ".odp"):
+        parts = ["content.xml"]
+        if "meta.xml" in names:
+            pages = re.search(r'meta:page-count="(\d+)"', read_part(archive, "meta.xml"))
+            page_count = int(pages.group(1)) if pages else None
+    else:
+        parts = sorted(name for name in names if name.endswith((".xhtml", ".html", ".htm")))
+    text = []
+    length = 0
+    for part in parts:
+        if part in names and length < MAX_TEXT_LENGTH:
+            text.append(xml_text(read_part(archive, part)))
+            length += len(text[-1])
+    return "\n".join(text), page_count
+
+
+def read_part(archive, name):
+    """
+    Returns a member of a zip archive as text.
+    """
+    return archive.read(name).decode("utf-8", errors="replace")
+
+
+def pdf_details(file):
+    """
+    Extract the text and page count of a PDF. The text needs pypdf; without it,
+    pages are counted from the page objects of the file.
+
+    Args:
+        file: A seekable binary file.
+
+    Returns:
+        tuple: The text and the page count.
+    """
+    if pypdf is not None:
+        reader = pypdf.PdfReader(file)
+        text = []
+        length = 0
+        for page in reader.pages:
+            if length >= MAX_TEXT_LENGTH:
+                break
+            text.append(page.extract_text() or "")
+            length += len(text[-1])
+        return "\n".join(text), len(reader.pages)
+    count = 0
+    tail = b""
+    # The trailing space lets a page object at the very end of the file be counted
+    for chunk in itertools.chain(iter(lambda: file.read(1024 * 1024), b""), [b" "]):
+        data = tail + chunk
+        for match in PDF_PAGE_RE.finditer(data):
+            # Matches ending in the carried-over tail were counted with the previous
+            # chunk, and one ending at the end of the data is counted with the next
+            if len(tail) <= match.end() < len(data):
+                count += 1
+        tail = data[-32:]
+    return "", count or None
+
+
+def image_details(file):
+    """
+    Read the dimensions of an image and render its thumbnail. Needs Pillow.
+
+    Args:
+        file: A seekable binary file.
+
+    Returns:
+        tuple: The metadata ('width', 'height') and the JPEG thumbnail bytes, or
+        empty values without Pillow.
+    """
+    if Image is None:
+        return {}, None
+    with Image.open(file) as image:
+        metadata = {"width": image.width, "height": image.height}
+        image.thumbnail(THUMBNAIL_SIZE)
+        thumbnail = io.BytesIO()
+        image.convert("RGB").save(thumbnail, "JPEG", quality=80)
+    return metadata, thumbnail.getvalue()
+
+
+def preview_of(text):
+    """
+    Returns the first characters of a text, with whitespace collapsed.
+    """
+    words = " ".join(text[:PREVIEW_LENGTH * 2].split())
+    if len(words) <= PREVIEW_LENGTH:
+        return words
+    return words[:PREVIEW_LENGTH].rsplit(" ", 1)[0] + "…"
+
+
+def extract_derivatives(material):
+    """
+    Produce the derivatives of a material.
+
+    The material's bytes are copied once into a spooled temporary file (kept in
+    memory up to SPOOL_SIZE), since zip archives and PDFs need random access and
+    compressed materials can only be read forward.
+
+    Args:
+        material: A Material with a file or legacy content.
+
+    Returns:
+        dict: 'extracted_text', 'preview_text', 'page_count', 'metadata' and
+        'thumbnail' (bytes or None).
+    """
+    name = material.title or (material.file.name if material.file else "")
+    extension = os.path.splitext(name)[1].lower()
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    text, page_count, thumbnail = "", None, None
+    metadata = {"content_type": content_type, "size": material.content_size()}
+
+    # Other files (audio, video, archives) only get their metadata
+    source = material.open_content() if extension in EXTRACTED_EXTENSIONS else None
+    if source is not None:
+        with source, tempfile.SpooledTemporaryFile(SPOOL_SIZE) as file:
+            shutil.copyfileobj(source, file)
+            file.seek(0)
+            if extension in TEXT_EXTENSIONS:
+                text = file.read(MAX_TEXT_LENGTH * 4).decode("utf-8", errors="replace")
+            elif extension in OFFICE_EXTENSIONS:
+                with zipfile.ZipFile(file) as archive:
+                    text, page_count = office_text(archive, extension)
+            elif extension == ".pdf":
+                text, page_count = pdf_details(file)
+            else:
+                image_metadata, thumbnail = image_details(file)
+                metadata.update(image_metadata)
+
+    text = text[:MAX_TEXT_LENGTH].strip()
+    if text:
+        metadata["words"] = len(text.split())
+    return {
+        "extracted_text": text,
+        "preview_text": preview_of(text),
+        "page_count": page_count,
+        "metadata": metadata,
+        "thumbnail": thumbnail,
+    }
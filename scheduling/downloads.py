@@ -0,0 +1,341 @@
+# scheduling/downloads.py
+
+"""
+Serving of material files: streamed downloads answering Range and conditional
+requests, ZIP archives built on the fly, and optional X-Sendfile handoff.
+"""
+
+import mimetypes
+import os
+import re
+import zipfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+# Number of bytes read from storage per streamed piece
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Extensions of formats that are compressed already, stored in ZIP archives as they are
+COMPRESSED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".mp3", ".ogg", ".m4a", ".mp4", ".m4v", ".mov", ".webm", ".avi", ".mkv",
+    ".zip", ".epub", ".docx", ".pptx", ".xlsx", ".odt", ".odp", ".ods", ".pdf",
+}
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a requested byte range lies outside the file."""
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range "Range" header.
+
+    Args:
+        header: The value of the Range header.
+        size: The size of the file in bytes.
+
+    Returns:
+        tuple: The first and last byte offsets (inclusive), or None when the
+        header is malformed or asks for several ranges; the whole file is sent then.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    first = int(first)
+    if first >= size:
+        raise RangeNotSatisfiable
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        return None
+    return first, last
+
+
+def iter_file_range(file, first, length, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Read part of an open file in chunks, closing the file at the end.
+
+    Args:
+        file: A binary file-like object.
+        first: The offset to start reading at.
+        length: The number of bytes to read.
+        chunk_size: How many bytes to read per yielded piece.
+
+    Yields:
+        bytes: Consecutive pieces of the range.
+    """
+    try:
+        if first and file.seekable():
+            file.seek(first)
+        elif first:
+            # Decompressing readers only go forward: skip to the range's start
+            while first > 0:
+                skipped = len(file.read(min(chunk_size, first)))
+                if not skipped:
+                    break
+                first -= skipped
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def material_etag(material):
+    """
+    Returns the strong ETag of a material's bytes, or None if it has no digest.
+    """
+    return f'"{material.sha256}"' if material.sha256 else None
+
+
+def sendfile_response(material):
+    """
+    Build the response handing a stored material file to the front-end server.
+
+    Args:
+        material: A Material with a file in storage.
+
+    Returns:
+        HttpResponse: An empty response carrying the redirect header.
+    """
+    response = HttpResponse()
+    if settings.MATERIALS_SENDFILE == "x-accel-redirect":
+        prefix = settings.MATERIALS_SENDFILE_PREFIX
+        response["X-Accel-Redirect"] = prefix + quote(material.file.name)
+    else:
+        response["X-Sendfile"] = material.file.path
+    # Let the front-end server pick the type from the file, as it does for static files
+    del response["Content-Type"]
+    return response
+
+
+def material_response(request, material):
+    """
+    Build the download response of a material.
+
+    Args:
+        request: The HttpRequest object (GET or HEAD).
+        material: The Material to send.
+
+    Returns:
+        HttpResponse: 200 with the whole file, 206 with the requested range, 304 or
+        412 for conditional requests, or 416 for an unsatisfiable range.
+    """
+    etag = material_etag(material)
+    last_modified = int(material.updated_at.timestamp())
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    # Compressed files must go through Django, which decompresses them
+    if settings.MATERIALS_SENDFILE and material.file and not material.compression:
+        response = sendfile_response(material)
+    else:
+        response = stream_response(request, material, etag, last_modified)
+
+    if etag:
+        response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Content-Disposition"] = content_disposition_header(
+        as_attachment=True, filename=material.title or "material"
+    )
+    return response
+
+
+def preview_response(material):
+    """
+    Build the response sending a material's thumbnail.
+
+    Args:
+        material: A Material with a generated preview.
+
+    Returns:
+        FileResponse: The JPEG thumbnail.
+    """
+    response = FileResponse(material.preview.open("rb"), content_type="image/jpeg")
+    response["Last-Modified"] = http_date(int(material.updated_at.timestamp()))
+    return response
+
+
+def stream_response(request, material, etag, last_modified):
+    """
+    Stream a material, or the byte range requested of it, from storage.
+
+    Args:
+        request: The HttpRequest object (GET or HEAD).
+        material: The Material to send.
+        etag: The material's ETag, checked against If-Range.
+        last_modified: The material's update time, checked against If-Range.
+
+    Returns:
+        HttpResponse: The 200, 206 or 416 response, without validators.
+    """
+    file = material.open_content()
+    size = material.content_size()
+
+    content_type, encoding = mimetypes.guess_type(material.title or material.file.name)
+    if content_type is None or encoding:
+        # Unknown, or compressed (e.g. ".tar.gz"): sent as the opaque bytes they are
+        content_type = "application/octet-stream"
+
+    byte_range = None
+    if "HTTP_RANGE" in request.META and range_is_current(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except RangeNotSatisfiable:
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    first, last = byte_range or (0, size - 1)
+    length = last - first + 1 if size else 0
+    if request.method == "HEAD":
+        file.close()
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            iter_file_range(file, first, length), content_type=content_type
+        )
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response["Content-Length"] = str(length)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def range_is_current(request, etag, last_modified):
+    """
+    Check the If-Range header: a range is only sent for the version the client has.
+
+    Returns:
+        bool: Whether the Range header applies.
+    """
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class ZipStream:
+    """
+    Write-only, unseekable file collecting the bytes zipfile writes, so they can
+    be sent as they are produced. zipfile then describes every entry in a data
+    descriptor after its data instead of seeking back to its header.
+    """
+
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Returns and forgets the bytes written since the last call."""
+        data = b"".join(self.pieces)
+        self.pieces = []
+        return data
+
+
+def zip_entry_name(material, used):
+    """
+    Returns a unique file name for a material inside an archive.
+
+    Args:
+        material: The Material.
+        used: The set of names already in the archive, updated in place.
+    """
+    stem, extension = os.path.splitext(os.path.basename(material.title) or "material")
+    name = stem + extension
+    copy = 1
+    while name in used:
+        copy += 1
+        name = f"{stem} ({copy}){extension}"
+    used.add(name)
+    return name
+
+
+def iter_zip(materials, chunk_size=DOWNLOAD_CHUNK_SIZE):
+    """
+    Build a ZIP archive of materials incrementally.
+
+    Args:
+        materials: An iterable of Materials.
+        chunk_size: How many bytes of a file to read per step.
+
+    Yields:
+        bytes: Consecutive pieces of the archive.
+    """
+    stream = ZipStream()
+    used = set()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for material in materials:
+            source = material.open_content()
+            if source is None:
+                continue
+            info = zipfile.ZipInfo(
+                zip_entry_name(material, used),
+                date_time=timezone.localtime(material.updated_at).timetuple()[:6],
+            )
+            extension = os.path.splitext(material.title)[1].lower()
+            # Materials compressed in storage passed the compressibility probe
+            if extension in COMPRESSED_EXTENSIONS and not material.compression:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            # The size lets zipfile decide on ZIP64 headers before the data is written
+            info.file_size = material.content_size()
+            with source, archive.open(info, "w") as entry:
+                for chunk in iter(lambda: source.read(chunk_size), b""):
+                    entry.write(chunk)
+                    yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
+
+
+def zip_response(materials, file_name):
+    """
+    Build the streamed response of a ZIP archive of materials.
+
+    Args:
+        materials: An iterable of Materials, read while the response is sent.
+        file_name: The name offered for the archive.
+
+    Returns:
+        StreamingHttpResponse: The archive, as an attachment.
+    """
+    response = StreamingHttpResponse(
+        (piece for piece in iter_zip(materials) if piece), content_type="application/zip"
+    )
+    response["Content-Disposition"] = content_disposition_header(
+        as_attachment=True, filename=file_name
+    )
+    return response
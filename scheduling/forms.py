@@ -1,7 +1,10 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_date
 from multiupload.fields import MultiFileField
 from .models import EnglishClass, Schedule, Lesson, Material
+from .recurrence import parse_rule
 
 
 User = get_user_model()
@@ -43,14 +46,74 @@ class ScheduleForm(forms.ModelForm):
 
     It allows setting the term and the start and end dates for a class schedule. Date fields
     utilize a date picker for ease of use.
+    An optional recurrence rule, with the lesson start time and duration, generates the
+    term's lessons; excluded dates are entered as comma-separated YYYY-MM-DD dates.
     """
+    excluded_dates = forms.CharField(
+        required=False,
+        help_text="Dates without lessons, e.g. holidays: YYYY-MM-DD, separated by commas.",
+    )
+
     class Meta:
         model = Schedule
-        fields = ["term", "start_date", "end_date"]
+        fields = [
+            "term",
+            "start_date",
+            "end_date",
+            "recurrence",
+            "lesson_start",
+            "lesson_duration",
+            "excluded_dates",
+        ]
         widgets = {
             "start_date": forms.DateInput(format=("%Y-%m-%d"), attrs={"type": "date"}),
             "end_date": forms.DateInput(format=("%Y-%m-%d"), attrs={"type": "date"}),
+            "lesson_start": forms.TimeInput(format=("%H:%M"), attrs={"type": "time"}),
         }
+        help_texts = {
+            "recurrence": 'e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR" for lessons every Monday, '
+            "Wednesday and Friday. Leave empty to create lessons one by one.",
+            "lesson_duration": "HH:MM:SS",
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["lesson_duration"].required = False
+        if self.instance.excluded_dates:
+            self.initial["excluded_dates"] = ", ".join(self.instance.excluded_dates)
+
+    def clean_recurrence(self):
+        """Checks that the recurrence rule can be expanded."""
+        rule = self.cleaned_data["recurrence"].strip()
+        if rule:
+            try:
+                parse_rule(rule)
+            except ValueError as error:
+                raise forms.ValidationError(str(error))
+        return rule
+
+    def clean_lesson_duration(self):
+        """Falls back to the default duration when none is given."""
+        duration = self.cleaned_data["lesson_duration"]
+        return duration or Schedule._meta.get_field("lesson_duration").get_default()
+
+    def clean_excluded_dates(self):
+        """Returns the excluded dates as a sorted list of ISO dates."""
+        dates = set()
+        for value in self.cleaned_data["excluded_dates"].split(","):
+            if not value.strip():
+                continue
+            date = parse_date(value.strip())
+            if date is None:
+                raise forms.ValidationError(f'"{value.strip()}" is not a YYYY-MM-DD date.')
+            dates.add(date.isoformat())
+        return sorted(dates)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("recurrence") and not cleaned_data.get("lesson_start"):
+            self.add_error("lesson_start", "Recurring lessons need a start time.")
+        return cleaned_data
 
 
 class LessonForm(forms.ModelForm):
@@ -63,6 +126,7 @@ class LessonForm(forms.ModelForm):
     and uploading new materials.
     The 'new_materials' field supports multiple file uploads with restrictions on the
     number and size of files.
+    Lessons generated from a recurrence rule get an 'apply_to_following' option.
     """
     teacher = forms.ModelChoiceField(
         queryset=User.objects.filter(is_teacher=True),
@@ -80,7 +144,13 @@ class LessonForm(forms.ModelForm):
         widget=forms.CheckboxSelectMultiple(),
     )
     new_materials = MultiFileField(
-        min_num=False, max_num=5, max_file_size=1024 * 1024 * 5
+        min_num=False, max_num=5, max_file_size=settings.MATERIAL_UPLOAD_MAX_SIZE
+    )
+    apply_to_following = forms.BooleanField(
+        required=False,
+        label="Apply to this and following lessons",
+        help_text="Also give the later lessons of the series this time, duration, title, "
+        "description and location.",
     )
 
     class Meta:
@@ -96,6 +166,7 @@ class LessonForm(forms.ModelForm):
             "students",
             "materials",
             "new_materials",
+            "apply_to_following",
         ]
         widgets = {
             "title": forms.TextInput(attrs={"class": "form-control"}),
@@ -120,6 +191,9 @@ class LessonForm(forms.ModelForm):
             self.fields["teacher"].initial = self.instance.english_class.teacher
             self.fields["students"].initial = self.instance.english_class.students.all()
             self.fields["materials"].initial = self.instance.materials.all()
+        if not self.instance.schedule_id:
+            # Only lessons generated from a recurrence rule belong to a series
+            del self.fields["apply_to_following"]
 
     def save(self, commit=True):
         """
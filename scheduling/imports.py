@@ -0,0 +1,279 @@
+# scheduling/imports.py
+
+"""
+Bulk import of material files from a directory tree or a CSV manifest, linked to
+lessons by class title and lesson title or date.
+"""
+
+import csv
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.temp import NamedTemporaryFile
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .compression import COMPRESSION_CHUNK_SIZE, choose_codec, compressor
+from .models import Lesson, Material, MaterialImport, material_storage
+from .uploads import material_extension_allowed
+
+
+# Files prepared, inserted and linked per batch
+IMPORT_BATCH_SIZE = 100
+
+
+def collect_directory(root, class_titles=None):
+    """
+    List the files of an import directory tree.
+
+    Args:
+        root: The directory holding one folder per class.
+        class_titles: Only import the folders of these classes, if given.
+
+    Returns:
+        list: (path, class title, lesson key) items.
+    """
+    items = []
+    for class_title in sorted(os.listdir(root)):
+        class_dir = os.path.join(root, class_title)
+        if not os.path.isdir(class_dir):
+            continue
+        if class_titles is not None and class_title not in class_titles:
+            continue
+        for lesson_key in sorted(os.listdir(class_dir)):
+            lesson_dir = os.path.join(class_dir, lesson_key)
+            if not os.path.isdir(lesson_dir):
+                continue
+            for file_name in sorted(os.listdir(lesson_dir)):
+                path = os.path.join(lesson_dir, file_name)
+                if os.path.isfile(path):
+                    items.append((path, class_title, lesson_key))
+    return items
+
+
+def collect_manifest(manifest):
+    """
+    Read the items of a CSV manifest. Relative paths are relative to the manifest.
+
+    Args:
+        manifest: The path of a CSV file with 'path', 'class' and 'lesson' columns.
+
+    Returns:
+        list: (path, class title, lesson key) items.
+    """
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, newline="", encoding="utf-8") as rows:
+        return [
+            (os.path.join(base, row["path"]), row["class"].strip(), row["lesson"].strip())
+            for row in csv.DictReader(rows)
+        ]
+
+
+def prepare_file(path):
+    """
+    Hash a file and compress it when worth it. Runs in the import process pool.
+
+    Args:
+        path: The path of the file.
+
+    Returns:
+        dict: The file's 'path', 'sha256', 'size', 'compression' codec and the path
+        of the 'compressed' temporary copy (None when stored as it is).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(COMPRESSION_CHUNK_SIZE), b""):
+            digest.update(chunk)
+        codec = choose_codec(source)
+        compressed = None
+        if codec:
+            stream = compressor(codec)
+            source.seek(0)
+            with NamedTemporaryFile(suffix=".import", delete=False) as target:
+                for chunk in iter(lambda: source.read(COMPRESSION_CHUNK_SIZE), b""):
+                    target.write(stream.compress(chunk))
+                target.write(stream.flush())
+                compressed = target.name
+    return {
+        "path": path,
+        "sha256": digest.hexdigest(),
+        "size": os.path.getsize(path),
+        "compression": codec,
+        "compressed": compressed,
+    }
+
+
+def lesson_index(items):
+    """
+    Load the lessons the items may be linked to, in a single query.
+
+    Returns:
+        dict: Lesson ids by (class title, lesson title) and (class title, date).
+    """
+    index = {}
+    lessons = Lesson.objects.filter(
+        english_class__title__in={class_title for path, class_title, key in items}
+    ).values_list("pk", "english_class__title", "title", "start_time")
+    for pk, class_title, title, start_time in lessons.order_by("start_time"):
+        index.setdefault((class_title, title), []).append(pk)
+        date = timezone.localtime(start_time).date().isoformat()
+        index.setdefault((class_title, date), []).append(pk)
+    return index
+
+
+def import_materials(items, workers=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import files as materials and link them to lessons.
+
+    Args:
+        items: (path, class title, lesson key) items.
+        workers: Size of the process pool; 0 prepares the files in this process.
+        batch_size: Files prepared, inserted and linked per batch.
+
+    Returns:
+        dict: Counts of 'created' and 'reused' materials, new 'links', and the
+        'skipped' items with the reason, as (path, reason) pairs.
+    """
+    report = {"created": 0, "reused": 0, "links": 0, "skipped": []}
+    index = lesson_index(items)
+    linkable = []
+    for path, class_title, lesson_key in items:
+        lesson_ids = index.get((class_title, lesson_key))
+        if not lesson_ids:
+            report["skipped"].append((path, f'no lesson "{lesson_key}" in "{class_title}"'))
+        elif not material_extension_allowed(path):
+            report["skipped"].append((path, "not an accepted material type"))
+        else:
+            linkable.append((path, lesson_ids))
+
+    if workers == 0:
+        pool = None
+        prepare = map
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        prepare = pool.map
+    try:
+        for offset in range(0, len(linkable), batch_size):
+            batch = linkable[offset:offset + batch_size]
+            prepared = list(prepare(prepare_file, [path for path, lesson_ids in batch]))
+            import_batch(batch, prepared, report)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if report["created"] or report["links"]:
+        bump_schedule_version()
+    return report
+
+
+def import_batch(batch, prepared, report):
+    """
+    Store, insert and link one batch of prepared files.
+
+    Args:
+        batch: (path, lesson ids) pairs.
+        prepared: The results of prepare_file() for the batch, in the same order.
+        report: The import report, updated in place.
+    """
+    storage = material_storage()
+    by_hash = {
+        material.sha256: material
+        for material in Material.objects.filter(
+            sha256__in={details["sha256"] for details in prepared}
+        ).only("pk", "sha256")
+    }
+    new_materials = []
+    stored_names = []
+    try:
+        for details in prepared:
+            if details["sha256"] in by_hash:
+                if details["compressed"]:
+                    os.unlink(details["compressed"])
+                continue
+            title = os.path.basename(details["path"])
+            material = Material(
+                title=title,
+                type="file",
+                sha256=details["sha256"],
+                size=details["size"],
+                compression=details["compression"],
+            )
+            source = details["compressed"] or details["path"]
+            try:
+                with open(source, "rb") as stored:
+                    material.file.name = storage.save(
+                        material.file.field.generate_filename(material, title), File(stored)
+                    )
+                stored_names.append(material.file.name)
+            finally:
+                if details["compressed"]:
+                    os.unlink(details["compressed"])
+            by_hash[details["sha256"]] = material
+            new_materials.append(material)
+
+        Through = Material.lessons.through
+        links = {
+            (lesson_id, details["sha256"])
+            for (path, lesson_ids), details in zip(batch, prepared)
+            for lesson_id in lesson_ids
+        }
+        with transaction.atomic():
+            Material.objects.bulk_create(new_materials)
+            existing = set(
+                Through.objects.filter(
+                    material_id__in=[material.pk for material in by_hash.values()]
+                ).values_list("lesson_id", "material_id")
+            )
+            rows = [
+                Through(lesson_id=lesson_id, material_id=by_hash[sha256].pk)
+                for lesson_id, sha256 in sorted(links)
+                if (lesson_id, by_hash[sha256].pk) not in existing
+            ]
+            Through.objects.bulk_create(rows, ignore_conflicts=True)
+            Lesson.objects.filter(pk__in={row.lesson_id for row in rows}).update(
+                updated_at=timezone.now()
+            )
+    except Exception:
+        # The files of a batch that was not saved would never be referenced
+        for name in stored_names:
+            storage.delete(name)
+        raise
+    report["created"] += len(new_materials)
+    report["reused"] += len(prepared) - len(new_materials)
+    report["links"] += len(rows)
+
+
+def run_queued_imports():
+    """
+    Run the pending MaterialImports queued from the class admin, one at a time.
+    Each import is claimed first, so several workers can share the queue.
+
+    Returns:
+        int: The number of imports run.
+    """
+    root = settings.MATERIAL_IMPORT_ROOT
+    pending = list(
+        MaterialImport.objects.filter(status="pending").order_by("id").values_list("pk", flat=True)
+    )
+    run = 0
+    for pk in pending:
+        claimed = MaterialImport.objects.filter(pk=pk, status="pending").update(
+            status="processing"
+        )
+        if not claimed:
+            continue
+        material_import = MaterialImport.objects.get(pk=pk)
+        try:
+            report = import_materials(collect_directory(root, set(material_import.class_titles)))
+            status = "done"
+        except Exception as error:
+            report, status = {"error": str(error)[:500]}, "failed"
+        MaterialImport.objects.filter(pk=pk).update(
+            status=status, report=report, finished_at=timezone.now()
+        )
+        run += 1
+    return run
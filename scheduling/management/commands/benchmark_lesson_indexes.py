@@ -0,0 +1,197 @@
+# scheduling/management/commands/benchmark_lesson_indexes.py
+
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from scheduling.models import EnglishClass, Lesson, Schedule
+
+User = get_user_model()
+
+
+class RollBack(Exception):
+    """Raised to discard the generated dataset at the end of the benchmark."""
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the lesson, schedule and user access paths with and without
+    their indexes.
+
+    A dataset is generated inside a transaction, the indexes added by the
+    index migrations are dropped to measure the "before" plans and timings,
+    re-created to measure the "after" ones, and everything is rolled back,
+    so the command leaves the database untouched.
+
+    Usage:
+        python manage.py benchmark_lesson_indexes --lessons 100000
+    """
+    help = "Compare query plans and timings of lesson queries with and without indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lessons", type=int, default=100000)
+        parser.add_argument("--classes", type=int, default=200)
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        try:
+            with transaction.atomic():
+                self.generate(options["lessons"], options["classes"], options["users"])
+                indexed = [
+                    (model, index)
+                    for model in (Lesson, Schedule, User)
+                    for index in model._meta.indexes
+                ]
+                # The statements are run directly, as SQLite does not allow a schema
+                # editor inside a transaction
+                editor = connection.schema_editor(atomic=False)
+                with connection.cursor() as cursor:
+                    for model, index in indexed:
+                        cursor.execute(str(index.remove_sql(model, editor)))
+                before = self.measure(options["repeat"])
+                with connection.cursor() as cursor:
+                    for model, index in indexed:
+                        cursor.execute(str(index.create_sql(model, editor)))
+                after = self.measure(options["repeat"])
+                self.report(before, after)
+                raise RollBack
+        except RollBack:
+            self.stdout.write("Generated data rolled back.")
+
+    def generate(self, lesson_count, class_count, user_count):
+        """Bulk-creates users, classes with schedules and lessons."""
+        started = time.perf_counter()
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench-user-{number}",
+                    password="!",
+                    is_teacher=number % 10 == 0,
+                    is_student=number % 10 != 0,
+                )
+                for number in range(user_count)
+            ],
+            batch_size=2000,
+        )
+        teachers = [user for user in users if user.is_teacher]
+        students = [user for user in users if user.is_student]
+        classes = EnglishClass.objects.bulk_create(
+            [
+                EnglishClass(
+                    title=f"Bench class {number}",
+                    description="",
+                    color=f"hsl({number % 360}, 100%, 30%)",
+                    teacher=random.choice(teachers),
+                )
+                for number in range(class_count)
+            ]
+        )
+        enrollments = [
+            EnglishClass.students.through(englishclass_id=english_class.pk, user_id=student.pk)
+            for english_class in classes
+            for student in random.sample(students, k=min(15, len(students)))
+        ]
+        EnglishClass.students.through.objects.bulk_create(enrollments, batch_size=5000)
+
+        first_day = datetime.date(2020, 1, 1)
+        Schedule.objects.bulk_create(
+            [
+                Schedule(
+                    english_class=english_class,
+                    term=f"Term {number}",
+                    start_date=first_day + datetime.timedelta(days=30 * (number % 60)),
+                    end_date=first_day + datetime.timedelta(days=30 * (number % 60) + 90),
+                )
+                for number, english_class in enumerate(classes)
+            ]
+        )
+
+        start = timezone.make_aware(datetime.datetime(2020, 1, 1, 9))
+        lessons = []
+        per_class = {}
+        for number in range(lesson_count):
+            english_class = classes[number % class_count]
+            position = per_class.get(english_class.pk, 0) + 1
+            per_class[english_class.pk] = position
+            start_time = start + datetime.timedelta(
+                days=position * 2, hours=random.randint(0, 8)
+            )
+            lessons.append(
+                Lesson(
+                    english_class=english_class,
+                    title=f"Lesson {position}",
+                    start_time=start_time,
+                    end_time=start_time + datetime.timedelta(hours=1),
+                    status=random.choice(["planned", "planned", "completed", "cancelled"]),
+                    sequence_number=position,
+                )
+            )
+        Lesson.objects.bulk_create(lessons, batch_size=5000)
+        self.analyze()
+        self.stdout.write(
+            f"Generated {len(users)} users, {len(classes)} classes and "
+            f"{len(lessons)} lessons in {time.perf_counter() - started:.1f}s."
+        )
+
+    def analyze(self):
+        """Refreshes the planner statistics."""
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def queries(self):
+        """Returns the benchmarked querysets, by name."""
+        lessons = Lesson.objects.aggregate(last=Max("start_time"))
+        middle = lessons["last"] - datetime.timedelta(days=180)
+        english_class = EnglishClass.objects.order_by("pk").first()
+        day = datetime.date(2022, 1, 1)
+        return {
+            "feed window (one month)": Lesson.objects.filter(
+                start_time__lt=middle + datetime.timedelta(days=31), end_time__gt=middle
+            ),
+            "class lessons by start": Lesson.objects.filter(
+                english_class=english_class
+            ).order_by("start_time"),
+            "upcoming planned lessons": english_class.lessons.filter(
+                start_time__gt=middle, status="planned"
+            ),
+            "class lesson totals": Lesson.objects.filter(
+                start_time__lt=middle + datetime.timedelta(days=7), end_time__gt=middle
+            ).with_class_total(),
+            "terms running on a day": Schedule.objects.filter(
+                start_date__lte=day, end_date__gte=day
+            ),
+            "teacher roster": User.objects.filter(is_teacher=True).values("id", "username"),
+        }
+
+    def measure(self, repeat):
+        """Returns the plan and mean duration (ms) of every benchmarked query."""
+        self.analyze()
+        results = {}
+        for name, queryset in self.queries().items():
+            plan = queryset.explain()
+            started = time.perf_counter()
+            for _ in range(repeat):
+                # Only primary keys are fetched, to time the database rather than the ORM
+                list(queryset.values_list("pk"))
+            results[name] = (plan, (time.perf_counter() - started) * 1000 / repeat)
+        return results
+
+    def report(self, before, after):
+        """Writes the plans and timings side by side."""
+        for name in before:
+            plan_before, time_before = before[name]
+            plan_after, time_after = after[name]
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  before: {time_before:8.2f} ms")
+            self.stdout.write("    " + plan_before.replace("\n", "\n    "))
+            self.stdout.write(f"  after:  {time_after:8.2f} ms")
+            self.stdout.write("    " + plan_after.replace("\n", "\n    "))
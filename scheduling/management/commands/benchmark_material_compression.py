@@ -0,0 +1,138 @@
+# scheduling/management/commands/benchmark_material_compression.py
+
+import io
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from scheduling.compression import (
+    COMPRESSION_CHUNK_SIZE,
+    available_codecs,
+    choose_codec,
+    compressor,
+    open_decompressed,
+)
+from scheduling.models import Material
+
+WORDS = (
+    "lesson student teacher grammar vocabulary reading listening exercise present "
+    "past future perfect continuous the a an of to in is are was were have has"
+).split()
+
+
+class Command(BaseCommand):
+    """
+    Measure the storage saved by material compression and its read-time cost.
+
+    Every sample is compressed in memory with each available codec; the report
+    gives the stored size with the probe's choice (what uploads and
+    compress_materials would store), the size with each codec forced, and the
+    time to read the samples back raw and through the decompressing readers.
+    Nothing is written to the database or the storage.
+
+    Usage:
+        python manage.py benchmark_material_compression --limit 200
+        python manage.py benchmark_material_compression --synthetic 50
+    """
+    help = "Report storage saved and read-time cost of material compression."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Materials to sample.")
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Benchmark this many generated documents instead of stored materials.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        codecs = available_codecs()
+        if not codecs:
+            self.stdout.write("Compression is turned off (MATERIAL_COMPRESSION_CODECS).")
+            return
+        if options["synthetic"]:
+            random.seed(options["seed"])
+            samples = self.generate(options["synthetic"])
+        else:
+            samples = self.load(options["limit"])
+        if not samples:
+            self.stdout.write("No materials to sample; try --synthetic.")
+            return
+
+        raw_size = sum(len(sample) for sample in samples)
+        raw_time = self.time_reads(
+            [lambda sample=sample: io.BytesIO(sample) for sample in samples], options["repeat"]
+        )
+        self.stdout.write(
+            f"{len(samples)} samples, {filesizeformat(raw_size)} raw; "
+            f"raw read {raw_time:.1f} ms"
+        )
+
+        chosen = [choose_codec(io.BytesIO(sample)) for sample in samples]
+        for codec in ["probe"] + codecs:
+            compressed = []
+            for sample, choice in zip(samples, chosen):
+                used = choice if codec == "probe" else codec
+                compressed.append((used, self.compress(sample, used) if used else sample))
+            stored = sum(len(data) for used, data in compressed)
+            read_time = self.time_reads(
+                [
+                    lambda used=used, data=data: (
+                        open_decompressed(io.BytesIO(data), used) if used else io.BytesIO(data)
+                    )
+                    for used, data in compressed
+                ],
+                options["repeat"],
+            )
+            label = (
+                f"probe ({sum(1 for choice in chosen if choice)} compressed)"
+                if codec == "probe" else codec
+            )
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(
+                f"  stored {filesizeformat(stored)} "
+                f"({100 * (1 - stored / raw_size):.1f}% saved), "
+                f"read {read_time:.1f} ms ({read_time - raw_time:+.1f} ms)"
+            )
+
+    def load(self, limit):
+        """Returns the bytes of up to 'limit' stored materials."""
+        samples = []
+        for material in Material.objects.with_content().order_by("pk")[:limit]:
+            stream = material.open_content()
+            if stream is not None:
+                with stream:
+                    samples.append(stream.read())
+        return samples
+
+    def generate(self, count):
+        """Returns generated documents: mostly text, some incompressible media."""
+        samples = []
+        for number in range(count):
+            size = random.randint(16, 512) * 1024
+            if number % 4 == 3:
+                samples.append(os.urandom(size))
+            else:
+                text = " ".join(random.choice(WORDS) for _ in range(size // 5))
+                samples.append(text.encode()[:size])
+        return samples
+
+    def compress(self, data, codec):
+        """Compresses bytes in memory with a codec."""
+        stream = compressor(codec)
+        return stream.compress(data) + stream.flush()
+
+    def time_reads(self, openers, repeat):
+        """Returns the mean time (ms) to read every sample in chunks."""
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for open_sample in openers:
+                with open_sample() as stream:
+                    while stream.read(COMPRESSION_CHUNK_SIZE):
+                        pass
+        return (time.perf_counter() - started) * 1000 / repeat
@@ -0,0 +1,39 @@
+# scheduling/management/commands/cleanup_upload_sessions.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduling.models import UploadSession
+from scheduling.uploads import discard_chunks
+
+
+class Command(BaseCommand):
+    """
+    Remove resumable uploads that were abandoned, and the records of completed ones.
+
+    An upload is abandoned when no chunk was received for longer than
+    MATERIAL_UPLOAD_SESSION_TTL; its stored chunks are deleted with it. Meant to
+    be run periodically, e.g. from cron.
+
+    Usage:
+        python manage.py cleanup_upload_sessions [--dry-run]
+    """
+    help = "Delete stale resumable upload sessions and their chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report what would be deleted."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - settings.MATERIAL_UPLOAD_SESSION_TTL
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        removed = 0
+        for session in stale.iterator():
+            if not options["dry_run"]:
+                discard_chunks(session)
+                session.delete()
+            removed += 1
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} upload session(s)."))
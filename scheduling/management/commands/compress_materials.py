@@ -0,0 +1,88 @@
+# scheduling/management/commands/compress_materials.py
+
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+
+from scheduling.compression import available_codecs, choose_codec, compress_file
+from scheduling.models import Material, material_storage
+
+
+class Command(BaseCommand):
+    """
+    Compress the stored files of existing materials.
+
+    Materials are processed in batches of ids. Each file is probed the same way as
+    a new upload (see scheduling/compression.py) and, when worth it, rewritten
+    compressed under a new name; the row is updated and the old file deleted once
+    the batch's transaction commits, so an interrupted run leaves every material
+    readable and can simply be started again.
+
+    Usage:
+        python manage.py compress_materials [--batch-size 100] [--dry-run]
+    """
+    help = "Compress stored material files that benefit from it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report what would be compressed."
+        )
+
+    def handle(self, *args, **options):
+        if not available_codecs():
+            self.stdout.write("Compression is turned off (MATERIAL_COMPRESSION_CODECS).")
+            return
+        pending = list(
+            Material.objects.filter(compression="")
+            .exclude(file="")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        batch_size = options["batch_size"]
+        totals = {"compressed": 0, "skipped": 0, "before": 0, "after": 0}
+        for offset in range(0, len(pending), batch_size):
+            batch = pending[offset:offset + batch_size]
+            with transaction.atomic():
+                for material in Material.objects.filter(pk__in=batch).only("pk", "file"):
+                    self.compress(material, options["dry_run"], totals)
+
+        saved = totals["before"] - totals["after"]
+        verb = "Would compress" if options["dry_run"] else "Compressed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['compressed']} material(s), skipped {totals['skipped']}: "
+            f"{filesizeformat(totals['before'])} -> {filesizeformat(totals['after'])} "
+            f"({filesizeformat(saved)} saved)."
+        ))
+
+    def compress(self, material, dry_run, totals):
+        """
+        Compress the file of one material, if the probe says it is worth it.
+        """
+        storage = material_storage()
+        old_name = material.file.name
+        with storage.open(old_name, "rb") as source:
+            codec = choose_codec(source)
+            if not codec:
+                totals["skipped"] += 1
+                return
+            size = storage.size(old_name)
+            compressed = compress_file(source, codec)
+        with compressed:
+            compressed_size = compressed.size
+            if not dry_run:
+                new_name = storage.save(
+                    material.file.field.generate_filename(material, os.path.basename(old_name)),
+                    compressed,
+                )
+                # A queryset update: the material's bytes, validators and payloads
+                # are unchanged, so the schedule version is not bumped
+                Material.objects.filter(pk=material.pk).update(
+                    file=new_name, compression=codec, size=size
+                )
+                transaction.on_commit(lambda: storage.delete(old_name))
+        totals["compressed"] += 1
+        totals["before"] += size
+        totals["after"] += compressed_size
@@ -0,0 +1,71 @@
+# scheduling/management/commands/import_materials.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.imports import (
+    IMPORT_BATCH_SIZE,
+    collect_directory,
+    collect_manifest,
+    import_materials,
+    run_queued_imports,
+)
+
+
+class Command(BaseCommand):
+    """
+    Import a directory tree or a CSV manifest of material files and link them to
+    lessons (see scheduling/imports.py for the layouts). Importing the same files
+    again reuses the stored materials and existing links. With --queued it runs
+    the imports queued from the class admin instead.
+
+    Usage:
+        python manage.py import_materials path/to/course/
+        python manage.py import_materials path/to/manifest.csv --workers 4
+        python manage.py import_materials --queued
+    """
+    help = "Bulk import material files and link them to lessons by class and title or date."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", nargs="?", help="A directory tree or a CSV manifest.")
+        parser.add_argument(
+            "--queued",
+            action="store_true",
+            help="Run the imports queued from the class admin.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes hashing and compressing files (default: one per CPU; "
+            "0 runs them in this process).",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["queued"]:
+            run = run_queued_imports()
+            self.stdout.write(self.style.SUCCESS(f"{run} queued import(s) run."))
+            return
+
+        source = options["source"]
+        if not source:
+            raise CommandError("Give a directory tree or a manifest, or --queued.")
+        if os.path.isdir(source):
+            items = collect_directory(source)
+        elif os.path.isfile(source):
+            items = collect_manifest(source)
+        else:
+            raise CommandError(f'"{source}" is neither a directory nor a manifest.')
+
+        started = time.perf_counter()
+        report = import_materials(items, options["workers"], options["batch_size"])
+        for path, reason in report["skipped"]:
+            self.stderr.write(f"Skipped {path}: {reason}.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(items)} file(s) in {time.perf_counter() - started:.1f}s: "
+            f"{report['created']} material(s) created, {report['reused']} reused, "
+            f"{report['links']} lesson link(s) added, {len(report['skipped'])} skipped."
+        ))
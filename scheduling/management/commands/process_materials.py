@@ -0,0 +1,111 @@
+# scheduling/management/commands/process_materials.py
+
+import os
+import time
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduling.cache import bump_schedule_version
+from scheduling.derivatives import extract_derivatives
+from scheduling.models import Material, material_storage
+
+
+class Command(BaseCommand):
+    """
+    Background worker generating the derivatives of uploaded materials: text,
+    previews, page counts and metadata (see scheduling/derivatives.py).
+
+    New materials are queued with processing_status "pending". The worker claims
+    them one at a time, so several workers can share the queue, stores the
+    results on the material and bumps the schedule version so cached payloads
+    pick them up. Without --once it keeps polling for new materials.
+
+    Usage:
+        python manage.py process_materials [--once] [--interval 5] [--retry-failed]
+    """
+    help = "Generate previews, text and metadata of uploaded materials."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty."
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Seconds between polls of the queue."
+        )
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--retry-failed", action="store_true", help="Queue failed materials again."
+        )
+        parser.add_argument(
+            "--requeue-stuck",
+            action="store_true",
+            help="Queue materials left 'processing' by a worker that stopped.",
+        )
+
+    def handle(self, *args, **options):
+        requeued = []
+        if options["retry_failed"]:
+            requeued.append("failed")
+        if options["requeue_stuck"]:
+            requeued.append("processing")
+        if requeued:
+            Material.objects.filter(processing_status__in=requeued).update(
+                processing_status="pending"
+            )
+
+        while True:
+            claimed = self.process_batch(options["batch_size"])
+            if claimed:
+                bump_schedule_version()
+            elif options["once"]:
+                break
+            else:
+                time.sleep(options["interval"])
+
+    def process_batch(self, batch_size):
+        """
+        Process up to batch_size pending materials.
+
+        Returns:
+            int: The number of materials found in the queue.
+        """
+        pending = list(
+            Material.objects.filter(processing_status="pending")
+            .order_by("id")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        for pk in pending:
+            # Claiming the row first keeps two workers from processing it twice
+            claimed = Material.objects.filter(pk=pk, processing_status="pending").update(
+                processing_status="processing"
+            )
+            if claimed:
+                self.process(Material.objects.get(pk=pk))
+        return len(pending)
+
+    def process(self, material):
+        """
+        Generate and store the derivatives of one material.
+        """
+        try:
+            derivatives = extract_derivatives(material)
+        except Exception as error:
+            Material.objects.filter(pk=material.pk).update(
+                processing_status="failed",
+                metadata={"error": str(error)[:500]},
+                processed_at=timezone.now(),
+            )
+            self.stderr.write(f"{material.title}: {error}")
+            return
+
+        thumbnail = derivatives.pop("thumbnail")
+        if thumbnail:
+            stem = os.path.splitext(material.title)[0] or "preview"
+            name = material.preview.field.generate_filename(material, f"{stem}.jpg")
+            derivatives["preview"] = material_storage().save(name, ContentFile(thumbnail))
+        Material.objects.filter(pk=material.pk).update(
+            processing_status="done", processed_at=timezone.now(), **derivatives
+        )
+        self.stdout.write(f"Processed {material.title}.")
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+def number_existing_lessons(apps, schema_editor):
+    """Store the position of every existing lesson within its class."""
+    Lesson = apps.get_model("scheduling", "Lesson")
+    positions = {}
+    changed = []
+    lessons = Lesson.objects.order_by("english_class_id", "start_time", "pk").only(
+        "pk", "english_class_id"
+    )
+    for lesson in lessons.iterator(chunk_size=2000):
+        position = positions.get(lesson.english_class_id, 0) + 1
+        positions[lesson.english_class_id] = position
+        lesson.sequence_number = position
+        changed.append(lesson)
+        if len(changed) >= 2000:
+            Lesson.objects.bulk_update(changed, ["sequence_number"])
+            changed = []
+    Lesson.objects.bulk_update(changed, ["sequence_number"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0009_delete_googlecalendarevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='sequence_number',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Sequence Number'),
+        ),
+        migrations.RunPython(number_existing_lessons, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['english_class', 'start_time'], name='lesson_class_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['end_time', 'start_time'], name='lesson_time_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(('status', 'planned')), fields=['english_class', 'start_time'], name='lesson_class_planned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['start_date', 'end_date'], name='schedule_date_range_idx'),
+        ),
+    ]
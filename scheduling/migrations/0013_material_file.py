@@ -0,0 +1,19 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:48
+
+from django.db import migrations, models
+import scheduling.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0012_lesson_schedule_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, storage=scheduling.models.material_storage, upload_to='materials/%Y/%m/', verbose_name='File'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:52
+
+from django.core.files.base import ContentFile
+from django.db import migrations, transaction
+
+# Materials moved per transaction; only this many blobs are held in memory at once
+BATCH_SIZE = 20
+
+
+def move_content_to_storage(apps, schema_editor):
+    """Write every in-database blob to the materials storage and clear the column."""
+    Material = apps.get_model("scheduling", "Material")
+    pending = list(
+        Material.objects.filter(content__isnull=False, file="")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    for offset in range(0, len(pending), BATCH_SIZE):
+        batch = pending[offset:offset + BATCH_SIZE]
+        with transaction.atomic():
+            for material in Material.objects.filter(pk__in=batch).only("pk", "title", "content"):
+                material.file.save(
+                    material.title or f"material-{material.pk}",
+                    ContentFile(bytes(material.content)),
+                    save=False,
+                )
+                material.content = None
+                material.save(update_fields=["file", "content"])
+
+
+def move_content_to_database(apps, schema_editor):
+    """Read every stored file back into the content column."""
+    Material = apps.get_model("scheduling", "Material")
+    pending = list(
+        Material.objects.exclude(file="").order_by("pk").values_list("pk", flat=True)
+    )
+    for offset in range(0, len(pending), BATCH_SIZE):
+        batch = pending[offset:offset + BATCH_SIZE]
+        with transaction.atomic():
+            for material in Material.objects.filter(pk__in=batch).only("pk", "file"):
+                with material.file.open("rb") as stored:
+                    material.content = stored.read()
+                material.file.delete(save=False)
+                material.save(update_fields=["file", "content"])
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so a large table is not moved in one transaction
+    atomic = False
+
+    dependencies = [
+        ('scheduling', '0013_material_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_content_to_storage, move_content_to_database),
+    ]
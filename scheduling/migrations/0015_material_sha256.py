@@ -0,0 +1,48 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:50
+
+import hashlib
+
+from django.db import migrations, models
+
+# Materials hashed per query; files are read in chunks, so memory stays bounded
+BATCH_SIZE = 100
+
+
+def hash_materials(apps, schema_editor):
+    """Store the SHA-256 digest of every existing material's file or content."""
+    Material = apps.get_model("scheduling", "Material")
+    pending = list(Material.objects.filter(sha256="").order_by("pk").values_list("pk", flat=True))
+    for offset in range(0, len(pending), BATCH_SIZE):
+        batch = pending[offset:offset + BATCH_SIZE]
+        for material in Material.objects.filter(pk__in=batch).only("pk", "file", "content"):
+            digest = hashlib.sha256()
+            if material.file:
+                with material.file.open("rb") as stored:
+                    for chunk in stored.chunks():
+                        digest.update(chunk)
+            elif material.content:
+                digest.update(bytes(material.content))
+            else:
+                continue
+            material.sha256 = digest.hexdigest()
+            material.save(update_fields=["sha256"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0014_move_material_content_to_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['sha256'], name='material_sha256_idx'),
+        ),
+        migrations.RunPython(hash_materials, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0016_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='compression',
+            field=models.CharField(blank=True, choices=[('', 'None'), ('zlib', 'zlib'), ('zstd', 'Zstandard')], default='', max_length=10, verbose_name='Compression'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Size'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.9 on 2026-10-18 08:02
+
+from django.db import migrations, models
+import scheduling.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0017_material_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='extracted_text',
+            field=models.TextField(blank=True, verbose_name='Extracted Text'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Metadata'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Page Count'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='preview',
+            field=models.FileField(blank=True, max_length=255, storage=scheduling.models.material_storage, upload_to='previews/%Y/%m/', verbose_name='Preview'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='preview_text',
+            field=models.CharField(blank=True, max_length=400, verbose_name='Preview Text'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processed At'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Processing Status'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(condition=models.Q(('processing_status', 'pending')), fields=['id'], name='material_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.9 on 2026-10-18 08:13
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0018_material_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='recurrence_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Recurrence Date'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='schedule',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_lessons', to='scheduling.schedule', verbose_name='Schedule'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='excluded_dates',
+            field=models.JSONField(blank=True, default=list, verbose_name='Excluded Dates'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='lesson_duration',
+            field=models.DurationField(default=datetime.timedelta(seconds=3600), verbose_name='Lesson Duration'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='lesson_start',
+            field=models.TimeField(blank=True, null=True, verbose_name='Lesson Start'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='recurrence',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Recurrence'),
+        ),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('schedule', 'recurrence_date'), name='lesson_schedule_occurrence_unique'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-18 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0019_schedule_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['english_class', 'end_time', 'start_time'], name='lesson_class_end_idx'),
+        ),
+    ]
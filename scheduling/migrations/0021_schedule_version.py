@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0020_lesson_conflict_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Schedule Version',
+                'verbose_name_plural': 'Schedule Versions',
+            },
+        ),
+    ]
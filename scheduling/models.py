@@ -1,10 +1,17 @@
 # scheduling/models.py
 
+import datetime
 import hashlib
-from django.db import models
+import io
+import uuid
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
 from django.conf import settings
+from django.core.files.storage import storages
 from django.utils import timezone
 
+from .compression import choose_codec, compress_file, open_decompressed
+
 
 def generate_hsl_color(unique_identifier, saturation=100, lightness=30):
     """
@@ -54,6 +61,7 @@ class EnglishClass(models.Model):
         marked as teachers.
         students (models.ManyToManyField): A many-to-many relationship to the User model for
         users marked as students.
+        updated_at (models.DateTimeField): When the class or its enrollments last changed.
     """
     title = models.CharField(max_length=255, verbose_name="Title")
     description = models.TextField(verbose_name="Description")
@@ -71,6 +79,7 @@ class EnglishClass(models.Model):
         limit_choices_to={"is_student": True},
         verbose_name="Students",
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
 
     class Meta:
         app_label = 'scheduling'
@@ -112,6 +121,13 @@ class Schedule(models.Model):
         term (models.CharField): The term during which this class is scheduled (e.g., Spring 2024).
         start_date (models.DateField): The start date of the class.
         end_date (models.DateField): The end date of the class.
+        recurrence (models.CharField): An RRULE-style rule the term's lessons follow, e.g.
+        "FREQ=WEEKLY;BYDAY=MO,WE,FR" (see scheduling/recurrence.py). Empty when the
+        lessons are created one by one.
+        lesson_start (models.TimeField): The local time generated lessons start at.
+        lesson_duration (models.DurationField): How long generated lessons last.
+        excluded_dates (models.JSONField): Dates ("YYYY-MM-DD") the rule skips, e.g. holidays.
+        updated_at (models.DateTimeField): When the schedule last changed.
     """
     english_class = models.ForeignKey(
         EnglishClass,
@@ -122,10 +138,21 @@ class Schedule(models.Model):
     term = models.CharField(max_length=100, verbose_name="Term")
     start_date = models.DateField(verbose_name="Start Date")
     end_date = models.DateField(verbose_name="End Date")
+    recurrence = models.CharField(max_length=255, blank=True, verbose_name="Recurrence")
+    lesson_start = models.TimeField(blank=True, null=True, verbose_name="Lesson Start")
+    lesson_duration = models.DurationField(
+        default=datetime.timedelta(hours=1), verbose_name="Lesson Duration"
+    )
+    excluded_dates = models.JSONField(default=list, blank=True, verbose_name="Excluded Dates")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
 
     class Meta:
         verbose_name = "Schedule"
         verbose_name_plural = "Schedules"
+        indexes = [
+            # Which terms are running on a given date
+            models.Index(fields=["start_date", "end_date"], name="schedule_date_range_idx"),
+        ]
 
     def schedule_duration(self):
         """Calculates the duration of the schedule."""
@@ -140,6 +167,97 @@ class Schedule(models.Model):
         return f"{self.english_class.title} Schedule"
 
 
+def renumber_lessons(english_class_ids):
+    """
+    Recompute the stored sequence numbers of every lesson of the given classes.
+
+    Meant for bulk operations (bulk_create, bulk_update, queryset updates and deletes)
+    that bypass Lesson.save() and Lesson.delete(). Only the rows whose number
+    actually changed are written back.
+
+    Args:
+    - english_class_ids: An iterable of EnglishClass primary keys.
+
+    Returns:
+    - A list of the Lesson instances whose sequence number changed.
+    """
+    changed = []
+    positions = {}
+    now = timezone.now()
+    lessons = (
+        Lesson.objects.filter(english_class_id__in=list(english_class_ids))
+        .order_by("english_class_id", "start_time", "pk")
+        .only("pk", "english_class_id", "sequence_number")
+    )
+    for lesson in lessons:
+        position = positions.get(lesson.english_class_id, 0) + 1
+        positions[lesson.english_class_id] = position
+        if lesson.sequence_number != position:
+            lesson.sequence_number = position
+            lesson.updated_at = now
+            changed.append(lesson)
+    Lesson.objects.bulk_update(changed, ["sequence_number", "updated_at"], batch_size=500)
+    return changed
+
+
+def shift_lessons(lesson, delta):
+    """
+    Move a lesson and every later lesson of its class by the same amount of time.
+
+    The lessons are moved with one set-based UPDATE using F() expressions, so the
+    cost does not depend on the number of lessons. Moving them later keeps every
+    sequence number; moving them earlier may pass lessons that came before, so
+    the class is renumbered then.
+
+    Like the other bulk operations it bypasses Lesson.save(): callers bump the
+    schedule version.
+
+    Args:
+    - lesson: The first Lesson to move.
+    - delta: A datetime.timedelta, negative to move the lessons earlier.
+
+    Returns:
+    - A list of the moved lessons and of the lessons whose sequence number changed, with
+      their new 'start_time', 'end_time' and 'sequence_number', in sequence order.
+    """
+    siblings = Lesson.objects.filter(english_class_id=lesson.english_class_id)
+    with transaction.atomic():
+        siblings.filter(Q(pk=lesson.pk) | Lesson._later_than(lesson.pk, lesson.start_time)).update(
+            start_time=F("start_time") + delta,
+            end_time=F("end_time") + delta,
+            updated_at=timezone.now(),
+        )
+        if delta < datetime.timedelta(0):
+            renumber_lessons([lesson.english_class_id])
+        # Lessons passed by a series moved earlier now start after it, too
+        start_time = lesson.start_time + delta
+        return list(
+            siblings.filter(Q(pk=lesson.pk) | Lesson._later_than(lesson.pk, start_time))
+            .order_by("start_time", "pk")
+            .only("pk", "english_class_id", "status", "start_time", "end_time", "sequence_number")
+        )
+
+
+class LessonQuerySet(models.QuerySet):
+    """
+    Custom queryset for Lesson with helpers for building calendar titles.
+    """
+
+    def with_class_total(self):
+        """
+        Annotates each lesson with 'class_lessons_total', the number of lessons
+        in its class, so that "(n/total)" titles need no extra queries.
+        """
+        class_lessons = (
+            Lesson.objects.filter(english_class=OuterRef("english_class"))
+            .order_by()
+            .values("english_class")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return self.annotate(class_lessons_total=Subquery(class_lessons))
+
+
 class Lesson(models.Model):
     """
     Represents an individual lesson associated with an EnglishClass, detailing the lesson's timing,
@@ -154,6 +272,14 @@ class Lesson(models.Model):
         meeting_link (models.URLField): An optional link for online lessons.
         location (models.CharField): The location of the lesson, either on-site or online.
         status (models.CharField): The current status of the lesson (planned, completed, cancelled).
+        sequence_number (models.PositiveIntegerField): The position of the lesson within its
+        class, ordered by start time. Maintained automatically on save and delete.
+        schedule (models.ForeignKey): The schedule whose recurrence rule generated the
+        lesson, if any.
+        recurrence_date (models.DateField): The occurrence of the rule the lesson stands for,
+        which stays the same when the lesson itself is moved.
+        updated_at (models.DateTimeField): When the lesson, its position or its materials
+        last changed.
     """
     english_class = models.ForeignKey(
         EnglishClass,
@@ -184,10 +310,122 @@ class Lesson(models.Model):
     status = models.CharField(
         max_length=10, choices=STATUS_CHOICES, default="planned", verbose_name="Status"
     )
+    sequence_number = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Sequence Number"
+    )
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name="generated_lessons",
+        verbose_name="Schedule",
+    )
+    recurrence_date = models.DateField(
+        blank=True, null=True, editable=False, verbose_name="Recurrence Date"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
+
+    objects = LessonQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Lesson"
         verbose_name_plural = "Lessons"
+        indexes = [
+            # Per-class ordering, numbering and totals
+            models.Index(fields=["english_class", "start_time"], name="lesson_class_start_idx"),
+            # Date-window (calendar feed) and overlap queries. Leading with end_time lets
+            # "end_time > window start" skip the whole lesson history before the window.
+            models.Index(fields=["end_time", "start_time"], name="lesson_time_range_idx"),
+            # Double-booking checks: the lessons of given classes overlapping a time window
+            models.Index(
+                fields=["english_class", "end_time", "start_time"], name="lesson_class_end_idx"
+            ),
+            # Upcoming lessons of a class: only planned lessons are ever looked up
+            models.Index(
+                fields=["english_class", "start_time"],
+                condition=Q(status="planned"),
+                name="lesson_class_planned_idx",
+            ),
+        ]
+        constraints = [
+            # One lesson per occurrence of a schedule's rule; also serves tail lookups
+            models.UniqueConstraint(
+                fields=["schedule", "recurrence_date"], name="lesson_schedule_occurrence_unique"
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the lesson and keeps the sequence numbers of its class in order.
+
+        Only the lessons between the old and the new position are shifted, with
+        set-based updates, so creating or moving a lesson does not depend on the
+        number of lessons in the class.
+        """
+        start_time = self._meta.get_field("start_time").to_python(self.start_time)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    Lesson.objects.filter(pk=self.pk)
+                    .values("english_class_id", "start_time")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if previous == {"english_class_id": self.english_class_id, "start_time": start_time}:
+                return
+            if previous:
+                self._leave_sequence(
+                    self.pk, previous["english_class_id"], previous["start_time"]
+                )
+            self._join_sequence(start_time)
+
+    def delete(self, *args, **kwargs):
+        """Deletes the lesson and closes the gap it leaves in its class sequence."""
+        pk, start_time = self.pk, self.start_time
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._leave_sequence(pk, self.english_class_id, start_time)
+        return result
+
+    @staticmethod
+    def _later_than(pk, start_time):
+        """Returns a filter matching lessons ordered after the given (start_time, pk)."""
+        return Q(start_time__gt=start_time) | Q(start_time=start_time, pk__gt=pk)
+
+    def _leave_sequence(self, pk, english_class_id, start_time):
+        """Moves the lessons that followed this one in a class one position up."""
+        Lesson.objects.filter(english_class_id=english_class_id).exclude(pk=pk).filter(
+            self._later_than(pk, start_time)
+        ).update(sequence_number=F("sequence_number") - 1, updated_at=timezone.now())
+
+    def _join_sequence(self, start_time):
+        """Inserts this lesson into its class sequence and shifts the following lessons."""
+        siblings = Lesson.objects.filter(english_class_id=self.english_class_id).exclude(
+            pk=self.pk
+        )
+        later = self._later_than(self.pk, start_time)
+        position = siblings.exclude(later).count() + 1
+        siblings.filter(later).update(
+            sequence_number=F("sequence_number") + 1, updated_at=timezone.now()
+        )
+        Lesson.objects.filter(pk=self.pk).update(sequence_number=position)
+        self.sequence_number = position
+
+    @property
+    def ordinal_label(self):
+        """
+        Returns the "n/total" position of the lesson within its class.
+
+        Uses the 'class_lessons_total' annotation when the lesson was loaded through
+        LessonQuerySet.with_class_total(), and falls back to a count query otherwise.
+        """
+        total = getattr(self, "class_lessons_total", None)
+        if total is None:
+            total = self.english_class.lessons.count()
+        return f"{self.sequence_number}/{total}"
 
     def is_upcoming(self):
         """Checks if the lesson is upcoming."""
@@ -209,6 +447,102 @@ class Lesson(models.Model):
         return self.title
 
 
+def file_sha256(file):
+    """
+    Compute the SHA-256 digest of an uploaded or stored file, chunk by chunk.
+    Files received through MaterialUploadHandler were hashed while uploading.
+
+    Args:
+    - file: A Django File (e.g. an UploadedFile or a FieldFile).
+
+    Returns:
+    - The hexadecimal digest.
+    """
+    if getattr(file, "sha256", None):
+        return file.sha256
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def material_storage():
+    """
+    Return the storage backend of material files, configured as STORAGES["materials"].
+    """
+    return storages["materials"]
+
+
+class MaterialQuerySet(models.QuerySet):
+    """
+    Custom queryset for Material with content-addressed lookups.
+    """
+
+    def with_content(self):
+        """
+        Loads the large columns that MaterialManager defers (see
+        Material.DEFERRED_FIELDS), for the rare callers that need the bytes.
+        """
+        return self.defer(None)
+
+    def for_uploads(self, files):
+        """
+        Returns one material per uploaded file, reusing materials with identical
+        content. Existing materials are found with a single 'sha256' lookup for
+        the whole batch; only files with new content are written to storage.
+
+        Args:
+        - files: Uploaded files, e.g. request.FILES.getlist("new_materials").
+
+        Returns:
+        - A list of materials, in the order of the files, without duplicates.
+        """
+        uploads = {}
+        for file in files:
+            if file:
+                uploads.setdefault(file_sha256(file), file)
+        existing = {
+            material.sha256: material
+            for material in self.filter(sha256__in=uploads).order_by("-pk")
+        }
+        materials = []
+        for sha256, file in uploads.items():
+            material = existing.get(sha256)
+            if material is None:
+                material = self.create_compressed(file, sha256)
+            materials.append(material)
+        return materials
+
+    def create_compressed(self, file, sha256):
+        """
+        Creates a material from an uploaded file, compressed in storage when a
+        probe shows it is worth it (see scheduling/compression.py).
+
+        Args:
+        - file: The uploaded file.
+        - sha256: The digest of the file's (uncompressed) bytes.
+
+        Returns:
+        - The new material.
+        """
+        material = self.model(title=file.name, type="file")
+        material.store_file(file, sha256)
+        material.save(using=self.db)
+        return material
+
+
+class MaterialManager(models.Manager.from_queryset(MaterialQuerySet)):
+    """
+    Default manager of Material. Listing a material (a title in a form, the admin
+    changelist, a lesson payload) never needs its in-database bytes, so the large
+    columns are deferred unless the queryset opts in with with_content().
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self.model.DEFERRED_FIELDS)
+
+
 class Material(models.Model):
     """
     Represents educational materials associated with lessons, including type and content.
@@ -216,12 +550,79 @@ class Material(models.Model):
     Attributes:
         title (models.CharField): The title of the material.
         type (models.CharField): The type of material (e.g., book, video, article).
-        content (models.BinaryField): The binary content of the material, suitable for file storage.
+        file (models.FileField): The material's file, kept in the materials storage backend.
+        sha256 (models.CharField): SHA-256 digest of the material's bytes, used to
+        store identical uploads once.
+        size (models.BigIntegerField): Size of the material's bytes, before compression.
+        compression (models.CharField): Codec the stored file is compressed with, if any.
+        processing_status (models.CharField): Progress of the background generation of
+        the derivatives below (see the process_materials command).
+        preview (models.FileField): A small thumbnail of images.
+        preview_text (models.CharField): The beginning of the material's text.
+        page_count (models.PositiveIntegerField): Pages of documents, slides of presentations.
+        metadata (models.JSONField): Content type, size, word count, image dimensions.
+        extracted_text (models.TextField): The material's plain text. Deferred by the
+        default manager.
+        processed_at (models.DateTimeField): When the derivatives were generated.
+        content (models.BinaryField): Legacy in-database content. New materials keep their
+        bytes in 'file'; use 'open_content' to read either. Deferred by the default manager.
         lessons (models.ManyToManyField): Lessons that utilize this material.
+        updated_at (models.DateTimeField): When the material last changed.
     """
     title = models.CharField(max_length=255, verbose_name="Title")
     type = models.CharField(max_length=100, verbose_name="Type")
+    file = models.FileField(
+        upload_to="materials/%Y/%m/",
+        storage=material_storage,
+        blank=True,
+        max_length=255,
+        verbose_name="File",
+    )
+    sha256 = models.CharField(max_length=64, blank=True, verbose_name="SHA-256")
+    size = models.BigIntegerField(null=True, blank=True, verbose_name="Size")
+    COMPRESSION_CHOICES = [
+        ("", "None"),
+        ("zlib", "zlib"),
+        ("zstd", "Zstandard"),
+    ]
+    compression = models.CharField(
+        max_length=10,
+        choices=COMPRESSION_CHOICES,
+        blank=True,
+        default="",
+        verbose_name="Compression",
+    )
+    PROCESSING_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    processing_status = models.CharField(
+        max_length=10,
+        choices=PROCESSING_CHOICES,
+        default="pending",
+        verbose_name="Processing Status",
+    )
+    preview = models.FileField(
+        upload_to="previews/%Y/%m/",
+        storage=material_storage,
+        blank=True,
+        max_length=255,
+        verbose_name="Preview",
+    )
+    preview_text = models.CharField(max_length=400, blank=True, verbose_name="Preview Text")
+    page_count = models.PositiveIntegerField(null=True, blank=True, verbose_name="Page Count")
+    metadata = models.JSONField(default=dict, blank=True, verbose_name="Metadata")
+    extracted_text = models.TextField(blank=True, verbose_name="Extracted Text")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Processed At")
     content = models.BinaryField(blank=True, null=True, verbose_name="Content")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
+
+    # Columns left out of every query unless asked for with with_content()
+    DEFERRED_FIELDS = ("content", "extracted_text")
+
+    objects = MaterialManager()
 
     lessons = models.ManyToManyField(
         Lesson, related_name="materials", verbose_name="Lessons"
@@ -230,6 +631,66 @@ class Material(models.Model):
     class Meta:
         verbose_name = "Material"
         verbose_name_plural = "Materials"
+        indexes = [
+            # Finding an identical, already stored upload
+            models.Index(fields=["sha256"], name="material_sha256_idx"),
+            # The queue of the process_materials worker
+            models.Index(
+                fields=["id"],
+                condition=Q(processing_status="pending"),
+                name="material_pending_idx",
+            ),
+        ]
+
+    def open_content(self):
+        """
+        Opens the material's bytes for reading, from storage or legacy in-database content.
+
+        Returns:
+        - A binary file-like object, or None if the material has no content.
+        """
+        if self.file:
+            stored = self.file.open("rb")
+            if self.compression:
+                return open_decompressed(stored, self.compression)
+            return stored
+        if self.content:
+            return io.BytesIO(bytes(self.content))
+        return None
+
+    def store_file(self, file, sha256=None):
+        """
+        Writes an uploaded file to storage as the material's bytes, compressed when a
+        probe shows it is worth it (see scheduling/compression.py), and records its
+        digest, size and codec. The derivatives are queued to be generated again.
+        The material itself is not saved.
+
+        Args:
+        - file: The uploaded file.
+        - sha256: The digest of the file's (uncompressed) bytes; computed if not given.
+        """
+        sha256 = sha256 or file_sha256(file)
+        codec = choose_codec(file)
+        stored = compress_file(file, codec) if codec else file
+        try:
+            self.file.save(file.name, stored, save=False)
+        finally:
+            if codec:
+                stored.close()
+        self.sha256 = sha256
+        self.size = file.size
+        self.compression = codec
+        self.processing_status = "pending"
+
+    def content_size(self):
+        """
+        Returns the size of the material's bytes, before any compression.
+        """
+        if self.size is not None:
+            return self.size
+        if self.file:
+            return self.file.size
+        return len(self.content) if self.content else 0
 
     def associated_classes(self):
         """Returns classes associated with the material."""
@@ -241,3 +702,166 @@ class Material(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class UploadSession(models.Model):
+    """
+    A resumable, chunked upload of a material file (see scheduling/uploads.py).
+
+    The client declares the file's name and size, sends numbered chunks of
+    'chunk_size' bytes in any order (re-sending a chunk replaces it), and
+    finally completes the session, which assembles the chunks into a Material.
+
+    Attributes:
+        id (models.UUIDField): Unguessable identifier used in the upload URLs.
+        owner (models.ForeignKey): The user uploading the file.
+        file_name (models.CharField): The name of the uploaded file.
+        size (models.BigIntegerField): The declared size of the file in bytes.
+        chunk_size (models.PositiveIntegerField): The size of every chunk but the last.
+        material (models.ForeignKey): The Material created on completion.
+        created_at (models.DateTimeField): When the upload started.
+        updated_at (models.DateTimeField): When a chunk was last received.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+        verbose_name="Owner",
+    )
+    file_name = models.CharField(max_length=255, verbose_name="File Name")
+    size = models.BigIntegerField(verbose_name="Size")
+    chunk_size = models.PositiveIntegerField(verbose_name="Chunk Size")
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload_sessions",
+        verbose_name="Material",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
+
+    class Meta:
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
+
+    @property
+    def chunk_count(self):
+        """Returns the number of chunks the file is split into."""
+        return max(-(-self.size // self.chunk_size), 1)
+
+    @property
+    def is_complete(self):
+        """Returns whether the upload was assembled into a Material."""
+        return self.material_id is not None
+
+    def expected_chunk_size(self, index):
+        """
+        Returns the size in bytes the chunk with the given index must have.
+        """
+        if index < self.chunk_count - 1:
+            return self.chunk_size
+        return self.size - self.chunk_size * (self.chunk_count - 1)
+
+    def chunk_name(self, index):
+        """
+        Returns the name of a chunk in the materials storage.
+        """
+        return f"uploads/{self.pk}/{index:06d}"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.owner})"
+
+
+class UploadChunk(models.Model):
+    """
+    A received chunk of an UploadSession, kept in the materials storage.
+
+    Attributes:
+        session (models.ForeignKey): The upload the chunk belongs to.
+        index (models.PositiveIntegerField): The position of the chunk, from 0.
+        size (models.PositiveIntegerField): The size of the chunk in bytes.
+    """
+    session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.CASCADE,
+        related_name="chunks",
+        verbose_name="Session",
+    )
+    index = models.PositiveIntegerField(verbose_name="Index")
+    size = models.PositiveIntegerField(verbose_name="Size")
+
+    class Meta:
+        verbose_name = "Upload Chunk"
+        verbose_name_plural = "Upload Chunks"
+        constraints = [
+            models.UniqueConstraint(fields=["session", "index"], name="upload_chunk_unique_index"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.index}"
+
+
+class MaterialImport(models.Model):
+    """
+    A queued import of the MATERIAL_IMPORT_ROOT folders of some classes, requested
+    from the class admin and run by "python manage.py import_materials --queued"
+    (see scheduling/imports.py).
+
+    Attributes:
+        class_titles (models.JSONField): The titles of the classes to import.
+        requested_by (models.ForeignKey): The user who queued the import.
+        status (models.CharField): Whether the import is pending, running, done or failed.
+        report (models.JSONField): The counts reported by import_materials(), or the error.
+        created_at (models.DateTimeField): When the import was queued.
+        finished_at (models.DateTimeField): When the import ended.
+    """
+    class_titles = models.JSONField(default=list, verbose_name="Class Titles")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="material_imports",
+        verbose_name="Requested By",
+    )
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="pending", verbose_name="Status"
+    )
+    report = models.JSONField(default=dict, blank=True, verbose_name="Report")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Finished At")
+
+    class Meta:
+        verbose_name = "Material Import"
+        verbose_name_plural = "Material Imports"
+
+    def __str__(self):
+        return f"{', '.join(self.class_titles)} ({self.status})"
+
+
+class ScheduleVersion(models.Model):
+    """
+    The global schedule version keying the cached schedule payloads (see
+    scheduling/cache.py). Kept in the database, in a single row, so that every
+    worker process sees a bump at once whatever the cache backend.
+
+    Attributes:
+        version (models.BigIntegerField): The current version.
+    """
+    version = models.BigIntegerField(verbose_name="Version")
+
+    class Meta:
+        verbose_name = "Schedule Version"
+        verbose_name_plural = "Schedule Versions"
+
+    def __str__(self):
+        return str(self.version)
@@ -0,0 +1,221 @@
+# scheduling/recurrence.py
+
+"""
+Recurring lessons: RFC 5545 style recurrence rules on schedules, expanded into
+lessons by generate_lessons().
+"""
+
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .conflicts import find_conflicts, serialize_conflicts
+from .models import Lesson, renumber_lessons
+
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Most occurrences a rule may expand to, against runaway rules
+MAX_OCCURRENCES = 1000
+
+
+def parse_rule(rule):
+    """
+    Parse a recurrence rule.
+
+    Args:
+        rule: The rule, e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR". An "RRULE:" prefix is allowed.
+
+    Returns:
+        dict: 'freq', 'interval', 'byday' (weekday numbers, Monday being 0),
+        'count' and 'until' (None when not set).
+
+    Raises:
+        ValueError: If the rule is malformed or uses unsupported parts.
+    """
+    rule = rule.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    parts = {}
+    for part in filter(None, rule.upper().split(";")):
+        name, separator, value = part.partition("=")
+        if not separator or not value:
+            raise ValueError(f'"{part}" is not a NAME=VALUE rule part.')
+        parts[name.strip()] = value.strip()
+
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "BYDAY", "COUNT", "UNTIL"}
+    if unsupported:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unsupported))}.")
+    if parts.get("FREQ") not in ("DAILY", "WEEKLY"):
+        raise ValueError("FREQ must be DAILY or WEEKLY.")
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        until = (
+            datetime.datetime.strptime(parts["UNTIL"][:8], "%Y%m%d").date()
+            if "UNTIL" in parts
+            else None
+        )
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be numbers and UNTIL a YYYYMMDD date.")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive.")
+    byday = []
+    for day in filter(None, parts.get("BYDAY", "").split(",")):
+        if day not in WEEKDAYS:
+            raise ValueError(f'"{day}" is not a weekday (MO, TU, WE, TH, FR, SA, SU).')
+        byday.append(WEEKDAYS.index(day))
+    return {
+        "freq": parts["FREQ"],
+        "interval": interval,
+        "byday": sorted(set(byday)),
+        "count": count,
+        "until": until,
+    }
+
+
+def occurrence_dates(schedule):
+    """
+    Expand a schedule's rule into the dates of its occurrences.
+
+    COUNT counts occurrences from the schedule's start date before the excluded
+    dates are removed, as EXDATE does in RFC 5545.
+
+    Args:
+        schedule: A Schedule with a recurrence rule.
+
+    Returns:
+        list: The dates, in order.
+    """
+    rule = parse_rule(schedule.recurrence)
+    last = min(filter(None, (schedule.end_date, rule["until"])))
+    excluded = set(schedule.excluded_dates or [])
+    start = schedule.start_date
+    dates = []
+    emitted = 0
+    day = start
+    while day <= last and emitted < (rule["count"] or MAX_OCCURRENCES):
+        if rule["freq"] == "DAILY":
+            matches = (day - start).days % rule["interval"] == 0 and (
+                not rule["byday"] or day.weekday() in rule["byday"]
+            )
+        else:
+            # Weeks start on Monday (WKST=MO) and are counted from the start date's week
+            week = ((day - start).days + start.weekday()) // 7
+            matches = week % rule["interval"] == 0 and day.weekday() in (
+                rule["byday"] or [start.weekday()]
+            )
+        if matches:
+            emitted += 1
+            if day.isoformat() not in excluded:
+                dates.append(day)
+        day += datetime.timedelta(days=1)
+    return dates
+
+
+def occurrences(schedule, from_date=None):
+    """
+    List the start and end times of a schedule's occurrences.
+
+    Args:
+        schedule: A Schedule with a recurrence rule and a lesson start time.
+        from_date: Leave out the occurrences before this date.
+
+    Returns:
+        list: (date, start time, end time) tuples, with aware datetimes.
+    """
+    tz = timezone.get_current_timezone()
+    result = []
+    for day in occurrence_dates(schedule):
+        if from_date and day < from_date:
+            continue
+        start = timezone.make_aware(datetime.datetime.combine(day, schedule.lesson_start), tz)
+        result.append((day, start, start + schedule.lesson_duration))
+    return result
+
+
+def generate_lessons(schedule, from_date=None, template=None, reschedule=True):
+    """
+    Create, move and delete the lessons of a schedule so that they match its rule.
+
+    Args:
+        schedule: A Schedule with a recurrence rule and a lesson start time.
+        from_date: Only touch the occurrences from this date on (the tail of the
+        series); the whole series when None.
+        template: A Lesson whose title, description, location and meeting link
+        are given to the lessons of the regenerated occurrences.
+        reschedule: Whether kept lessons are moved to the rule's times; when
+        False, lessons moved by hand stay where they are.
+
+    Returns:
+        dict: The numbers of 'created', 'updated' and 'deleted' lessons, and the
+        double-bookings of the created and updated ones as 'conflicts' (see
+        serialize_conflicts()).
+    """
+    english_class = schedule.english_class
+    wanted = occurrences(schedule, from_date)
+    tail = schedule.generated_lessons.all()
+    if from_date:
+        tail = tail.filter(recurrence_date__gte=from_date)
+    existing = {lesson.recurrence_date: lesson for lesson in tail}
+
+    fields = {
+        "title": english_class.title,
+        "description": "",
+        "location": "on-site",
+        "meeting_link": None,
+    }
+    if template is not None:
+        fields = {name: getattr(template, name) for name in fields}
+
+    update_fields = ["updated_at"]
+    if reschedule:
+        update_fields += ["start_time", "end_time"]
+    if template is not None:
+        update_fields += list(fields)
+
+    new_lessons = []
+    changed = []
+    now = timezone.now()
+    for day, start, end in wanted:
+        lesson = existing.pop(day, None)
+        if lesson is None:
+            new_lessons.append(Lesson(
+                english_class=english_class,
+                schedule=schedule,
+                recurrence_date=day,
+                start_time=start,
+                end_time=end,
+                **fields,
+            ))
+            continue
+        values = dict(fields) if template is not None else {}
+        if reschedule:
+            values.update(start_time=start, end_time=end)
+        if any(getattr(lesson, name) != value for name, value in values.items()):
+            for name, value in values.items():
+                setattr(lesson, name, value)
+            lesson.updated_at = now
+            changed.append(lesson)
+
+    conflicts = find_conflicts(
+        new_lessons + changed, exclude=[lesson.pk for lesson in existing.values()]
+    )
+
+    with transaction.atomic():
+        # What is left of the existing lessons no longer matches an occurrence
+        if existing:
+            Lesson.objects.filter(pk__in=[lesson.pk for lesson in existing.values()]).delete()
+        Lesson.objects.bulk_update(changed, update_fields, batch_size=500)
+        Lesson.objects.bulk_create(new_lessons)
+        renumber_lessons([english_class.pk])
+    bump_schedule_version()
+    return {
+        "created": len(new_lessons),
+        "updated": len(changed),
+        "deleted": len(existing),
+        # Serialized once the new lessons have their ids
+        "conflicts": serialize_conflicts(conflicts),
+    }
@@ -0,0 +1,291 @@
+# scheduling/serializers.py
+
+"""
+FullCalendar payloads of lessons, with their classes and rosters in lookup tables
+sent once, built with a fixed number of queries.
+"""
+
+import json
+
+from django.db.models import Prefetch
+
+from users.models import User
+from .models import Material
+
+
+# Number of lessons fetched (and prefetched for) per database round trip when streaming
+STREAM_CHUNK_SIZE = 500
+
+# Material columns read to list a lesson's materials
+MATERIAL_FIELDS = ("id", "title", "preview", "preview_text", "page_count", "metadata")
+
+# Event keys of the lesson fields, for the partial events of serialize_lesson_changes()
+EVENT_KEYS = {
+    "start_time": "start",
+    "end_time": "end",
+    "sequence_number": "sequence_number",
+    "title": "class_topic",
+    "description": "description",
+    "meeting_link": "meeting_link",
+    "location": "location",
+}
+
+
+def prepare_lessons(lessons):
+    """
+    Attach everything the event serializer reads to a lesson queryset.
+
+    Args:
+        lessons: A Lesson queryset.
+
+    Returns:
+        QuerySet: The same lessons with related data joined, annotated and prefetched.
+    """
+    return (
+        lessons.select_related("english_class")
+        .with_class_total()
+        .prefetch_related(
+            Prefetch(
+                "english_class__students",
+                queryset=User.objects.only("id", "username"),
+            ),
+            Prefetch("materials", queryset=Material.objects.only(*MATERIAL_FIELDS)),
+        )
+    )
+
+
+def new_lookups():
+    """
+    Start the lookup tables of a payload, with the teacher roster filled in.
+
+    Returns:
+        dict: The 'teachers', 'students' and 'classes' tables.
+    """
+    teachers = User.objects.filter(is_teacher=True).values_list("id", "username")
+    return {
+        "teachers": {str(pk): username for pk, username in teachers},
+        "students": {},
+        "classes": {},
+    }
+
+
+def add_to_lookups(lookups, lesson):
+    """
+    Record the class of a lesson and its enrolled students in the lookup tables.
+
+    Args:
+        lookups: The tables returned by new_lookups().
+        lesson: A Lesson loaded through prepare_lessons().
+    """
+    english_class = lesson.english_class
+    key = str(english_class.pk)
+    if key in lookups["classes"]:
+        return
+    students = english_class.students.all()
+    for student in students:
+        lookups["students"][str(student.pk)] = student.username
+    lookups["classes"][key] = {
+        "title": english_class.title,
+        "color": english_class.color,
+        "teacher_id": english_class.teacher_id,
+        "student_ids": [student.pk for student in students],
+        "lessons_total": lesson.class_lessons_total,
+    }
+
+
+def serialize_lesson(lesson):
+    """
+    Build the FullCalendar event dictionary of a single lesson.
+
+    Args:
+        lesson: A Lesson loaded through prepare_lessons().
+
+    Returns:
+        dict: The event dictionary.
+    """
+    return {
+        "id": lesson.id,
+        "start": lesson.start_time.isoformat(),
+        "end": lesson.end_time.isoformat(),
+        "extendedProps": {
+            "class_id": lesson.english_class_id,
+            "sequence_number": lesson.sequence_number,
+            "class_topic": lesson.title,
+            "description": lesson.description,
+            "meeting_link": lesson.meeting_link,
+            "location": lesson.location,
+            "materials": serialize_materials(lesson.materials.all()),
+        },
+    }
+
+
+def serialize_materials(materials):
+    """
+    Build the material list of an event.
+
+    Args:
+        materials: Materials loaded with at least MATERIAL_FIELDS.
+
+    Returns:
+        list: One dictionary per material.
+    """
+    return [serialize_material(material) for material in materials]
+
+
+def serialize_material(material):
+    """
+    Build the dictionary of one material of an event.
+
+    Args:
+        material: A Material loaded with at least MATERIAL_FIELDS.
+
+    Returns:
+        dict: The material's id, title and derivatives.
+    """
+    return {
+        "id": material.id,
+        "title": material.title,
+        "preview": material.preview_text,
+        "page_count": material.page_count,
+        "size": material.metadata.get("size"),
+        "thumbnail": bool(material.preview),
+    }
+
+
+def serialize_lesson_changes(lesson, fields, materials=None):
+    """
+    Build a partial event holding only the changed fields of a lesson, for the
+    client to patch the event it already shows.
+
+    Args:
+        lesson: The saved Lesson.
+        fields: The names of the changed model fields (keys of EVENT_KEYS).
+        materials: The lesson's materials, if they changed.
+
+    Returns:
+        dict: The event 'id' and the changed values, with 'start' and 'end' at
+        the top level and the other fields in 'extendedProps'.
+    """
+    event = {"id": lesson.id, "extendedProps": {}}
+    for field in fields:
+        value = getattr(lesson, field)
+        if field in ("start_time", "end_time"):
+            event[EVENT_KEYS[field]] = value.isoformat()
+        else:
+            event["extendedProps"][EVENT_KEYS[field]] = value
+    if materials is not None:
+        event["extendedProps"]["materials"] = serialize_materials(materials)
+    return event
+
+
+def serialize_schedule(lessons):
+    """
+    Build the payload of a lesson queryset: its events and their lookup tables.
+
+    Args:
+        lessons: A Lesson queryset.
+
+    Returns:
+        dict: The 'events' list and the 'teachers', 'students' and 'classes' tables.
+    """
+    lookups = new_lookups()
+    events = []
+    for lesson in prepare_lessons(lessons):
+        add_to_lookups(lookups, lesson)
+        events.append(serialize_lesson(lesson))
+    return {"events": events, **lookups}
+
+
+def iter_schedule_json(lessons, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode the payload of a lesson queryset as JSON, incrementally.
+
+    The lessons are read with QuerySet.iterator(), so only one chunk of lessons
+    and its prefetched students and materials is held in memory at a time. The
+    events are sent first and the lookup tables, collected along the way, last.
+
+    Args:
+        lessons: A Lesson queryset.
+        chunk_size: How many lessons to fetch and encode per yielded piece.
+
+    Yields:
+        str: Consecutive pieces of the JSON document.
+    """
+    lookups = new_lookups()
+    yield '{"events":['
+    pieces = []
+    separator = ""
+    for lesson in prepare_lessons(lessons).iterator(chunk_size=chunk_size):
+        add_to_lookups(lookups, lesson)
+        pieces.append(separator + json.dumps(serialize_lesson(lesson)))
+        separator = ","
+        if len(pieces) >= chunk_size:
+            yield "".join(pieces)
+            pieces = []
+    yield "".join(pieces) + "],"
+    yield json.dumps(lookups)[1:]
+
+
+def serialize_schedule_compact(lessons):
+    """
+    Build the columnar ("compact") payload of a lesson queryset.
+
+    Instead of one dictionary per event, every lesson field is a column array,
+    times are epoch seconds (the end as a duration), and repeated values (class,
+    location) are indexes into small dictionaries. Materials are sent once, by
+    id, in a 'materials' table holding everything serialize_materials() lists
+    but the id. The lookup tables are the same as in serialize_schedule().
+
+    Args:
+        lessons: A Lesson queryset.
+
+    Returns:
+        dict: The compact payload.
+    """
+    lookups = new_lookups()
+    columns = {
+        name: []
+        for name in (
+            "id", "start", "duration", "class", "sequence", "topic",
+            "description", "meeting_link", "location", "materials",
+        )
+    }
+    dictionaries = {"class": [], "location": []}
+    indexes = {"class": {}, "location": {}}
+    materials = {}
+
+    def encode(dictionary, value):
+        """Returns the index of a value in a dictionary, adding it if needed."""
+        if value not in indexes[dictionary]:
+            indexes[dictionary][value] = len(dictionaries[dictionary])
+            dictionaries[dictionary].append(value)
+        return indexes[dictionary][value]
+
+    for lesson in prepare_lessons(lessons):
+        add_to_lookups(lookups, lesson)
+        start = int(lesson.start_time.timestamp())
+        columns["id"].append(lesson.id)
+        columns["start"].append(start)
+        columns["duration"].append(int(lesson.end_time.timestamp()) - start)
+        columns["class"].append(encode("class", lesson.english_class_id))
+        columns["sequence"].append(lesson.sequence_number)
+        columns["topic"].append(lesson.title)
+        columns["description"].append(lesson.description)
+        columns["meeting_link"].append(lesson.meeting_link)
+        columns["location"].append(encode("location", lesson.location))
+        lesson_materials = []
+        for material in lesson.materials.all():
+            if str(material.id) not in materials:
+                details = serialize_material(material)
+                del details["id"]
+                materials[str(material.id)] = details
+            lesson_materials.append(material.id)
+        columns["materials"].append(lesson_materials)
+
+    return {
+        "format": "compact",
+        "columns": columns,
+        "dictionaries": dictionaries,
+        "materials": materials,
+        **lookups,
+    }
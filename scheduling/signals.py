@@ -0,0 +1,104 @@
+# scheduling/signals.py
+
+"""
+Signal handlers bumping the schedule version and touching the 'updated_at' of the
+classes and lessons a change affects.
+"""
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_schedule_version
+from .models import EnglishClass, Lesson, Material, Schedule
+
+
+# User fields shown in the schedule payloads (the teacher and student lookups)
+SCHEDULE_USER_FIELDS = {"username", "is_teacher", "is_student"}
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+@receiver(post_save, sender=EnglishClass)
+@receiver(post_delete, sender=EnglishClass)
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_schedule_on_change(sender, **kwargs):
+    """Bumps the schedule version when a model shown on the calendar changes."""
+    bump_schedule_version()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_schedule_on_user_change(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """
+    Bumps the schedule version and marks the user's classes as modified when a
+    user save may change the schedule payloads.
+    """
+    if update_fields is None or SCHEDULE_USER_FIELDS & set(update_fields):
+        bump_schedule_version()
+        if not created:
+            touch_classes_of_user(instance)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def touch_classes_on_user_delete(sender, instance, **kwargs):
+    """Marks the classes of a user about to be deleted as modified."""
+    touch_classes_of_user(instance)
+
+
+def touch_classes_of_user(user):
+    """Marks the classes a user teaches or is enrolled in as modified."""
+    EnglishClass.objects.filter(Q(teacher=user) | Q(students=user)).update(
+        updated_at=timezone.now()
+    )
+
+
+@receiver(post_save, sender=Material)
+@receiver(pre_delete, sender=Material)
+def touch_lessons_of_material(sender, instance, created=False, **kwargs):
+    """Marks the lessons of a changed or deleted material as modified."""
+    if not created:
+        Lesson.objects.filter(materials=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=EnglishClass.students.through)
+@receiver(m2m_changed, sender=Material.lessons.through)
+def invalidate_schedule_on_relation_change(sender, action, **kwargs):
+    """Bumps the schedule version when enrollments or lesson materials change."""
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_schedule_version()
+
+
+@receiver(m2m_changed, sender=EnglishClass.students.through)
+def touch_classes_on_enrollment_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Marks the classes whose enrollments changed as modified."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        class_ids = [instance.pk]
+    elif action == "pre_clear":
+        class_ids = list(instance.enrolled_classes.values_list("pk", flat=True))
+    else:
+        class_ids = pk_set
+    EnglishClass.objects.filter(pk__in=class_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Material.lessons.through)
+def touch_lessons_on_material_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Marks the lessons whose materials changed as modified."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        lesson_ids = [instance.pk]
+    elif action == "pre_clear":
+        lesson_ids = list(instance.lessons.values_list("pk", flat=True))
+    else:
+        lesson_ids = pk_set
+    Lesson.objects.filter(pk__in=lesson_ids).update(updated_at=timezone.now())
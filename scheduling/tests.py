@@ -1,11 +1,43 @@
 # scheduling/tests.py
 
+import datetime
+import hashlib
+import io
 import json
+import os
+import random
+import tempfile
+import uuid
+import zipfile
+from io import StringIO
+from unittest import mock
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from .models import EnglishClass, Schedule, Lesson
+from heso.utils.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, query_budget
+from .models import (
+    EnglishClass,
+    Schedule,
+    Lesson,
+    Material,
+    MaterialImport,
+    UploadSession,
+    material_storage,
+    renumber_lessons,
+)
+from .cache import get_schedule_version
+from .conflicts import find_conflicts
+from .imports import collect_directory, import_materials
+from .recurrence import generate_lessons, occurrence_dates, parse_rule
+from .serializers import iter_schedule_json, serialize_schedule, serialize_schedule_compact
+from .uploads import MaterialUploadHandler, upload_rejections
 
 User = get_user_model()
 
@@ -350,3 +382,2170 @@ class ScheduleViewTests(TestCase):
         self.assertEqual(lesson_to_update.title, "Updated Title")
         self.assertEqual(lesson_to_update.description, "Updated Description")
         self.assertEqual(lesson_to_update.location, "on-site")
+
+
+class LessonsFeedTests(TestCase):
+    """
+    Test suite for the date-windowed lessons feed used by the calendar.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates two classes with lessons inside and outside of a March 2024 window.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.other_teacher = User.objects.create_user(
+            "other", "other@example.com", "otherpass", is_teacher=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+        cls.other_class = EnglishClass.objects.create(
+            title="English 202", teacher=cls.other_teacher
+        )
+        cls.march_lesson = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="March",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+        cls.april_lesson = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="April",
+            start_time="2024-04-10T10:00:00Z",
+            end_time="2024-04-10T11:00:00Z",
+        )
+        cls.other_lesson = Lesson.objects.create(
+            english_class=cls.other_class,
+            title="Other March",
+            start_time="2024-03-12T10:00:00Z",
+            end_time="2024-03-12T11:00:00Z",
+        )
+
+    def setUp(self):
+        """Starts every test with an empty schedule cache."""
+        cache.clear()
+
+    def get_feed(self, **params):
+        """Requests the feed with the given query parameters."""
+        return self.client.get(reverse("lessons_feed"), params)
+
+    def test_feed_returns_only_lessons_in_window(self):
+        """
+        Only lessons overlapping the requested window are returned.
+        """
+        response = self.get_feed(start="2024-03-01", end="2024-04-01")
+        self.assertEqual(response.status_code, 200)
+        ids = {event["id"] for event in response.json()["events"]}
+        self.assertEqual(ids, {self.march_lesson.pk, self.other_lesson.pk})
+
+    def test_feed_filters_by_class_and_teacher(self):
+        """
+        The optional class and teacher filters narrow the results down.
+        """
+        response = self.get_feed(
+            start="2024-03-01T00:00:00Z",
+            end="2024-05-01T00:00:00Z",
+            **{"class": self.english_class.pk},
+        )
+        ids = {event["id"] for event in response.json()["events"]}
+        self.assertEqual(ids, {self.march_lesson.pk, self.april_lesson.pk})
+
+        response = self.get_feed(
+            start="2024-03-01", end="2024-05-01", teacher=self.other_teacher.pk
+        )
+        ids = {event["id"] for event in response.json()["events"]}
+        self.assertEqual(ids, {self.other_lesson.pk})
+
+    def test_feed_requires_valid_window(self):
+        """
+        A missing or inverted window is rejected with HTTP 400.
+        """
+        self.assertEqual(self.get_feed().status_code, 400)
+        self.assertEqual(
+            self.get_feed(start="2024-04-01", end="2024-03-01").status_code, 400
+        )
+        self.assertEqual(
+            self.get_feed(start="2024-03-01", end="2024-04-01", teacher="x").status_code,
+            400,
+        )
+
+    def test_streamed_feed_matches_buffered_feed(self):
+        """
+        The streaming mode sends the same events as the buffered response.
+        """
+        params = {"start": "2024-03-01", "end": "2024-05-01"}
+        buffered = self.get_feed(**params)
+        streamed = self.get_feed(stream=1, **params)
+        self.assertTrue(streamed.streaming)
+        body = b"".join(streamed.streaming_content)
+        self.assertEqual(json.loads(body), buffered.json())
+
+    def test_export_streams_lessons_visible_to_teacher(self):
+        """
+        The export includes every lesson of the teacher's classes, and only those.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("lessons_export"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("attachment", response["Content-Disposition"])
+        payload = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            [event["id"] for event in payload["events"]],
+            [self.march_lesson.pk, self.april_lesson.pk],
+        )
+
+    def test_json_stream_is_chunked(self):
+        """
+        The incremental encoder yields several pieces forming one JSON array.
+        """
+        pieces = list(iter_schedule_json(Lesson.objects.order_by("pk"), chunk_size=1))
+        self.assertGreater(len(pieces), 3)
+        payload = json.loads("".join(pieces))
+        self.assertEqual(len(payload["events"]), 3)
+        self.assertEqual(len(payload["classes"]), 2)
+        empty = json.loads("".join(iter_schedule_json(Lesson.objects.none())))
+        self.assertEqual(empty["events"], [])
+
+
+class LessonSequenceTests(TestCase):
+    """
+    Test suite for the stored per-class lesson sequence numbers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher and an English class to attach lessons to.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+
+    def create_lesson(self, title, day):
+        """Creates a one-hour lesson on the given day of March 2024."""
+        return Lesson.objects.create(
+            english_class=self.english_class,
+            title=title,
+            start_time=f"2024-03-{day:02d}T10:00:00Z",
+            end_time=f"2024-03-{day:02d}T11:00:00Z",
+        )
+
+    def sequence(self):
+        """Returns lesson titles in stored sequence order."""
+        return list(
+            Lesson.objects.filter(english_class=self.english_class)
+            .order_by("sequence_number")
+            .values_list("title", "sequence_number")
+        )
+
+    def test_lessons_are_numbered_by_start_time(self):
+        """
+        Lessons created out of order are numbered by their start time.
+        """
+        self.create_lesson("Third", 20)
+        self.create_lesson("First", 1)
+        self.create_lesson("Second", 10)
+        self.assertEqual(self.sequence(), [("First", 1), ("Second", 2), ("Third", 3)])
+
+    def test_moving_and_deleting_lessons_updates_sequence(self):
+        """
+        Moving a lesson renumbers its neighbours and deleting one closes the gap.
+        """
+        first = self.create_lesson("First", 1)
+        second = self.create_lesson("Second", 10)
+        self.create_lesson("Third", 20)
+
+        first.start_time = "2024-03-25T10:00:00Z"
+        first.end_time = "2024-03-25T11:00:00Z"
+        first.save()
+        self.assertEqual(self.sequence(), [("Second", 1), ("Third", 2), ("First", 3)])
+
+        second.delete()
+        self.assertEqual(self.sequence(), [("Third", 1), ("First", 2)])
+
+    def test_admin_bulk_delete_closes_the_gap(self):
+        """
+        Deleting lessons with the admin "delete selected" action renumbers the rest.
+        """
+        first = self.create_lesson("First", 1)
+        self.create_lesson("Second", 10)
+        self.create_lesson("Third", 20)
+        self.client.force_login(User.objects.create_superuser("admin", password="adminpass"))
+        self.client.post(
+            reverse("admin:scheduling_lesson_changelist"),
+            {"action": "delete_selected", "_selected_action": [first.pk], "post": "yes"},
+        )
+        self.assertEqual(self.sequence(), [("Second", 1), ("Third", 2)])
+
+    def test_ordinal_label_uses_annotated_total(self):
+        """
+        The "n/total" label is built without queries from an annotated queryset.
+        """
+        self.create_lesson("First", 1)
+        self.create_lesson("Second", 10)
+        lessons = list(Lesson.objects.with_class_total().order_by("start_time"))
+        with self.assertNumQueries(0):
+            labels = [lesson.ordinal_label for lesson in lessons]
+        self.assertEqual(labels, ["1/2", "2/2"])
+
+    def test_renumber_lessons_after_bulk_update(self):
+        """
+        renumber_lessons repairs the sequence after an update that bypassed save().
+        """
+        first = self.create_lesson("First", 1)
+        self.create_lesson("Second", 10)
+        Lesson.objects.filter(pk=first.pk).update(
+            start_time="2024-03-15T10:00:00Z", end_time="2024-03-15T11:00:00Z"
+        )
+        changed = renumber_lessons([self.english_class.pk])
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.sequence(), [("Second", 1), ("First", 2)])
+
+
+class LessonSerializerTests(TestCase):
+    """
+    Test suite for the batched lesson event serializer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher, two students and an English class with both enrolled.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+        for number in range(2):
+            cls.english_class.students.add(
+                User.objects.create_user(
+                    f"student{number}", f"student{number}@example.com", "pass",
+                    is_student=True,
+                )
+            )
+
+    def create_lessons(self, count):
+        """Creates the given number of lessons, each with one material."""
+        for day in range(1, count + 1):
+            lesson = Lesson.objects.create(
+                english_class=self.english_class,
+                title=f"Lesson {day}",
+                start_time=f"2024-03-{day:02d}T10:00:00Z",
+                end_time=f"2024-03-{day:02d}T11:00:00Z",
+            )
+            Material.objects.create(title=f"Material {day}", type="book").lessons.add(
+                lesson
+            )
+
+    def test_query_count_does_not_grow_with_lessons(self):
+        """
+        Serializing one lesson or twenty lessons costs the same number of queries:
+        teachers, lessons, students and materials.
+        """
+        self.create_lessons(1)
+        with self.assertNumQueries(4):
+            payload = serialize_schedule(Lesson.objects.all())
+        self.assertEqual(len(payload["events"]), 1)
+
+        self.create_lessons(20)
+        with self.assertNumQueries(4):
+            payload = serialize_schedule(Lesson.objects.all())
+        self.assertEqual(len(payload["events"]), 21)
+
+    def test_payload_contents(self):
+        """
+        Events refer to their class by id, and rosters are sent once in lookup tables.
+        """
+        self.create_lessons(2)
+        payload = serialize_schedule(Lesson.objects.order_by("start_time"))
+        props = payload["events"][1]["extendedProps"]
+        self.assertEqual(props["class_id"], self.english_class.pk)
+        self.assertEqual(props["sequence_number"], 2)
+        self.assertEqual([m["title"] for m in props["materials"]], ["Material 2"])
+        self.assertNotIn("teachers", props)
+        self.assertNotIn("students", props)
+
+        self.assertEqual(payload["teachers"], {str(self.teacher.pk): "teacher"})
+        self.assertEqual(sorted(payload["students"].values()), ["student0", "student1"])
+        english_class = payload["classes"][str(self.english_class.pk)]
+        self.assertEqual(english_class["title"], "English 101")
+        self.assertEqual(english_class["teacher_id"], self.teacher.pk)
+        self.assertEqual(english_class["lessons_total"], 2)
+        self.assertEqual(len(english_class["student_ids"]), 2)
+
+    def test_compact_payload_round_trips(self):
+        """
+        The columnar payload, decoded the way static/js/compact_events.js does,
+        gives exactly the regular payload, and is smaller.
+        """
+        self.create_lessons(5)
+        Material.objects.filter(title="Material 2").update(
+            preview_text="Irregular verbs", page_count=3, metadata={"size": 2048}
+        )
+        Lesson.objects.get(title="Lesson 3").materials.add(
+            Material.objects.get(title="Material 2")
+        )
+        lessons = Lesson.objects.order_by("start_time")
+        regular = serialize_schedule(lessons)
+        compact = serialize_schedule_compact(lessons)
+
+        self.assertEqual(compact["dictionaries"]["class"], [self.english_class.pk])
+        self.assertEqual(decode_compact_events(compact), regular)
+        self.assertLess(len(json.dumps(compact)), len(json.dumps(regular)))
+
+
+def decode_compact_events(payload):
+    """
+    Expands a compact payload into the regular one, like decodeCompactEvents()
+    in static/js/compact_events.js.
+    """
+    payload = json.loads(json.dumps(payload))
+    columns, dictionaries = payload["columns"], payload["dictionaries"]
+    events = []
+    for index, lesson_id in enumerate(columns["id"]):
+        start = columns["start"][index]
+        end = start + columns["duration"][index]
+        events.append({
+            "id": lesson_id,
+            "start": datetime.datetime.fromtimestamp(start, datetime.timezone.utc).isoformat(),
+            "end": datetime.datetime.fromtimestamp(end, datetime.timezone.utc).isoformat(),
+            "extendedProps": {
+                "class_id": dictionaries["class"][columns["class"][index]],
+                "sequence_number": columns["sequence"][index],
+                "class_topic": columns["topic"][index],
+                "description": columns["description"][index],
+                "meeting_link": columns["meeting_link"][index],
+                "location": dictionaries["location"][columns["location"][index]],
+                "materials": [
+                    {"id": material_id, **payload["materials"][str(material_id)]}
+                    for material_id in columns["materials"][index]
+                ],
+            },
+        })
+    return {
+        "events": events,
+        "teachers": payload["teachers"],
+        "students": payload["students"],
+        "classes": payload["classes"],
+    }
+
+
+class ScheduleCacheTests(TestCase):
+    """
+    Test suite for the versioned per-user cache of the lessons feed.
+    """
+
+    params = {"start": "2024-03-01", "end": "2024-04-01"}
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher, a student and a class with one March 2024 lesson.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.student = User.objects.create_user(
+            "student", "student@example.com", "studentpass", is_student=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+        cls.lesson = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="March",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def setUp(self):
+        """Starts every test with an empty schedule cache."""
+        cache.clear()
+
+    def test_repeated_feed_requests_hit_the_cache(self):
+        """
+        A second identical request is answered from the cache: only the validators
+        of its lessons and the schedule version are read.
+        """
+        first = self.client.get(reverse("lessons_feed"), self.params)
+        with self.assertNumQueries(2):
+            second = self.client.get(reverse("lessons_feed"), self.params)
+        self.assertEqual(first.content, second.content)
+
+    def test_bumps_reach_other_processes(self):
+        """
+        The version lives in the database: a worker that missed a bump, simulated
+        by clearing the cache after it, still serves the change.
+        """
+        self.client.get(reverse("lessons_feed"), self.params)
+        version = get_schedule_version()
+        self.lesson.description = "Changed"
+        self.lesson.save()
+        cache.clear()
+        self.assertEqual(get_schedule_version(), version + 1)
+        response = self.client.get(reverse("lessons_feed"), self.params)
+        self.assertEqual(
+            response.json()["events"][0]["extendedProps"]["description"], "Changed"
+        )
+
+    def test_lesson_changes_invalidate_the_cache(self):
+        """
+        Saving a lesson shows up in the next response.
+        """
+        self.client.get(reverse("lessons_feed"), self.params)
+        self.lesson.description = "Changed"
+        self.lesson.save()
+        response = self.client.get(reverse("lessons_feed"), self.params)
+        self.assertEqual(
+            response.json()["events"][0]["extendedProps"]["description"], "Changed"
+        )
+
+    def test_enrollment_changes_invalidate_the_cache(self):
+        """
+        Enrolling a student shows up in the next response.
+        """
+        self.client.get(reverse("lessons_feed"), self.params)
+        self.english_class.students.add(self.student)
+        response = self.client.get(reverse("lessons_feed"), self.params)
+        self.assertEqual(response.json()["students"], {str(self.student.pk): "student"})
+
+    def test_logins_keep_the_cache_and_etag(self):
+        """
+        The last_login update of someone logging in neither drops the cached feed
+        nor changes its ETag; renaming a user does.
+        """
+        first = self.client.get(reverse("lessons_feed"), self.params)
+        Client().login(username="student", password="studentpass")
+        with self.assertNumQueries(1):
+            revalidated = self.client.get(
+                reverse("lessons_feed"), self.params, HTTP_IF_NONE_MATCH=first["ETag"]
+            )
+        self.assertEqual(revalidated.status_code, 304)
+        self.teacher.username = "renamed"
+        self.teacher.save()
+        response = self.client.get(
+            reverse("lessons_feed"), self.params, HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class ConditionalResponseTests(TestCase):
+    """
+    Test suite for the ETag / Last-Modified validators of the scheduling views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher, a class with a schedule and one lesson.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+        Schedule.objects.create(
+            english_class=cls.english_class,
+            term="Spring 2024",
+            start_date="2024-03-01",
+            end_date="2024-05-01",
+        )
+        cls.lesson = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="March",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def setUp(self):
+        """Logs the teacher in with an empty schedule cache."""
+        cache.clear()
+        self.client.force_login(self.teacher)
+
+    def assertRevalidates(self, url, params=None):
+        """Asserts that a repeated request with the ETag is answered with 304."""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertIn("no-cache", response["Cache-Control"])
+        revalidated = self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b"")
+        return response
+
+    def test_feed_returns_not_modified_until_a_change(self):
+        """
+        The feed answers 304 for an unchanged schedule and 200 after an edit.
+        """
+        params = {"start": "2024-03-01", "end": "2024-04-01"}
+        url = reverse("lessons_feed")
+        response = self.assertRevalidates(url, params)
+        self.lesson.title = "Changed"
+        self.lesson.save()
+        changed = self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+
+    def test_feed_validators_come_from_the_rows(self):
+        """
+        Requests built from a cold cache get the same validators while the lessons
+        are unchanged, even after unrelated schedule changes; material changes
+        move them.
+        """
+        params = {"start": "2024-03-01", "end": "2024-04-01"}
+        url = reverse("lessons_feed")
+        first = self.client.get(url, params)
+        self.assertTrue(first.has_header("Last-Modified"))
+        cache.clear()
+        Lesson.objects.create(
+            english_class=self.english_class,
+            title="May",
+            start_time="2024-05-10T10:00:00Z",
+            end_time="2024-05-10T11:00:00Z",
+        )
+        cache.clear()
+        second = self.client.get(url, params)
+        self.assertEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second["Last-Modified"], first["Last-Modified"])
+
+        material = Material.objects.create(title="Notes", type="file")
+        material.lessons.add(self.lesson)
+        with_material = self.client.get(url, params)
+        material.title = "Renamed notes"
+        material.save()
+        changed = self.client.get(url, params, HTTP_IF_NONE_MATCH=with_material["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertIn("Renamed notes", changed.content.decode())
+
+    def test_lesson_details_supports_conditional_get(self):
+        """
+        Lesson details can be fetched with GET and revalidated.
+        """
+        response = self.assertRevalidates(
+            reverse("lesson_details"), {"lessonId": self.lesson.pk}
+        )
+        self.assertEqual(response.json()["lesson"]["id"], self.lesson.pk)
+
+    def test_list_views_send_validators(self):
+        """
+        The class and lesson lists send ETag and Last-Modified and revalidate.
+        """
+        response = self.assertRevalidates(reverse("english_class_list"))
+        self.assertTrue(response.has_header("Last-Modified"))
+        response = self.assertRevalidates(
+            reverse("lessons_list", kwargs={"class_id": self.english_class.pk})
+        )
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_enrollment_touches_class_timestamp(self):
+        """
+        Enrolling a student marks the class as modified.
+        """
+        before = EnglishClass.objects.get(pk=self.english_class.pk).updated_at
+        student = User.objects.create_user("student", "s@example.com", "pass", is_student=True)
+        student.enrolled_classes.add(self.english_class)
+        after = EnglishClass.objects.get(pk=self.english_class.pk).updated_at
+        self.assertGreater(after, before)
+
+
+class IndexBenchmarkTests(TestCase):
+    """
+    Smoke test for the index benchmark management command.
+    """
+
+    def test_benchmark_reports_plans_and_leaves_no_data(self):
+        """
+        The benchmark prints before/after plans and rolls its dataset back.
+        """
+        out = StringIO()
+        call_command(
+            "benchmark_lesson_indexes", lessons=300, classes=5, users=30, repeat=1, stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn("feed window (one month)", output)
+        self.assertIn("lesson_time_range_idx", output)
+        self.assertIn("rolled back", output)
+        self.assertFalse(Lesson.objects.exists())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Test suite for the per-request query budget middleware.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a superuser and a teacher.
+        """
+        cls.superuser = User.objects.create_superuser(
+            "admin", "admin@example.com", "adminpass"
+        )
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+
+    def run_view(self, view):
+        """Runs a view through the middleware, as the handler would."""
+        request = RequestFactory().get("/budget/")
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(request)
+
+    def test_declared_budget_is_enforced(self):
+        """
+        A view running more queries than it declares raises in enforcing mode.
+        """
+        @query_budget(1)
+        def view(request):
+            list(User.objects.all())
+            list(User.objects.all())
+            return HttpResponse()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_view(view)
+        with override_settings(QUERY_BUDGET_ENFORCE=False):
+            with self.assertLogs("heso.query_budget", "WARNING"):
+                self.run_view(view)
+
+    @override_settings(DEBUG=True)
+    def test_debug_headers(self):
+        """
+        With DEBUG on, the query count and database time are sent as headers.
+        """
+        response = self.run_view(query_budget(5)(lambda request: HttpResponse(
+            str(User.objects.count())
+        )))
+        self.assertEqual(response["X-DB-Query-Count"], "1")
+        self.assertTrue(response["X-DB-Time"].endswith("ms"))
+
+    def test_class_list_queries_do_not_grow_with_classes(self):
+        """
+        The class list loads teachers and students in batches, not per class.
+        """
+        self.client.force_login(self.superuser)
+
+        def add_class(number):
+            english_class = EnglishClass.objects.create(
+                title=f"Class {number}", teacher=self.teacher
+            )
+            english_class.students.add(
+                User.objects.create_user(f"student{number}", is_student=True)
+            )
+            Schedule.objects.create(
+                english_class=english_class,
+                term="Spring 2024",
+                start_date="2024-03-01",
+                end_date="2024-05-01",
+            )
+
+        add_class(0)
+        with CaptureQueriesContext(connection) as one_class:
+            self.client.get(reverse("english_class_list"))
+        for number in range(1, 6):
+            add_class(number)
+        with CaptureQueriesContext(connection) as six_classes:
+            response = self.client.get(reverse("english_class_list"))
+        self.assertContains(response, "student5")
+        self.assertEqual(len(one_class), len(six_classes))
+
+
+class MaterialStorageTests(TestCase):
+    """
+    Test suite for material files kept in the materials storage backend.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher with one lesson.
+        """
+        cls.teacher = User.objects.create_user(
+            "teacher", "teacher@example.com", "teacherpass", is_teacher=True
+        )
+        cls.english_class = EnglishClass.objects.create(
+            title="English 101", teacher=cls.teacher
+        )
+        cls.lesson = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def test_uploaded_material_is_kept_in_storage(self):
+        """
+        Files uploaded with a lesson update go to storage, not to the database.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("update_lesson"),
+            {
+                "lessonId": self.lesson.pk,
+                "new_materials": SimpleUploadedFile("notes.txt", b"lesson notes"),
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        material = self.lesson.materials.get()
+        self.assertIsNone(material.content)
+        self.assertTrue(material.file.name.startswith("materials/"))
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), b"lesson notes")
+
+    def test_legacy_content_is_still_readable(self):
+        """
+        Materials whose bytes are still in the database are read from there.
+        """
+        material = Material.objects.create(title="old.txt", type="file", content=b"old")
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), b"old")
+        self.assertIsNone(Material.objects.create(title="empty", type="link").open_content())
+
+
+class MaterialDeduplicationTests(TestCase):
+    """
+    Test suite for the content-addressed storage of uploaded materials.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates two teachers with a lesson each.
+        """
+        cls.lessons = []
+        for number in range(2):
+            teacher = User.objects.create_user(f"teacher{number}", is_teacher=True)
+            english_class = EnglishClass.objects.create(
+                title=f"English {number}", teacher=teacher
+            )
+            cls.lessons.append(Lesson.objects.create(
+                english_class=english_class,
+                title="Lesson",
+                start_time="2024-03-10T10:00:00Z",
+                end_time="2024-03-10T11:00:00Z",
+            ))
+
+    def test_identical_uploads_share_one_material(self):
+        """
+        The same file uploaded by two teachers is stored once and linked to both lessons.
+        """
+        for lesson in self.lessons:
+            self.client.force_login(lesson.english_class.teacher)
+            response = self.client.post(
+                reverse("update_lesson"),
+                {
+                    "lessonId": lesson.pk,
+                    "new_materials": SimpleUploadedFile(
+                        f"book-{lesson.pk}.pdf", b"%PDF same book"
+                    ),
+                },
+            )
+            self.assertEqual(response.status_code, 200)
+        material = Material.objects.get()
+        self.assertEqual(material.sha256, hashlib.sha256(b"%PDF same book").hexdigest())
+        self.assertEqual(set(material.lessons.all()), set(self.lessons))
+
+    def test_batch_is_checked_with_one_lookup(self):
+        """
+        Duplicates in a batch of files are found with a single query.
+        """
+        Material.objects.for_uploads([SimpleUploadedFile("a.txt", b"a")])
+        files = [
+            SimpleUploadedFile("a-again.txt", b"a"),
+            SimpleUploadedFile("b.txt", b"b"),
+            SimpleUploadedFile("b-again.txt", b"b"),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            materials = Material.objects.for_uploads(files)
+        selects = [query for query in queries if query["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 1)
+        self.assertEqual([material.title for material in materials], ["a.txt", "b.txt"])
+        self.assertEqual(Material.objects.count(), 2)
+
+
+class MaterialDownloadTests(TestCase):
+    """
+    Test suite for the material download endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a lesson with one stored material, its teacher and an outsider.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.outsider = User.objects.create_user("outsider", is_student=True)
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+        cls.material = Material.objects.for_uploads(
+            [SimpleUploadedFile("notes.txt", b"0123456789")]
+        )[0]
+        lesson.materials.add(cls.material)
+        cls.url = reverse("download_material", kwargs={"pk": cls.material.pk})
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_download_streams_whole_file(self):
+        """
+        The file is streamed with its validators and range support advertised.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], f'"{self.material.sha256}"')
+        self.assertIn('filename="notes.txt"', response["Content-Disposition"])
+
+    def test_range_requests(self):
+        """
+        Single byte ranges get 206 responses; ranges outside the file get 416, and
+        a stale If-Range gets the whole file.
+        """
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-4/10")
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-4", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_and_forbidden_requests(self):
+        """
+        A current ETag gets 304, and users outside the class get 403.
+        """
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.material.sha256}"')
+        self.assertEqual(response.status_code, 304)
+
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    @override_settings(MATERIALS_SENDFILE="x-accel-redirect")
+    def test_sendfile_hands_over_to_front_end(self):
+        """
+        With MATERIALS_SENDFILE set, only the redirect header is sent.
+        """
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/" + self.material.file.name
+        )
+
+
+class MaterialDeferredContentTests(TestCase):
+    """
+    Test suite making sure listings never read in-database material bytes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a lesson with a legacy material whose bytes are in the database.
+        """
+        cls.superuser = User.objects.create_superuser("admin", "admin@example.com", "adminpass")
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.superuser)
+        cls.lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+        cls.material = Material.objects.create(title="old.pdf", type="file", content=b"x" * 1024)
+        cls.lesson.materials.add(cls.material)
+
+    def assertNoContentRead(self, url):
+        """Requests a page and fails if any query selects the content column."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            self.assertNotIn('"scheduling_material"."content"', query["sql"])
+        return response
+
+    def test_listings_do_not_read_blobs(self):
+        """
+        The lesson form, the lesson details and the admin changelist skip the blob.
+        """
+        self.client.force_login(self.superuser)
+        response = self.assertNoContentRead(
+            reverse("update_lesson_view", kwargs={"pk": self.lesson.pk})
+        )
+        self.assertContains(response, "old.pdf")
+        self.assertNoContentRead(
+            reverse("lesson_details") + f"?lessonId={self.lesson.pk}"
+        )
+        self.assertNoContentRead(reverse("admin:scheduling_material_changelist"))
+
+    def test_content_is_loaded_on_request(self):
+        """
+        with_content() loads the bytes up front; open_content() still reads them lazily.
+        """
+        with self.assertNumQueries(1):
+            material = Material.objects.with_content().get(pk=self.material.pk)
+            self.assertEqual(len(material.content), 1024)
+        material = Material.objects.get(pk=self.material.pk)
+        with material.open_content() as stored:
+            self.assertEqual(len(stored.read()), 1024)
+
+
+class MaterialUploadHandlerTests(TestCase):
+    """
+    Test suite for the streaming validation of uploaded materials.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher with one lesson.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def test_files_are_hashed_while_streaming(self):
+        """
+        Uploaded files land on disk with their digest already computed.
+        """
+        request = RequestFactory().post(
+            "/", {"new_materials": SimpleUploadedFile("notes.txt", b"lesson notes")}
+        )
+        request.upload_handlers.insert(0, MaterialUploadHandler(request))
+        uploaded = request.FILES["new_materials"]
+        self.assertTrue(hasattr(uploaded, "temporary_file_path"))
+        self.assertEqual(uploaded.sha256, hashlib.sha256(b"lesson notes").hexdigest())
+
+    @override_settings(MATERIAL_UPLOAD_MAX_SIZE=1)
+    def test_other_uploads_keep_the_default_handlers(self):
+        """
+        Requests to views that do not take materials are not checked against the
+        material rules.
+        """
+        request = RequestFactory().post(
+            "/", {"installer": SimpleUploadedFile("setup.exe", b"MZ")}
+        )
+        uploaded = request.FILES["installer"]
+        self.assertEqual(uploaded.read(), b"MZ")
+        self.assertFalse(hasattr(uploaded, "sha256"))
+        self.assertEqual(upload_rejections(request), [])
+
+    def test_material_views_check_csrf_after_installing_the_handler(self):
+        """
+        The views taking materials still reject form posts without a CSRF token.
+        """
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.teacher)
+        url = reverse("update_lesson_view", kwargs={"pk": self.lesson.pk})
+        response = client.post(
+            url, {"new_materials": SimpleUploadedFile("notes.txt", b"notes")}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(MATERIAL_UPLOAD_MAX_SIZE=10)
+    def test_oversize_and_unknown_files_are_rejected(self):
+        """
+        Files over the size limit or of an unknown type are skipped and reported,
+        while the valid files of the same request are kept.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("update_lesson"),
+            {
+                "lessonId": self.lesson.pk,
+                "new_materials": [
+                    SimpleUploadedFile("video.mp4", b"x" * 11),
+                    SimpleUploadedFile("setup.exe", b"MZ"),
+                    SimpleUploadedFile("notes.txt", b"notes"),
+                ],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["rejected_files"]), 2)
+        self.assertEqual(
+            [material.title for material in self.lesson.materials.all()], ["notes.txt"]
+        )
+
+
+@override_settings(MATERIAL_UPLOAD_CHUNK_SIZE=4)
+class ChunkedUploadTests(TestCase):
+    """
+    Test suite for the resumable, chunked material upload API.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher with one lesson.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def start(self, file_name="recording.mp3", size=10):
+        """Starts an upload and returns its id."""
+        response = self.client.post(
+            reverse("start_material_upload"),
+            {"file_name": file_name, "size": size},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["upload"]["id"]
+
+    def put_chunk(self, upload_id, index, data):
+        """Sends one chunk of an upload."""
+        return self.client.put(
+            reverse("upload_material_chunk", kwargs={"upload_id": upload_id, "index": index}),
+            data,
+            content_type="application/octet-stream",
+        )
+
+    def progress(self, upload_id):
+        """Returns the progress of an upload."""
+        url = reverse("material_upload_progress", kwargs={"upload_id": upload_id})
+        return self.client.get(url).json()["upload"]
+
+    def complete(self, upload_id, lessons=()):
+        """Completes an upload, attaching the material to the given lessons."""
+        return self.client.post(
+            reverse("complete_material_upload", kwargs={"upload_id": upload_id}),
+            {"lessons": list(lessons)},
+            content_type="application/json",
+        )
+
+    def test_upload_resumes_and_attaches_material(self):
+        """
+        Chunks may arrive in any order and be retried; the completed upload
+        becomes a material attached to the lesson and its chunks are removed.
+        """
+        upload_id = self.start()
+        self.assertEqual(self.put_chunk(upload_id, 2, b"89").status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 0, b"0123").status_code, 200)
+        progress = self.progress(upload_id)
+        self.assertEqual(progress["received"], 6)
+        self.assertEqual(progress["missing_chunks"], [1])
+        self.assertEqual(self.complete(upload_id).status_code, 400)
+
+        self.assertEqual(self.put_chunk(upload_id, 1, b"45678").status_code, 400)
+        self.put_chunk(upload_id, 1, b"xxxx")
+        self.put_chunk(upload_id, 1, b"4567")
+        response = self.complete(upload_id, [self.lesson.pk])
+        self.assertEqual(response.status_code, 200)
+
+        material = self.lesson.materials.get()
+        self.assertEqual(response.json()["material"]["id"], material.pk)
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), b"0123456789")
+        self.assertEqual(material.sha256, hashlib.sha256(b"0123456789").hexdigest())
+        self.assertTrue(self.progress(upload_id)["complete"])
+        self.assertFalse(material_storage().exists(f"uploads/{upload_id}/000000"))
+
+    def test_invalid_uploads_are_refused(self):
+        """
+        Unknown types, oversize files and uploads of other users are refused.
+        """
+        response = self.client.post(
+            reverse("start_material_upload"),
+            {"file_name": "setup.exe", "size": 10},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        with self.settings(MATERIAL_UPLOAD_MAX_SIZE=5):
+            response = self.client.post(
+                reverse("start_material_upload"),
+                {"file_name": "notes.txt", "size": 10},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 400)
+
+        upload_id = self.start()
+        self.client.force_login(User.objects.create_user("other", is_teacher=True))
+        self.assertEqual(self.put_chunk(upload_id, 0, b"0123").status_code, 404)
+
+    def test_cleanup_removes_stale_sessions(self):
+        """
+        The cleanup command deletes idle sessions and their stored chunks.
+        """
+        stale_id = self.start()
+        self.put_chunk(stale_id, 0, b"0123")
+        fresh_id = self.start()
+        UploadSession.objects.filter(pk=stale_id).update(
+            updated_at=timezone.now() - datetime.timedelta(days=2)
+        )
+        call_command("cleanup_upload_sessions", stdout=StringIO())
+        self.assertEqual(
+            list(UploadSession.objects.values_list("pk", flat=True)), [uuid.UUID(fresh_id)]
+        )
+        self.assertFalse(material_storage().exists(f"uploads/{stale_id}/000000"))
+
+
+@override_settings(MATERIAL_COMPRESSION_CODECS=["zlib"])
+class MaterialCompressionTests(TestCase):
+    """
+    Test suite for the transparent compression of stored material files.
+    """
+
+    TEXT = b"Present perfect: I have studied English for three years. " * 2000
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher with one lesson.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def test_text_is_compressed_and_read_back(self):
+        """
+        Compressible files are stored compressed, read back transparently and
+        served with their original size and ranges.
+        """
+        material = Material.objects.for_uploads([SimpleUploadedFile("notes.txt", self.TEXT)])[0]
+        self.assertEqual(material.compression, "zlib")
+        self.assertLess(material.file.size, len(self.TEXT) // 10)
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), self.TEXT)
+
+        self.lesson.materials.add(material)
+        self.client.force_login(self.teacher)
+        url = reverse("download_material", kwargs={"pk": material.pk})
+        response = self.client.get(url, HTTP_RANGE="bytes=100000-100099")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100000-100099/{len(self.TEXT)}")
+        self.assertEqual(b"".join(response.streaming_content), self.TEXT[100000:100100])
+
+    def test_incompressible_files_are_stored_as_they_are(self):
+        """
+        Files that do not shrink in the probe are not compressed.
+        """
+        data = random.Random(1).randbytes(4096)
+        material = Material.objects.for_uploads([SimpleUploadedFile("photo.jpg", data)])[0]
+        self.assertEqual(material.compression, "")
+        self.assertEqual(material.file.size, len(data))
+
+    def test_admin_upload_replaces_the_stored_fields(self):
+        """
+        A file uploaded in the admin is hashed and compressed like lesson uploads;
+        the stored fields themselves cannot be edited there.
+        """
+        material = Material.objects.for_uploads([SimpleUploadedFile("notes.txt", self.TEXT)])[0]
+        self.assertEqual(material.compression, "zlib")
+        data = random.Random(1).randbytes(4096)
+        self.client.force_login(User.objects.create_superuser("admin", password="adminpass"))
+        response = self.client.post(
+            reverse("admin:scheduling_material_change", args=[material.pk]),
+            {
+                "title": "photo.jpg",
+                "type": "file",
+                "lessons": [self.lesson.pk],
+                "metadata": "{}",
+                "compression": "zlib",
+                "upload": SimpleUploadedFile("photo.jpg", data),
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        material.refresh_from_db()
+        self.assertEqual(material.compression, "")
+        self.assertEqual(material.sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(material.size, len(data))
+        self.assertEqual(material.processing_status, "pending")
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), data)
+
+    def test_command_compresses_existing_files(self):
+        """
+        compress_materials rewrites stored files compressed, keeping their bytes.
+        """
+        with self.settings(MATERIAL_COMPRESSION_CODECS=[]):
+            material = Material.objects.for_uploads(
+                [SimpleUploadedFile("notes.txt", self.TEXT)]
+            )[0]
+        old_name = material.file.name
+        self.assertEqual(material.compression, "")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("compress_materials", stdout=StringIO())
+        material.refresh_from_db()
+        self.assertEqual(material.compression, "zlib")
+        self.assertEqual(material.content_size(), len(self.TEXT))
+        self.assertFalse(material_storage().exists(old_name))
+        with material.open_content() as stored:
+            self.assertEqual(stored.read(), self.TEXT)
+
+
+class MaterialDerivativeTests(TestCase):
+    """
+    Test suite for the background generation of material derivatives.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a teacher with one lesson.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lesson = Lesson.objects.create(
+            english_class=english_class,
+            title="Lesson",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+
+    def upload(self, name, data):
+        """Stores a material and attaches it to the lesson."""
+        material = Material.objects.for_uploads([SimpleUploadedFile(name, data)])[0]
+        self.lesson.materials.add(material)
+        return material
+
+    def process(self):
+        """Runs the worker until the queue is empty."""
+        call_command("process_materials", "--once", stdout=StringIO(), stderr=StringIO())
+
+    def test_documents_get_text_previews_and_page_counts(self):
+        """
+        Text, office documents and PDFs get their text, preview and page count,
+        which the lesson payload then lists.
+        """
+        docx = io.BytesIO()
+        with zipfile.ZipFile(docx, "w") as archive:
+            archive.writestr(
+                "word/document.xml",
+                "<w:document><w:p><w:t>Irregular verbs</w:t></w:p>"
+                "<w:p><w:t>go, went, gone</w:t></w:p></w:document>",
+            )
+            archive.writestr("docProps/app.xml", "<Properties><Pages>3</Pages></Properties>")
+        notes = self.upload("notes.txt", b"Homework: read chapter two.")
+        book = self.upload("verbs.docx", docx.getvalue())
+        pdf = self.upload("book.pdf", b"%PDF-1.4 /Type /Pages /Type /Page /Type/Page")
+        self.assertEqual(notes.processing_status, "pending")
+
+        self.process()
+        notes.refresh_from_db()
+        book.refresh_from_db()
+        pdf.refresh_from_db()
+        self.assertEqual(notes.processing_status, "done")
+        self.assertEqual(notes.preview_text, "Homework: read chapter two.")
+        self.assertEqual(notes.metadata["words"], 4)
+        self.assertEqual(book.extracted_text, "Irregular verbs\ngo, went, gone")
+        self.assertEqual(book.page_count, 3)
+        self.assertEqual(pdf.page_count, 2)
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("lesson_details"), {"lessonId": self.lesson.pk})
+        materials = {
+            material["title"]: material
+            for material in response.json()["lesson"]["extendedProps"]["materials"]
+        }
+        self.assertEqual(materials["verbs.docx"]["page_count"], 3)
+        self.assertEqual(materials["notes.txt"]["preview"], "Homework: read chapter two.")
+
+    def test_broken_files_are_marked_failed(self):
+        """
+        A file that cannot be read is marked failed and does not stop the worker.
+        """
+        broken = self.upload("broken.docx", b"not a zip archive")
+        video = self.upload("talk.mp4", b"\x00\x00\x00\x18ftypmp42")
+        self.process()
+        broken.refresh_from_db()
+        video.refresh_from_db()
+        self.assertEqual(broken.processing_status, "failed")
+        self.assertIn("error", broken.metadata)
+        self.assertEqual(video.processing_status, "done")
+        self.assertEqual(video.metadata["content_type"], "video/mp4")
+
+
+class MaterialZipTests(TestCase):
+    """
+    Test suite for the streamed ZIP archives of class and term materials.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a class with a student, a term and lessons inside and after it.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.student = User.objects.create_user("student", is_student=True)
+        cls.outsider = User.objects.create_user("outsider", is_student=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.english_class.students.add(cls.student)
+        cls.schedule = Schedule.objects.create(
+            english_class=cls.english_class,
+            term="Spring 2024",
+            start_date="2024-03-01",
+            end_date="2024-05-31",
+        )
+        spring = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="Spring",
+            start_time="2024-03-10T10:00:00Z",
+            end_time="2024-03-10T11:00:00Z",
+        )
+        autumn = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="Autumn",
+            start_time="2024-10-10T10:00:00Z",
+            end_time="2024-10-10T11:00:00Z",
+        )
+        spring.materials.add(*Material.objects.for_uploads([
+            SimpleUploadedFile("notes.txt", b"notes " * 100),
+            SimpleUploadedFile("photo.jpg", b"\xff\xd8 not really a photo"),
+        ]))
+        autumn.materials.add(*Material.objects.for_uploads([
+            SimpleUploadedFile("notes.txt", b"autumn notes"),
+        ]))
+
+    def download(self, url):
+        """Downloads an archive and returns it opened."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_class_archive_holds_every_material(self):
+        """
+        The class archive has all materials, with unique names, and stores
+        already compressed files without deflating them.
+        """
+        self.client.force_login(self.student)
+        archive = self.download(
+            reverse("class_materials_zip", kwargs={"class_id": self.english_class.pk})
+        )
+        self.assertEqual(
+            sorted(archive.namelist()), ["notes (2).txt", "notes.txt", "photo.jpg"]
+        )
+        self.assertEqual(archive.getinfo("photo.jpg").compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(archive.getinfo("notes.txt").compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(
+            {archive.read("notes.txt"), archive.read("notes (2).txt")},
+            {b"notes " * 100, b"autumn notes"},
+        )
+
+    def test_term_archive_and_access(self):
+        """
+        The term archive only has the materials of the term's lessons, and
+        users outside the class cannot download it.
+        """
+        url = reverse("schedule_materials_zip", kwargs={"schedule_id": self.schedule.pk})
+        self.client.force_login(self.teacher)
+        archive = self.download(url)
+        self.assertEqual(sorted(archive.namelist()), ["notes.txt", "photo.jpg"])
+        self.assertEqual(archive.read("notes.txt"), b"notes " * 100)
+
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class MaterialImportTests(TestCase):
+    """
+    Test suite for the bulk import of material files.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a class with two lessons to import materials into.
+        """
+        cls.teacher = User.objects.create_superuser("teacher", is_teacher=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.grammar = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="Grammar",
+            start_time="2024-03-10T12:00:00Z",
+            end_time="2024-03-10T13:00:00Z",
+        )
+        cls.reading = Lesson.objects.create(
+            english_class=cls.english_class,
+            title="Reading",
+            start_time="2024-03-17T12:00:00Z",
+            end_time="2024-03-17T13:00:00Z",
+        )
+
+    def setUp(self):
+        """
+        Lays out an import directory: one file per lesson, by title and by date,
+        the same handout for both, and files that cannot be imported.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.write("English 101/Grammar/verbs.txt", b"verbs " * 1000)
+        self.write("English 101/Grammar/handout.pdf", b"%PDF handout")
+        self.write("English 101/2024-03-17/handout.pdf", b"%PDF handout")
+        self.write("English 101/2024-03-17/script.exe", b"MZ")
+        self.write("English 101/Speaking/topics.txt", b"topics")
+
+    def write(self, name, data):
+        """Writes a file under the import directory."""
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def test_import_directory_is_idempotent(self):
+        """
+        Files are stored once per content, linked to the lessons named by title
+        or date, and importing them again changes nothing.
+        """
+        out, err = StringIO(), StringIO()
+        call_command("import_materials", self.root, "--workers", "0", stdout=out, stderr=err)
+        self.assertIn(
+            "2 material(s) created, 1 reused, 3 lesson link(s) added, 2 skipped", out.getvalue()
+        )
+        self.assertIn("script.exe", err.getvalue())
+        self.assertIn('no lesson "Speaking"', err.getvalue())
+
+        self.assertEqual(
+            sorted(self.grammar.materials.values_list("title", flat=True)),
+            ["handout.pdf", "verbs.txt"],
+        )
+        self.assertEqual(list(self.reading.materials.values_list("title", flat=True)),
+                         ["handout.pdf"])
+        verbs = Material.objects.with_content().get(title="verbs.txt")
+        self.assertNotEqual(verbs.compression, "")
+        with verbs.open_content() as file:
+            self.assertEqual(file.read(), b"verbs " * 1000)
+        self.assertEqual(verbs.sha256, hashlib.sha256(b"verbs " * 1000).hexdigest())
+
+        # The second run hashes the files in a process pool
+        out = StringIO()
+        call_command("import_materials", self.root, "--workers", "2", stdout=out, stderr=StringIO())
+        self.assertIn("0 material(s) created, 3 reused, 0 lesson link(s) added", out.getvalue())
+        self.assertEqual(Material.objects.count(), 2)
+
+    def test_import_manifest(self):
+        """
+        A CSV manifest links files with paths relative to it.
+        """
+        manifest = os.path.join(self.root, "manifest.csv")
+        with open(manifest, "w", encoding="utf-8") as file:
+            file.write("path,class,lesson\n")
+            file.write("English 101/Grammar/verbs.txt,English 101,Reading\n")
+        call_command("import_materials", manifest, "--workers", "0", stdout=StringIO())
+        self.assertEqual(list(self.reading.materials.values_list("title", flat=True)),
+                         ["verbs.txt"])
+        self.assertFalse(self.grammar.materials.exists())
+
+    def test_admin_action_queues_the_import(self):
+        """
+        The class admin action only queues the import of the selected classes'
+        folders, which the command then runs.
+        """
+        self.client.force_login(self.teacher)
+        with override_settings(MATERIAL_IMPORT_ROOT=self.root):
+            response = self.client.post(
+                reverse("admin:scheduling_englishclass_changelist"),
+                {"action": "import_materials", "_selected_action": [self.english_class.pk]},
+                follow=True,
+            )
+            self.assertContains(response, "The import was queued")
+            self.assertFalse(Material.objects.exists())
+
+            out = StringIO()
+            call_command("import_materials", "--queued", stdout=out)
+        self.assertIn("1 queued import(s) run", out.getvalue())
+        material_import = MaterialImport.objects.get()
+        self.assertEqual(material_import.status, "done")
+        self.assertEqual(material_import.requested_by, self.teacher)
+        self.assertEqual(material_import.report["created"], 2)
+        self.assertEqual(self.grammar.materials.count(), 2)
+
+    def test_failed_batch_leaves_no_stored_files(self):
+        """
+        The files stored for a batch whose rows cannot be inserted are deleted.
+        """
+        storage = material_storage()
+        stored = []
+        save = storage.save
+
+        def record_save(name, content, **kwargs):
+            stored.append(save(name, content, **kwargs))
+            return stored[-1]
+
+        items = collect_directory(self.root)
+        with mock.patch.object(storage, "save", record_save), mock.patch.object(
+            Material.objects, "bulk_create", side_effect=DatabaseError("disk full")
+        ):
+            with self.assertRaises(DatabaseError):
+                import_materials(items, workers=0)
+        self.assertEqual(len(stored), 2)
+        self.assertFalse(any(storage.exists(name) for name in stored))
+
+
+class BatchLessonUpdateTests(TestCase):
+    """
+    Test suite for updating many lessons in one request.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a week of lessons in a class and a lesson of another teacher.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.other_teacher = User.objects.create_user("other", is_teacher=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        other_class = EnglishClass.objects.create(title="English 201", teacher=cls.other_teacher)
+        cls.lessons = [
+            Lesson.objects.create(
+                english_class=cls.english_class,
+                title=f"Day {day}",
+                start_time=f"2024-03-{day:02d}T10:00:00Z",
+                end_time=f"2024-03-{day:02d}T11:00:00Z",
+            )
+            for day in range(11, 16)
+        ]
+        cls.foreign = Lesson.objects.create(
+            english_class=other_class,
+            title="Foreign",
+            start_time="2024-03-11T10:00:00Z",
+            end_time="2024-03-11T11:00:00Z",
+        )
+
+    def post(self, changes):
+        """Sends a batch of lesson changes."""
+        return self.client.post(
+            reverse("update_lessons"), {"lessons": changes}, content_type="application/json"
+        )
+
+    def test_moving_a_week_takes_one_request(self):
+        """
+        All lessons of a week move in one request with a fixed number of queries,
+        and the moved lessons are renumbered and returned.
+        """
+        self.client.force_login(self.teacher)
+        # The last lesson moves first, the others one week later
+        changes = [
+            {"id": lesson.pk, "start": f"2024-03-{day:02d}T10:00:00Z",
+             "end": f"2024-03-{day:02d}T11:30:00Z"}
+            for lesson, day in zip(self.lessons, [18, 19, 20, 21, 4])
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(changes)
+        self.assertEqual(response.status_code, 200)
+        # Including the double-booking check of the moved lessons
+        self.assertLessEqual(len(queries), 21)
+        data = response.json()
+        self.assertEqual([result["status"] for result in data["results"]], ["success"] * 5)
+        self.assertEqual(len(data["events"]), 5)
+        self.assertEqual(
+            list(
+                Lesson.objects.filter(english_class=self.english_class)
+                .order_by("sequence_number")
+                .values_list("title", flat=True)
+            ),
+            ["Day 15", "Day 11", "Day 12", "Day 13", "Day 14"],
+        )
+        moved = Lesson.objects.get(pk=self.lessons[0].pk)
+        self.assertEqual(moved.end_time.isoformat(), "2024-03-18T11:30:00+00:00")
+
+    def test_renumbered_lessons_are_returned(self):
+        """
+        Moving a lesson before the others returns the new sequence numbers of the
+        lessons it passed.
+        """
+        self.client.force_login(self.teacher)
+        response = self.post([
+            {"id": self.lessons[3].pk, "start": "2024-03-10T10:00:00Z",
+             "end": "2024-03-10T11:00:00Z"},
+        ])
+        data = response.json()
+        self.assertEqual(data["events"][0]["extendedProps"]["sequence_number"], 1)
+        self.assertEqual(
+            data["ordinals"],
+            {str(lesson.pk): number for lesson, number in zip(self.lessons[:3], (2, 3, 4))},
+        )
+
+    def test_invalid_changes_do_not_block_the_others(self):
+        """
+        Lessons of other teachers, unknown lessons and invalid times are reported
+        per item while the valid changes are saved.
+        """
+        self.client.force_login(self.teacher)
+        response = self.post([
+            {"id": self.lessons[0].pk, "description": "Moved online", "location": "online",
+             "meeting_link": "https://meet.example.com/a"},
+            {"id": self.foreign.pk, "start": "2024-03-20T10:00:00Z"},
+            {"id": 0, "start": "2024-03-20T10:00:00Z"},
+            {"id": self.lessons[1].pk, "start": "2024-03-12T12:00:00Z"},
+            {"id": self.lessons[2].pk, "start": "tomorrow"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["success", "error", "error", "error", "error"],
+        )
+        self.assertIn("permission", results[1]["message"])
+        self.assertIn("end after it starts", results[3]["message"])
+        lesson = Lesson.objects.get(pk=self.lessons[0].pk)
+        self.assertEqual(lesson.meeting_link, "https://meet.example.com/a")
+        self.assertEqual(
+            Lesson.objects.get(pk=self.foreign.pk).start_time.isoformat(),
+            "2024-03-11T10:00:00+00:00",
+        )
+        self.assertEqual(
+            Lesson.objects.get(pk=self.lessons[1].pk).start_time.isoformat(),
+            "2024-03-12T10:00:00+00:00",
+        )
+
+    def test_malformed_batch_is_rejected(self):
+        """
+        A body without a list of changes is rejected.
+        """
+        self.client.force_login(self.teacher)
+        response = self.post({"id": self.lessons[0].pk})
+        self.assertEqual(response.status_code, 400)
+
+
+class LessonDeltaResponseTests(TestCase):
+    """
+    Test suite for the partial responses of the lesson update endpoint.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a class with three lessons and a second teacher.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.other_teacher = User.objects.create_user("other", is_teacher=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lessons = [
+            Lesson.objects.create(
+                english_class=cls.english_class,
+                title=f"Day {day}",
+                start_time=f"2024-03-{day:02d}T10:00:00Z",
+                end_time=f"2024-03-{day:02d}T11:00:00Z",
+                location="online",
+                meeting_link="https://meet.example.com/a",
+            )
+            for day in (11, 12, 13)
+        ]
+
+    def post(self, data):
+        """Sends an update of the first lesson."""
+        self.client.force_login(self.teacher)
+        return self.client.post(
+            reverse("update_lesson"),
+            {"id": self.lessons[0].pk, **data},
+            content_type="application/json",
+        )
+
+    def test_drag_takes_a_fixed_number_of_queries(self):
+        """
+        A drag takes the batch path: session and user, the lesson, the conflict
+        check, one UPDATE, the renumbering and the version bump.
+        """
+        self.client.force_login(self.teacher)
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                reverse("update_lesson"),
+                {
+                    "id": self.lessons[0].pk,
+                    "start": "2024-03-14T10:00:00Z",
+                    "end": "2024-03-14T11:00:00Z",
+                },
+                content_type="application/json",
+            )
+        self.assertEqual(response.json()["lesson"]["extendedProps"], {"sequence_number": 3})
+
+    def test_drag_returns_times_and_ordinals(self):
+        """
+        Moving a lesson returns its new times and position and the new positions
+        of the lessons it passed, without lookup tables or unchanged fields.
+        """
+        response = self.post(
+            {"start": "2024-03-14T10:00:00Z", "end": "2024-03-14T11:00:00Z"}
+        )
+        data = response.json()
+        self.assertEqual(
+            data["lesson"],
+            {
+                "id": self.lessons[0].pk,
+                "start": "2024-03-14T10:00:00+00:00",
+                "end": "2024-03-14T11:00:00+00:00",
+                "extendedProps": {"sequence_number": 3},
+            },
+        )
+        self.assertEqual(
+            data["ordinals"], {str(self.lessons[1].pk): 1, str(self.lessons[2].pk): 2}
+        )
+        self.assertNotIn("teachers", data)
+        # The meeting link is kept when the request does not mention it
+        self.assertEqual(
+            Lesson.objects.get(pk=self.lessons[0].pk).meeting_link, "https://meet.example.com/a"
+        )
+
+    def test_unchanged_fields_are_left_out(self):
+        """
+        Only the fields whose value changed are returned.
+        """
+        data = self.post({"description": "Past tense", "location": "online"}).json()
+        self.assertEqual(
+            data["lesson"],
+            {"id": self.lessons[0].pk, "extendedProps": {"description": "Past tense"}},
+        )
+        self.assertEqual(data["ordinals"], {})
+
+    def test_new_teacher_sends_class_lookups(self):
+        """
+        Changing the teacher returns the new title and the class lookup tables.
+        """
+        data = self.post({"teacher": self.other_teacher.pk}).json()
+        self.assertEqual(
+            data["lesson"]["extendedProps"], {"class_topic": "English 101 (1/3) | other"}
+        )
+        self.assertEqual(
+            data["classes"][str(self.english_class.pk)]["teacher_id"], self.other_teacher.pk
+        )
+
+
+class RecurrenceTests(TestCase):
+    """
+    Test suite for lessons generated from a schedule's recurrence rule.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a class with a four-week term of Monday, Wednesday and Friday lessons.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.schedule = Schedule.objects.create(
+            english_class=cls.english_class,
+            term="March 2024",
+            start_date=datetime.date(2024, 3, 4),
+            end_date=datetime.date(2024, 3, 31),
+            recurrence="FREQ=WEEKLY;BYDAY=MO,WE,FR",
+            lesson_start=datetime.time(10, 0),
+            lesson_duration=datetime.timedelta(minutes=90),
+            excluded_dates=["2024-03-13"],
+        )
+
+    def lesson_days(self):
+        """Returns the day of month of every lesson of the class, in sequence order."""
+        return [
+            lesson.start_time.day
+            for lesson in Lesson.objects.filter(english_class=self.english_class).order_by(
+                "sequence_number"
+            )
+        ]
+
+    def test_rules_expand_to_dates(self):
+        """
+        Rules are expanded between the schedule dates, with intervals, counts and
+        excluded dates, and invalid rules are rejected.
+        """
+        self.assertEqual(
+            [day.day for day in occurrence_dates(self.schedule)],
+            [4, 6, 8, 11, 15, 18, 20, 22, 25, 27, 29],
+        )
+        self.schedule.recurrence = "RRULE:FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,SA"
+        self.assertEqual([day.day for day in occurrence_dates(self.schedule)], [5, 9, 19, 23])
+        # The excluded 13th counts towards COUNT
+        self.schedule.recurrence = "FREQ=DAILY;INTERVAL=3;COUNT=4"
+        self.assertEqual([day.day for day in occurrence_dates(self.schedule)], [4, 7, 10])
+        self.schedule.recurrence = "FREQ=DAILY;UNTIL=20240306"
+        self.assertEqual([day.day for day in occurrence_dates(self.schedule)], [4, 5, 6])
+        for rule in ("FREQ=MONTHLY", "FREQ=WEEKLY;BYDAY=XX", "FREQ=DAILY;BYHOUR=9"):
+            with self.assertRaises(ValueError):
+                parse_rule(rule)
+
+    def test_generation_uses_bulk_inserts(self):
+        """
+        A term's lessons are inserted with one statement and numbered in order;
+        generating again changes nothing.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            report = generate_lessons(self.schedule)
+        self.assertEqual(report, {"created": 11, "updated": 0, "deleted": 0, "conflicts": []})
+        inserts = [query for query in queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.lesson_days(), [4, 6, 8, 11, 15, 18, 20, 22, 25, 27, 29])
+        lesson = Lesson.objects.get(recurrence_date="2024-03-04")
+        self.assertEqual(lesson.start_time.isoformat(), "2024-03-04T10:00:00+00:00")
+        self.assertEqual(lesson.end_time.isoformat(), "2024-03-04T11:30:00+00:00")
+        self.assertEqual(lesson.sequence_number, 1)
+        self.assertEqual(
+            generate_lessons(self.schedule),
+            {"created": 0, "updated": 0, "deleted": 0, "conflicts": []},
+        )
+
+    def test_regenerating_the_tail_keeps_the_past(self):
+        """
+        Changing the rule from a date on only touches the lessons from that date,
+        and kept lessons keep their materials.
+        """
+        generate_lessons(self.schedule)
+        first = Lesson.objects.get(recurrence_date="2024-03-06")
+        kept = Lesson.objects.get(recurrence_date="2024-03-25")
+        kept.materials.add(*Material.objects.for_uploads([SimpleUploadedFile("a.txt", b"a")]))
+
+        self.schedule.recurrence = "FREQ=WEEKLY;BYDAY=MO,TH"
+        self.schedule.lesson_start = datetime.time(14, 0)
+        report = generate_lessons(self.schedule, from_date=datetime.date(2024, 3, 18))
+        self.assertEqual(report, {"created": 2, "updated": 2, "deleted": 4, "conflicts": []})
+        self.assertEqual(self.lesson_days(), [4, 6, 8, 11, 15, 18, 21, 25, 28])
+        self.assertEqual(Lesson.objects.get(pk=first.pk).start_time.hour, 10)
+        kept = Lesson.objects.get(pk=kept.pk)
+        self.assertEqual(kept.start_time.hour, 14)
+        self.assertEqual(kept.materials.count(), 1)
+
+    def test_class_form_and_edit_this_and_following(self):
+        """
+        Creating a class with a rule generates its lessons, and editing a lesson
+        with "apply to following" changes the rest of the series only.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("create_english_class"),
+            {
+                "title": "English 102",
+                "description": "Weekly",
+                "color": "#FFD700",
+                "teacher": self.teacher.pk,
+                "term": "March 2024",
+                "start_date": "2024-03-04",
+                "end_date": "2024-03-17",
+                "recurrence": "FREQ=WEEKLY;BYDAY=TU",
+                "lesson_start": "09:00",
+                "excluded_dates": "",
+            },
+            follow=True,
+        )
+        self.assertContains(response, "2 lessons scheduled.")
+        lessons = list(
+            Lesson.objects.filter(english_class__title="English 102").order_by("start_time")
+        )
+        self.assertEqual([lesson.start_time.day for lesson in lessons], [5, 12])
+
+        response = self.client.post(
+            reverse("update_lesson_view", kwargs={"pk": lessons[0].pk}),
+            {
+                "title": "Conversation",
+                "description": "",
+                "start_time": "2024-03-05T16:00",
+                "end_time": "2024-03-05T17:00",
+                "location": "on-site",
+                "apply_to_following": "on",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        later = Lesson.objects.get(pk=lessons[1].pk)
+        self.assertEqual(later.title, "Conversation")
+        self.assertEqual(
+            (later.start_time.hour, later.end_time.hour, later.start_time.day), (16, 17, 12)
+        )
+
+
+class LessonShiftTests(TestCase):
+    """
+    Test suite for moving a lesson and all later lessons of its class at once.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates a class with a lesson on each of four consecutive days.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.other_teacher = User.objects.create_user("other", is_teacher=True)
+        cls.english_class = EnglishClass.objects.create(title="English 101", teacher=cls.teacher)
+        cls.lessons = [
+            Lesson.objects.create(
+                english_class=cls.english_class,
+                title=f"Day {day}",
+                start_time=f"2024-03-{day:02d}T10:00:00Z",
+                end_time=f"2024-03-{day:02d}T11:00:00Z",
+            )
+            for day in (11, 12, 13, 14)
+        ]
+
+    def shift(self, lesson, **delta):
+        """Moves a lesson and the following ones through the JSON endpoint."""
+        return self.client.post(
+            reverse("shift_lesson_series", kwargs={"pk": lesson.pk}),
+            delta,
+            content_type="application/json",
+        )
+
+    def days(self):
+        """Returns (title, day of month) of the class lessons in sequence order."""
+        return [
+            (lesson.title, lesson.start_time.day)
+            for lesson in Lesson.objects.filter(english_class=self.english_class).order_by(
+                "sequence_number"
+            )
+        ]
+
+    def test_delay_moves_the_rest_in_one_update(self):
+        """
+        A week's delay moves the lesson and the later ones with a single UPDATE
+        and returns their new times.
+        """
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.shift(self.lessons[2], days=7)
+        updates = [
+            query for query in queries
+            if query["sql"].startswith('UPDATE "scheduling_lesson"')
+        ]
+        self.assertEqual(len(updates), 1)
+        data = response.json()
+        self.assertEqual(
+            data["events"],
+            [
+                {
+                    "id": self.lessons[2].pk,
+                    "start": "2024-03-20T10:00:00+00:00",
+                    "end": "2024-03-20T11:00:00+00:00",
+                    "extendedProps": {"sequence_number": 3},
+                },
+                {
+                    "id": self.lessons[3].pk,
+                    "start": "2024-03-21T10:00:00+00:00",
+                    "end": "2024-03-21T11:00:00+00:00",
+                    "extendedProps": {"sequence_number": 4},
+                },
+            ],
+        )
+        self.assertEqual(self.days(), [("Day 11", 11), ("Day 12", 12), ("Day 13", 20),
+                                       ("Day 14", 21)])
+
+    def test_moving_earlier_renumbers_passed_lessons(self):
+        """
+        Moving a series earlier than lessons before it renumbers the class and
+        returns the passed lessons with their new positions.
+        """
+        self.client.force_login(self.teacher)
+        data = self.shift(self.lessons[2], days=-3).json()
+        # Lessons starting at the same time keep the order of their ids
+        self.assertEqual(
+            self.days(), [("Day 13", 10), ("Day 11", 11), ("Day 14", 11), ("Day 12", 12)]
+        )
+        self.assertEqual(
+            [(event["id"], event["extendedProps"]["sequence_number"]) for event in data["events"]],
+            [(self.lessons[2].pk, 1), (self.lessons[0].pk, 2), (self.lessons[3].pk, 3),
+             (self.lessons[1].pk, 4)],
+        )
+
+    def test_lesson_list_form_and_permissions(self):
+        """
+        The lesson list form redirects back to the list; other teachers and
+        invalid shifts are refused.
+        """
+        url = reverse("shift_lesson_series", kwargs={"pk": self.lessons[3].pk})
+        self.client.force_login(self.other_teacher)
+        self.assertEqual(self.shift(self.lessons[3], days=7).status_code, 403)
+
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.shift(self.lessons[3], days=0).status_code, 400)
+        self.assertEqual(self.shift(self.lessons[3], days="soon").status_code, 400)
+        response = self.client.post(url, {"days": "1", "hours": "2"})
+        self.assertRedirects(
+            response,
+            reverse("lessons_list", kwargs={"class_id": self.english_class.pk}),
+            fetch_redirect_response=False,
+        )
+        lesson = Lesson.objects.get(pk=self.lessons[3].pk)
+        self.assertEqual(lesson.start_time.isoformat(), "2024-03-15T12:00:00+00:00")
+
+
+def utc(day, hour, minute=0):
+    """Returns an aware datetime on a day of March 2024, in UTC."""
+    return datetime.datetime(2024, 3, day, hour, minute, tzinfo=datetime.timezone.utc)
+
+
+class LessonConflictTests(TestCase):
+    """
+    Test suite for the detection of teacher and student double-bookings.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Creates two classes of one teacher and a class of another teacher sharing a
+        student with the first, each with a lesson on March 11.
+        """
+        cls.teacher = User.objects.create_user("teacher", is_teacher=True)
+        cls.other_teacher = User.objects.create_user("other", is_teacher=True)
+        cls.student = User.objects.create_user("student", is_student=True)
+        cls.grammar = EnglishClass.objects.create(title="Grammar", teacher=cls.teacher)
+        cls.speaking = EnglishClass.objects.create(title="Speaking", teacher=cls.teacher)
+        cls.reading = EnglishClass.objects.create(title="Reading", teacher=cls.other_teacher)
+        cls.grammar.students.add(cls.student)
+        cls.reading.students.add(cls.student)
+        cls.grammar_lesson, cls.speaking_lesson, cls.reading_lesson = [
+            Lesson.objects.create(
+                english_class=english_class,
+                title=english_class.title,
+                start_time=utc(11, hour),
+                end_time=utc(11, hour + 1),
+            )
+            for english_class, hour in ((cls.grammar, 10), (cls.speaking, 14), (cls.reading, 16))
+        ]
+
+    def test_moving_onto_a_teachers_lesson_is_rejected(self):
+        """
+        A drag that double-books the teacher is answered with 409 and the conflict,
+        and the lesson stays where it was.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("update_lesson"),
+            {
+                "id": self.speaking_lesson.pk,
+                "start": "2024-03-11T10:30:00Z",
+                "end": "2024-03-11T11:30:00Z",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 409)
+        [conflict] = response.json()["conflicts"]
+        self.assertEqual(conflict["conflicting_lesson_id"], self.grammar_lesson.pk)
+        self.assertEqual((conflict["username"], conflict["role"]), ("teacher", "teacher"))
+        self.speaking_lesson.refresh_from_db()
+        self.assertEqual(self.speaking_lesson.start_time, utc(11, 14))
+
+    def test_students_are_checked_across_classes(self):
+        """
+        A lesson overlapping another class of one of its students conflicts for that
+        student only; lessons touching end to start do not.
+        """
+        self.reading_lesson.start_time, self.reading_lesson.end_time = utc(11, 9), utc(11, 11)
+        conflicts = find_conflicts([self.reading_lesson])
+        self.assertEqual(
+            [(c["other"], c["user_id"], c["role"]) for c in conflicts],
+            [(self.grammar_lesson, self.student.pk, "student")],
+        )
+        self.reading_lesson.start_time, self.reading_lesson.end_time = utc(11, 11), utc(11, 12)
+        self.assertEqual(find_conflicts([self.reading_lesson]), [])
+
+    def test_cancelled_lessons_free_their_slot(self):
+        """
+        Moving a lesson onto a cancelled lesson of the same teacher is accepted.
+        """
+        Lesson.objects.filter(pk=self.grammar_lesson.pk).update(status="cancelled")
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("update_lesson"),
+            {
+                "id": self.speaking_lesson.pk,
+                "start": "2024-03-11T10:00:00Z",
+                "end": "2024-03-11T11:00:00Z",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.speaking_lesson.refresh_from_db()
+        self.assertEqual(self.speaking_lesson.start_time, utc(11, 10))
+
+    def test_batch_rejects_only_the_conflicting_moves(self):
+        """
+        The moves of a batch are checked against each other: of two lessons of a
+        teacher moved onto the same hour, the later one is rejected.
+        """
+        self.client.force_login(self.teacher)
+        response = self.client.post(
+            reverse("update_lessons"),
+            {
+                "lessons": [
+                    {
+                        "id": self.speaking_lesson.pk,
+                        "start": "2024-03-12T10:30:00Z",
+                        "end": "2024-03-12T11:30:00Z",
+                    },
+                    {
+                        "id": self.grammar_lesson.pk,
+                        "start": "2024-03-12T10:00:00Z",
+                        "end": "2024-03-12T11:00:00Z",
+                    },
+                ]
+            },
+            content_type="application/json",
+        )
+        speaking, grammar = response.json()["results"]
+        self.assertEqual(speaking["status"], "error")
+        self.assertEqual(speaking["conflicts"][0]["role"], "teacher")
+        self.assertEqual(grammar["status"], "success")
+        self.speaking_lesson.refresh_from_db()
+        self.assertEqual(self.speaking_lesson.start_time, utc(11, 14))
+
+    def test_term_is_checked_with_a_fixed_number_of_queries(self):
+        """
+        Checking a term costs the same number of queries however many lessons it
+        has (its class is already loaded), and generating one reports its
+        double-bookings.
+        """
+        term = [
+            Lesson(english_class=self.reading, start_time=utc(day, 10), end_time=utc(day, 11))
+            for day in range(1, 32)
+        ]
+        with self.assertNumQueries(4):
+            [conflict] = find_conflicts(term)
+        self.assertEqual(conflict["other"], self.grammar_lesson)
+
+        schedule = Schedule.objects.create(
+            english_class=self.reading,
+            term="March 2024",
+            start_date=datetime.date(2024, 3, 4),
+            end_date=datetime.date(2024, 3, 31),
+            recurrence="FREQ=DAILY",
+            lesson_start=datetime.time(10, 30),
+            lesson_duration=datetime.timedelta(hours=1),
+        )
+        report = generate_lessons(schedule)
+        self.assertEqual(report["created"], 28)
+        # Only the student's grammar lesson on the 11th overlaps
+        self.assertEqual(
+            [(c["conflicting_lesson_id"], c["username"]) for c in report["conflicts"]],
+            [(self.grammar_lesson.pk, "student")],
+        )
@@ -0,0 +1,268 @@
+# scheduling/uploads.py
+
+"""
+Streaming validation of uploaded material files (MaterialUploadHandler) and the
+resumable, chunked upload API.
+"""
+
+import hashlib
+import os
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from .models import Material, UploadChunk, UploadSession, material_storage
+
+
+def upload_rejections(request):
+    """
+    Return the messages explaining which uploaded files were rejected.
+
+    Args:
+        request: The HttpRequest object, after request.FILES has been read.
+
+    Returns:
+        list: One message per rejected file.
+    """
+    return getattr(request, "upload_rejections", [])
+
+
+def material_extension_allowed(file_name):
+    """
+    Check a file name against MATERIAL_UPLOAD_EXTENSIONS.
+
+    Returns:
+        bool: Whether files with this name may be uploaded as materials.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    return extension in settings.MATERIAL_UPLOAD_EXTENSIONS
+
+
+def accepts_material_uploads(view_func):
+    """
+    Install MaterialUploadHandler for the uploads sent to a view; other views keep
+    Django's default upload handlers.
+
+    The handler must be installed before request.POST or request.FILES is read,
+    which CsrfViewMiddleware does for POST requests. The view is therefore exempt
+    from the middleware and checked by csrf_protect once the handler is in place;
+    views that are csrf_exempt stay exempt.
+
+    Args:
+        view_func: The view.
+
+    Returns:
+        The wrapped view.
+    """
+    if getattr(view_func, "csrf_exempt", False):
+        checked_view = view_func
+    else:
+        checked_view = csrf_protect(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, MaterialUploadHandler(request))
+        return checked_view(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+class MaterialUploadHandler(TemporaryFileUploadHandler):
+    """
+    Upload handler streaming files to disk while checking and hashing them.
+    """
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        # The temporary file is opened first, so that the parser closes this file,
+        # not the previous (complete) one, when the upload is skipped
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        if not material_extension_allowed(file_name):
+            self.reject(f'"{file_name}" is not an accepted material type.', file_name)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.MATERIAL_UPLOAD_MAX_SIZE:
+            limit = filesizeformat(settings.MATERIAL_UPLOAD_MAX_SIZE)
+            self.reject(f'"{self.file_name}" is larger than {limit}.', self.file_name)
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+    def reject(self, message, file_name):
+        """
+        Record why a file is rejected and skip the rest of it.
+
+        Raises:
+            SkipFile: Always; the parser then closes (and so deletes) the
+            temporary file and discards the remaining data of the file.
+        """
+        if self.request is not None:
+            if not hasattr(self.request, "upload_rejections"):
+                self.request.upload_rejections = []
+            self.request.upload_rejections.append(message)
+        raise SkipFile(file_name)
+
+
+def start_upload(owner, file_name, size, chunk_size=None):
+    """
+    Start a chunked upload.
+
+    Args:
+        owner: The user uploading the file.
+        file_name: The name of the file.
+        size: The size of the file in bytes.
+        chunk_size: The size of the chunks the file is sent in; defaults to
+        (and may not exceed) MATERIAL_UPLOAD_CHUNK_SIZE.
+
+    Returns:
+        UploadSession: The new upload.
+
+    Raises:
+        ValueError: If the file is not an accepted material or has an invalid size.
+    """
+    max_chunk_size = settings.MATERIAL_UPLOAD_CHUNK_SIZE
+    chunk_size = chunk_size or max_chunk_size
+    if not file_name or not material_extension_allowed(file_name):
+        raise ValueError(f'"{file_name}" is not an accepted material type.')
+    if not 0 < size <= settings.MATERIAL_UPLOAD_MAX_SIZE:
+        limit = filesizeformat(settings.MATERIAL_UPLOAD_MAX_SIZE)
+        raise ValueError(f'"{file_name}" must be larger than 0 bytes and at most {limit}.')
+    if not 0 < chunk_size <= max_chunk_size:
+        raise ValueError(f"The chunk size must be at most {max_chunk_size} bytes.")
+    return UploadSession.objects.create(
+        owner=owner, file_name=file_name, size=size, chunk_size=chunk_size
+    )
+
+
+def store_chunk(session, index, stream):
+    """
+    Save one chunk of an upload, replacing a previous copy of it.
+
+    Args:
+        session: The UploadSession.
+        index: The position of the chunk, from 0.
+        stream: A file-like object (e.g. the request) to read the chunk from.
+
+    Raises:
+        ValueError: If the upload is complete, the index is out of range or the
+        chunk does not have the expected size.
+    """
+    if session.is_complete:
+        raise ValueError("This upload is already complete.")
+    if not 0 <= index < session.chunk_count:
+        raise ValueError(f"The chunk index must be between 0 and {session.chunk_count - 1}.")
+    expected = session.expected_chunk_size(index)
+    # One byte more than expected is enough to detect an oversize chunk
+    data = stream.read(expected + 1)
+    if len(data) != expected:
+        raise ValueError(f"Chunk {index} must be {expected} bytes long, not {len(data)}.")
+
+    storage = material_storage()
+    name = session.chunk_name(index)
+    storage.delete(name)
+    storage.save(name, ContentFile(data))
+    UploadChunk.objects.update_or_create(
+        session=session, index=index, defaults={"size": expected}
+    )
+    session.save(update_fields=["updated_at"])
+
+
+def upload_progress(session):
+    """
+    Describe the state of an upload.
+
+    Args:
+        session: The UploadSession.
+
+    Returns:
+        dict: The declared file, the bytes received, the indexes of the missing
+        chunks and, once complete, the id of the created material.
+    """
+    if session.is_complete:
+        # The chunks were discarded once assembled
+        received, missing = session.size, []
+    else:
+        sizes = dict(session.chunks.values_list("index", "size"))
+        received = sum(sizes.values())
+        missing = [index for index in range(session.chunk_count) if index not in sizes]
+    return {
+        "id": str(session.pk),
+        "file_name": session.file_name,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "received": received,
+        "missing_chunks": missing,
+        "complete": session.is_complete,
+        "material_id": session.material_id,
+    }
+
+
+def complete_upload(session):
+    """
+    Assemble the chunks of an upload into a Material.
+
+    The chunks are copied, one storage read at a time, into a temporary file
+    that is hashed on the way, then stored like any uploaded material (so an
+    identical, already stored file is reused). The chunks are deleted afterwards.
+
+    Args:
+        session: The UploadSession, with every chunk received.
+
+    Returns:
+        Material: The material holding the uploaded file.
+
+    Raises:
+        ValueError: If chunks are missing.
+    """
+    if session.is_complete:
+        return session.material
+    if session.chunks.count() != session.chunk_count:
+        raise ValueError("Some chunks of this upload have not been received yet.")
+
+    storage = material_storage()
+    digest = hashlib.sha256()
+    assembled = TemporaryUploadedFile(
+        session.file_name, "application/octet-stream", session.size, None
+    )
+    try:
+        for index in range(session.chunk_count):
+            with storage.open(session.chunk_name(index), "rb") as chunk:
+                for piece in chunk.chunks():
+                    digest.update(piece)
+                    assembled.write(piece)
+        assembled.seek(0)
+        assembled.sha256 = digest.hexdigest()
+        with transaction.atomic():
+            material = Material.objects.for_uploads([assembled])[0]
+            session.material = material
+            session.save(update_fields=["material", "updated_at"])
+    finally:
+        assembled.close()
+    discard_chunks(session)
+    return material
+
+
+def discard_chunks(session):
+    """
+    Delete the stored chunks of an upload.
+
+    Args:
+        session: The UploadSession.
+    """
+    storage = material_storage()
+    for index in session.chunks.values_list("index", flat=True):
+        storage.delete(session.chunk_name(index))
+    session.chunks.all().delete()
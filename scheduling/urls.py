@@ -1,21 +1,20 @@
 # scheduling/urls.py
 
-from django.urls import path
-from . import views
-
 """
-Defines URL patterns for the scheduling application.
-
-The URL patterns include:
-- The main schedule page that displays all lessons in a calendar view.
-- Functionalities for updating, creating, and deleting lessons and English classes.
-- Detailed views for individual lessons and classes, including creation and update forms.
+URL patterns of the scheduling application: the calendar and its lesson feeds,
+the lesson and class forms, and material downloads and uploads.
 """
 
+from django.urls import path
+from . import views
+
 
 urlpatterns = [
     path("", views.schedule, name="schedule"),
+    path("events/", views.lessons_feed, name="lessons_feed"),
+    path("events/export/", views.lessons_export, name="lessons_export"),
     path("update-lesson/", views.update_lesson, name="update_lesson"),
+    path("update-lessons/", views.update_lessons, name="update_lessons"),
     path("classes/", views.english_class_list, name="english_class_list"),
     path("classes/create/", views.create_english_class, name="create_english_class"),
     path(
@@ -39,4 +38,36 @@ urlpatterns = [
         "update-lesson/<int:pk>/", views.update_lesson_view, name="update_lesson_view"
     ),
     path("lessons/<int:pk>/delete/", views.delete_lesson, name="delete_lesson"),
+    path("lessons/<int:pk>/shift/", views.shift_lesson_series, name="shift_lesson_series"),
+    path(
+        "materials/<int:pk>/download/",
+        views.download_material,
+        name="download_material",
+    ),
+    path(
+        "classes/<int:class_id>/materials.zip",
+        views.class_materials_zip,
+        name="class_materials_zip",
+    ),
+    path(
+        "schedules/<int:schedule_id>/materials.zip",
+        views.schedule_materials_zip,
+        name="schedule_materials_zip",
+    ),
+    path("uploads/", views.start_material_upload, name="start_material_upload"),
+    path(
+        "uploads/<uuid:upload_id>/",
+        views.material_upload_progress,
+        name="material_upload_progress",
+    ),
+    path(
+        "uploads/<uuid:upload_id>/chunks/<int:index>/",
+        views.upload_material_chunk,
+        name="upload_material_chunk",
+    ),
+    path(
+        "uploads/<uuid:upload_id>/complete/",
+        views.complete_material_upload,
+        name="complete_material_upload",
+    ),
 ]
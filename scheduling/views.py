@@ -1,28 +1,70 @@
 # scheduling/views.py
 
 # Standard library imports
+import datetime
 import json
 
 # Third-party imports (Django is considered a third-party library)
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.utils.dateparse import parse_datetime
-from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_http_methods, require_POST
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Max, Q
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 
 
 # Local application imports
-from .models import Lesson, Material, EnglishClass, Schedule
+from heso.utils.query_budget import query_budget
+from .models import (
+    EnglishClass,
+    Lesson,
+    Material,
+    Schedule,
+    UploadSession,
+    renumber_lessons,
+    shift_lessons,
+)
 
 # from users.models import Teacher, Student
 from users.models import User
 from .forms import EnglishClassForm, ScheduleForm, LessonForm
+from .conflicts import find_conflicts, serialize_conflicts
+from .recurrence import generate_lessons
+from .cache import (
+    bump_schedule_version,
+    get_cached_schedule,
+    lesson_etag,
+    lesson_validators,
+    schedule_etag,
+)
+from .downloads import material_response, preview_response, zip_response
+from .uploads import (
+    accepts_material_uploads,
+    complete_upload,
+    start_upload,
+    store_chunk,
+    upload_progress,
+    upload_rejections,
+)
+from .serializers import (
+    EVENT_KEYS,
+    MATERIAL_FIELDS,
+    add_to_lookups,
+    iter_schedule_json,
+    new_lookups,
+    prepare_lessons,
+    serialize_lesson,
+    serialize_lesson_changes,
+    serialize_schedule,
+    serialize_schedule_compact,
+)
 
 
 def is_ajax(request):
@@ -38,95 +80,282 @@ def is_ajax(request):
     return request.META.get("HTTP_X_REQUESTED_WITH") == "XMLHttpRequest"
 
 
-def schedule(request):
+def _parse_window_bound(value):
     """
-    Display the schedule page with lessons data.
+    Parse a FullCalendar window bound into an aware datetime.
+
+    FullCalendar sends either a full ISO 8601 datetime or a plain date,
+    depending on the view and the calendar's time zone settings.
+
+    Args:
+        value: The raw query string value.
 
-    Fetches all lessons and related data, prepares them for FullCalendar,
-    and renders the schedule page.
+    Returns:
+        datetime: An aware datetime, or None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _filter_lessons(request, lessons):
+    """
+    Apply the optional 'class' and 'teacher' id filters of a request.
 
     Args:
         request: HttpRequest object.
+        lessons: A Lesson queryset.
 
     Returns:
-        HttpResponse: Rendered schedule page with lessons data.
+        QuerySet: The filtered lessons.
+
+    Raises:
+        ValueError: If a filter is not a numeric id.
+    """
+    if request.GET.get("class"):
+        lessons = lessons.filter(english_class_id=int(request.GET["class"]))
+    if request.GET.get("teacher"):
+        lessons = lessons.filter(english_class__teacher_id=int(request.GET["teacher"]))
+    return lessons
+
+
+@query_budget(3)
+def schedule(request):
     """
-    # Fetch all lessons with related class, teacher, and students data
-    lessons = Lesson.objects.prefetch_related(
-        "english_class", "english_class__teacher", "english_class__students"
-    ).all()
-    lessons_data = []
-    teachers = list(
-        User.objects.filter(is_teacher=True)
-        .values("id", "username"))
+    Display the schedule page.
+
+    The page itself is a small shell: FullCalendar fetches the lessons for the
+    visible date range from the lessons feed, so the page weight does not grow
+    with the lesson history.
 
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        HttpResponse: Rendered schedule page.
+    """
     is_readonly = False
     if request.user.is_authenticated:
         is_readonly = getattr(request.user, "is_student", False)
 
-    # Prepare lessons data for FullCalendar
-    for lesson in lessons:
-        total_lessons = lesson.english_class.lessons.count()
-        lesson_number = (
-            list(lesson.english_class.lessons.order_by("start_time")).index(lesson) + 1
-        )
+    # Optional class/teacher filters are passed through to the lessons feed
+    feed_filters = {
+        key: request.GET[key] for key in ("class", "teacher") if request.GET.get(key)
+    }
 
-        teacher_id = (
-            lesson.english_class.teacher.id if lesson.english_class.teacher else None
-        )
-        student_usernames_ids = list(
-            lesson.english_class.students.values("id", "username")
-        )
-        materials = Material.objects.filter(lessons=lesson)
+    return render(
+        request,
+        "scheduling/schedule.html",
+        {"feed_filters": feed_filters, "is_readonly": is_readonly},
+    )
+
+
+def _feed_lessons(request):
+    """
+    Build the lessons of a lessons feed request: the lessons overlapping the
+    'start' to 'end' window, narrowed down by the 'class' and 'teacher' filters.
+
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        QuerySet: The lessons.
+
+    Raises:
+        ValueError: If the window or a filter is invalid, with the message to show.
+    """
+    start = _parse_window_bound(request.GET.get("start"))
+    end = _parse_window_bound(request.GET.get("end"))
+    if start is None or end is None or start >= end:
+        raise ValueError("A valid 'start' and 'end' are required.")
+
+    # A lesson overlaps the window if it starts before the window ends
+    # and ends after the window starts
+    lessons = Lesson.objects.filter(start_time__lt=end, end_time__gt=start)
 
-        lesson_title = (
-            f"{lesson.english_class.title} "
-            f"({lesson_number}/{total_lessons}) | "
-            f"{lesson.english_class.teacher.username}"
+    try:
+        return _filter_lessons(request, lessons)
+    except ValueError:
+        raise ValueError("Filters must be numeric ids.")
+
+
+def _lessons_feed_validators(request):
+    """
+    Return the validators of a lessons feed request, computed once per request,
+    or None for an invalid request.
+    """
+    if not hasattr(request, "_lessons_feed_validators"):
+        try:
+            request._lessons_feed_validators = lesson_validators(_feed_lessons(request))
+        except ValueError:
+            request._lessons_feed_validators = None
+    return request._lessons_feed_validators
+
+
+def _lessons_feed_etag(request):
+    """Return the ETag of a lessons feed request, from the rows of its lessons."""
+    validators = _lessons_feed_validators(request)
+    return lesson_etag(request, validators) if validators else None
+
+
+def _lessons_feed_last_modified(request):
+    """Return the latest modification time of the lessons of a feed request."""
+    validators = _lessons_feed_validators(request)
+    return validators["last_modified"] if validators else None
+
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_lessons_feed_etag, last_modified_func=_lessons_feed_last_modified)
+@query_budget(8)
+def lessons_feed(request):
+    """
+    Return the lessons overlapping a date window as FullCalendar events.
+
+    Expects FullCalendar's 'start' and 'end' query parameters and optionally
+    accepts 'class' and 'teacher' ids to narrow the results down. The serialized
+    payload is cached per user until the schedule changes, and unchanged lessons
+    are answered with 304 Not Modified. With 'stream=1' the events are encoded and
+    sent incrementally instead, bypassing the cache. With 'format=compact' the
+    columnar payload of serialize_schedule_compact() is returned.
+
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        HttpResponse: The events with their lookup tables as JSON, or an error message.
+    """
+    try:
+        lessons = _feed_lessons(request)
+    except ValueError as error:
+        return JsonResponse({"status": "error", "message": str(error)}, status=400)
+
+    if request.GET.get("stream") and request.GET.get("format") != "compact":
+        return StreamingHttpResponse(
+            iter_schedule_json(lessons), content_type="application/json"
         )
 
-        lessons_data.append(
-            {
-                "id": lesson.id,
-                "title": lesson_title,
-                "start": lesson.start_time.isoformat(),
-                "end": lesson.end_time.isoformat(),
-                "backgroundColor": lesson.english_class.color,
-                "extendedProps": {
-                    "class_topic": lesson.title,
-                    "description": lesson.description,
-                    "meeting_link": lesson.meeting_link,
-                    "location": lesson.location,
-                    "teacher_id": teacher_id,
-                    "teachers": teachers,
-                    "students": student_usernames_ids,
-                    "materials": list(materials.values("id", "title")),
-                },
-            }
+    if request.GET.get("format") == "compact":
+        serialize = serialize_schedule_compact
+    else:
+        serialize = serialize_schedule
+
+    content = get_cached_schedule(
+        request.user,
+        request.GET.items(),
+        lambda: json.dumps(serialize(lessons), separators=(",", ":")),
+    )
+    return HttpResponse(content, content_type="application/json")
+
+
+@login_required
+@require_GET
+@query_budget(6)
+def lessons_export(request):
+    """
+    Stream every lesson visible to the user as a downloadable JSON file.
+
+    Superusers get the whole school, teachers the classes they teach and
+    students the classes they are enrolled in. The optional 'start', 'end',
+    'class' and 'teacher' parameters narrow the export down. The response is
+    generated incrementally, so memory use does not grow with the lesson count.
+
+    Args:
+        request: HttpRequest object.
+
+    Returns:
+        StreamingHttpResponse: The events with their lookup tables as JSON, or an error
+        message.
+    """
+    if request.user.is_superuser:
+        lessons = Lesson.objects.all()
+    elif request.user.is_teacher:
+        lessons = Lesson.objects.filter(english_class__teacher=request.user)
+    else:
+        lessons = Lesson.objects.filter(english_class__students=request.user)
+
+    start = _parse_window_bound(request.GET.get("start"))
+    end = _parse_window_bound(request.GET.get("end"))
+    if start:
+        lessons = lessons.filter(end_time__gt=start)
+    if end:
+        lessons = lessons.filter(start_time__lt=end)
+
+    try:
+        lessons = _filter_lessons(request, lessons)
+    except ValueError:
+        return JsonResponse(
+            {"status": "error", "message": "Filters must be numeric ids."}, status=400
         )
 
-    # Render the schedule page with lessons data
-    return render(
-        request,
-        "scheduling/schedule.html",
-        {"lessons_list": json.dumps(lessons_data), "is_readonly": is_readonly},
+    response = StreamingHttpResponse(
+        iter_schedule_json(lessons.order_by("start_time", "pk")),
+        content_type="application/json",
     )
+    response["Content-Disposition"] = 'attachment; filename="lessons.json"'
+    return response
+
+
+def _lesson_details_validators(request):
+    """
+    Return the validators of a lesson details GET request, computed once per
+    request, or None for POST requests and invalid lesson ids.
+    """
+    if not hasattr(request, "_lesson_details_validators"):
+        request._lesson_details_validators = None
+        if request.method in ("GET", "HEAD"):
+            try:
+                request._lesson_details_validators = lesson_validators(
+                    Lesson.objects.filter(pk=int(request.GET.get("lessonId")))
+                )
+            except (TypeError, ValueError):
+                pass
+    return request._lesson_details_validators
+
+
+def _lesson_details_etag(request):
+    """Return the ETag of a lesson details request, from the rows of the lesson."""
+    validators = _lesson_details_validators(request)
+    return lesson_etag(request, validators) if validators else None
+
+
+def _lesson_details_last_modified(request):
+    """Return the latest modification time of the lesson of a details request."""
+    validators = _lesson_details_validators(request)
+    return validators["last_modified"] if validators else None
 
 
 @csrf_exempt
-@require_POST
+@require_http_methods(["GET", "POST"])
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_lesson_details_etag, last_modified_func=_lesson_details_last_modified)
+@query_budget(8)
 def lesson_details(request):
     """
     Provide details for a specific lesson via AJAX.
 
+    The lesson id is read from the 'lessonId' query parameter of a GET request,
+    which supports conditional requests, or from the JSON body of a POST request.
+
     Args:
         request: The HttpRequest object, expected to be AJAX with 'lessonId'.
 
     Returns:
         JsonResponse with lesson details if found, or error message.
     """
-    data = json.loads(request.body)
-    lesson_id = data.get("lessonId")
+    if request.method == "GET":
+        lesson_id = request.GET.get("lessonId")
+    else:
+        data = json.loads(request.body)
+        lesson_id = data.get("lessonId")
 
     if not request.user.is_authenticated:
         return JsonResponse(
@@ -134,7 +363,7 @@ def lesson_details(request):
             status=403,
         )
 
-    lesson = get_object_or_404(Lesson, pk=lesson_id)
+    lesson = get_object_or_404(prepare_lessons(Lesson.objects.all()), pk=lesson_id)
 
     if not (
         request.user.is_superuser
@@ -149,59 +378,30 @@ def lesson_details(request):
             status=403,
         )
 
-    total_lessons = lesson.english_class.lessons.count()
-    lesson_number = (
-        list(lesson.english_class.lessons.order_by("start_time")).index(lesson) + 1
+    lookups = new_lookups()
+    add_to_lookups(lookups, lesson)
+    return JsonResponse(
+        {"status": "success", "lesson": serialize_lesson(lesson), **lookups},
+        status=200,
     )
 
-    teachers = User.objects.filter(is_teacher=True)
-    students = lesson.english_class.students.all()
-    materials = lesson.materials.all()
-
-    lesson_title = (
-        f"{lesson.english_class.title} "
-        f"({lesson_number}/{total_lessons}) | "
-        f"{lesson.english_class.teacher.username if lesson.english_class.teacher else 'No teacher'}"
-    )
-
-    lesson_data = {
-        "id": lesson.id,
-        "title": lesson_title,
-        "start": lesson.start_time.isoformat(),
-        "end": lesson.end_time.isoformat(),
-        "backgroundColor": lesson.english_class.color,
-        "extendedProps": {
-            "class_topic": lesson.title,
-            "description": lesson.description,
-            "meeting_link": lesson.meeting_link if lesson.location == "online" else "",
-            "location": lesson.location,
-            "teacher_id": (
-                lesson.english_class.teacher.id
-                if lesson.english_class.teacher
-                else None
-            ),
-            "teachers": [
-                {"id": teacher.id, "username": teacher.username} for teacher in teachers
-            ],
-            "students": [
-                {"id": student.id, "username": student.username} for student in students
-            ],
-            "materials": [
-                {"id": material.id, "title": material.title} for material in materials
-            ],
-        },
-    }
-
-    return JsonResponse({"status": "success", "lesson": lesson_data}, status=200)
-
 
+@accepts_material_uploads
 @csrf_exempt
 @require_POST
+@query_budget(21)
 def update_lesson(request):
     """
     Update a specific lesson's details.
 
     Handles AJAX POST requests to update lesson information in the database.
+    The response only describes what changed: a partial event with the changed
+    fields ('lesson'), the new sequence numbers of the other lessons of the class
+    that moved ('ordinals') and, when the teacher or students changed, the
+    lookup tables of the class. A change that would double-book the teacher or
+    a student is rolled back and answered with 409 and the 'conflicts'. JSON
+    requests that only move the lesson or change its own fields are saved the
+    way batch updates are, with a fixed handful of queries.
 
     Args:
         request: The HttpRequest object, expected to contain lesson details.
@@ -218,6 +418,10 @@ def update_lesson(request):
     if request.content_type == "application/json":
         data = json.loads(request.body.decode("utf-8"))
         lesson_id = data.get("id")
+        if set(data) <= LESSON_CHANGE_KEYS:
+            # Moves are held to the batch path's own, tighter budget
+            request.query_budget = LESSON_CHANGE_QUERY_BUDGET
+            return _update_lesson_fields(request, data)
     else:
         data = request.POST
         lesson_id = data["lessonId"]
@@ -226,7 +430,7 @@ def update_lesson(request):
         lesson = Lesson.objects.select_related("english_class").get(pk=lesson_id)
 
         if not (
-            request.user.is_superuser or request.user == lesson.english_class.teacher
+            request.user.is_superuser or request.user.pk == lesson.english_class.teacher_id
         ):
             return JsonResponse(
                 {
@@ -237,6 +441,9 @@ def update_lesson(request):
             )
 
         with transaction.atomic():
+            previous = {field: getattr(lesson, field) for field in EVENT_KEYS}
+            class_changed = materials_changed = False
+
             # Update lesson fields if they are provided
             if "description" in data:
                 lesson.description = data["description"]
@@ -250,12 +457,10 @@ def update_lesson(request):
                 )
             if "location" in data:
                 lesson.location = data["location"]
-            if "meeting_link" in data and lesson.location == "online":
+            if lesson.location != "online":
+                lesson.meeting_link = None  # Clear meeting link if location is not online
+            elif "meeting_link" in data:
                 lesson.meeting_link = data["meeting_link"]
-            else:
-                lesson.meeting_link = (
-                    None  # Clear meeting link if location is not online
-                )
 
             # Update the teacher if provided
             if "teacher" in data:
@@ -266,20 +471,14 @@ def update_lesson(request):
                     ).first()
                     lesson.english_class.teacher = teacher
                     lesson.english_class.save()
-                    total_lessons = lesson.english_class.lessons.count()
-                    lesson_number = (
-                        list(lesson.english_class.lessons.order_by("start_time")).index(
-                            lesson
-                        )
-                        + 1
-                    )
                     lesson_title_base = (
                         f"{lesson.english_class.title} "
-                        f"({lesson_number}/{total_lessons})"
+                        f"({lesson.ordinal_label})"
                     )
                     lesson_title = f"{lesson_title_base} | {teacher.username}"
 
                     lesson.title = lesson_title
+                    class_changed = True
 
                 except User.DoesNotExist:
                     return JsonResponse(
@@ -291,72 +490,68 @@ def update_lesson(request):
                 student_ids = data["students"]
                 students = User.objects.filter(id__in=student_ids, is_student=True)
                 lesson.english_class.students.set(students)
+                class_changed = True
 
             # Update materials if provided
             if "materials" in data:
                 material_ids = data["materials"]
                 lesson.materials.clear()
                 lesson.materials.set(Material.objects.filter(id__in=material_ids))
+                materials_changed = True
 
             if request.FILES.getlist("new_materials"):
-                for uploaded_file in request.FILES.getlist("new_materials"):
-                    if uploaded_file:
-                        material, created = Material.objects.get_or_create(
-                            title=uploaded_file.name,
-                            type="file",
-                            content=uploaded_file.read(),
-                        )
-                        if created:
-                            lesson.materials.add(material)
-
-            lesson.save()
-
-            updated_lesson = Lesson.objects.get(pk=lesson_id)
-
-            total_lessons = updated_lesson.english_class.lessons.count()
-            lesson_number = (
-                list(updated_lesson.english_class.lessons.order_by("start_time")).index(
-                    updated_lesson
+                lesson.materials.add(
+                    *Material.objects.for_uploads(request.FILES.getlist("new_materials"))
                 )
-                + 1
-            )
-            teachers = User.objects.filter(is_teacher=True)
-            students = User.objects.filter(
-                is_student=True, enrolled_classes__lessons=updated_lesson
-            )
-            materials = Material.objects.filter(lessons=updated_lesson)
+                materials_changed = True
 
-            lesson_title_base = (
-                f"{updated_lesson.english_class.title} "
-                f"({lesson_number}/{total_lessons})"
+            moved = (lesson.start_time, lesson.end_time) != (
+                previous["start_time"], previous["end_time"]
             )
-            lesson_title = f"{lesson_title_base} | {updated_lesson.english_class.teacher.username}"
-
-            updated_lesson_data = {
-                "id": updated_lesson.id,
-                "title": lesson_title,
-                "start": updated_lesson.start_time.isoformat(),
-                "end": updated_lesson.end_time.isoformat(),
-                "backgroundColor": updated_lesson.english_class.color,
-                "extendedProps": {
-                    "class_topic": updated_lesson.title,
-                    "description": updated_lesson.description,
-                    "meeting_link": updated_lesson.meeting_link,
-                    "location": updated_lesson.location,
-                    "teacher_id": updated_lesson.english_class.teacher.id,
-                    "teachers": list(teachers.values("id", "username")),
-                    "students": list(students.values("id", "username")),
-                    "materials": list(materials.values("id", "title")),
-                },
-            }
+            if moved or class_changed:
+                conflicts = serialize_conflicts(find_conflicts([lesson]))
+                if conflicts:
+                    transaction.set_rollback(True)
+                    return JsonResponse(
+                        {
+                            "status": "error",
+                            "message": " ".join(conflict["message"] for conflict in conflicts),
+                            "conflicts": conflicts,
+                        },
+                        status=409,
+                    )
+
+            lesson.save()
 
-            print("lesson :", updated_lesson_data)
+            changed = [field for field in EVENT_KEYS if getattr(lesson, field) != previous[field]]
+            ordinals = {}
+            if "sequence_number" in changed:
+                # Save shifted the lessons between the old and the new position by one
+                low, high = sorted((previous["sequence_number"], lesson.sequence_number))
+                ordinals = dict(
+                    Lesson.objects.filter(
+                        english_class_id=lesson.english_class_id,
+                        sequence_number__range=(low, high),
+                    )
+                    .exclude(pk=lesson.pk)
+                    .values_list("pk", "sequence_number")
+                )
+            materials = None
+            if materials_changed:
+                materials = lesson.materials.only(*MATERIAL_FIELDS).order_by("pk")
+            lookups = {}
+            if class_changed:
+                lookups = new_lookups()
+                add_to_lookups(lookups, prepare_lessons(Lesson.objects.all()).get(pk=lesson.pk))
 
             return JsonResponse(
                 {
                     "status": "success",
                     "message": "Lesson updated successfully.",
-                    "lesson": updated_lesson_data,
+                    "rejected_files": upload_rejections(request),
+                    "lesson": serialize_lesson_changes(lesson, changed, materials),
+                    "ordinals": ordinals,
+                    **lookups,
                 }
             )
     except Lesson.DoesNotExist:
@@ -376,7 +571,314 @@ def update_lesson(request):
         )
 
 
+def _update_lesson_fields(request, data):
+    """
+    Answer an update_lesson request that only moves a lesson or changes its own
+    fields through the batch path of update_lessons, with one change.
+
+    Args:
+        request: The HttpRequest object.
+        data: The lesson 'id' and any of 'start', 'end', 'description', 'location'
+        and 'meeting_link'.
+
+    Returns:
+        JsonResponse: The response of update_lesson.
+    """
+    report = _save_lesson_changes(request.user, [data])
+    [result] = report["results"]
+    if result["status"] == "error":
+        response = {"status": "error", "message": result["message"]}
+        if "conflicts" in result:
+            response["conflicts"] = result["conflicts"]
+        return JsonResponse(response, status=result["code"])
+
+    lesson = report["updated"][result["id"]]
+    ordinals = report["ordinals"]
+    changed = report["changed"][lesson.pk]
+    if lesson.pk in ordinals:
+        lesson.sequence_number = ordinals.pop(lesson.pk)
+        changed.add("sequence_number")
+    return JsonResponse(
+        {
+            "status": "success",
+            "message": "Lesson updated successfully.",
+            "rejected_files": [],
+            "lesson": serialize_lesson_changes(
+                lesson, [field for field in EVENT_KEYS if field in changed]
+            ),
+            "ordinals": ordinals,
+        }
+    )
+
+
+# Schedule fields whose change regenerates the upcoming lessons of a recurring schedule
+SCHEDULE_RULE_FIELDS = {
+    "start_date",
+    "end_date",
+    "recurrence",
+    "lesson_start",
+    "lesson_duration",
+    "excluded_dates",
+}
+
+# Most lesson changes accepted by one batch update request
+LESSON_BATCH_MAX_SIZE = 500
+
+# Lesson model fields a batch update may change
+LESSON_BATCH_MODEL_FIELDS = ("start_time", "end_time", "description", "location", "meeting_link")
+
+# Keys of an update_lesson request that can be saved the way batch updates are
+LESSON_CHANGE_KEYS = {"id", "start", "end", "description", "location", "meeting_link"}
+
+# Query budget of an update_lesson request saved the way batch updates are
+LESSON_CHANGE_QUERY_BUDGET = 12
+
+
+def _apply_lesson_change(lesson, change):
+    """
+    Apply one item of a batch update to a lesson, without saving it.
+
+    Args:
+        lesson: The Lesson to change.
+        change: The item, with any of 'start', 'end', 'description', 'location'
+        and 'meeting_link'.
+
+    Returns:
+        set: The names of the model fields that changed.
+
+    Raises:
+        ValueError: If a value is invalid.
+    """
+    changed = set()
+    for key, field in (("start", "start_time"), ("end", "end_time")):
+        if key in change:
+            value = parse_datetime(str(change[key]))
+            if value is None:
+                raise ValueError(f'"{change[key]}" is not a valid date and time.')
+            if timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            setattr(lesson, field, value.astimezone(timezone.get_default_timezone()))
+            changed.add(field)
+    if lesson.end_time <= lesson.start_time:
+        raise ValueError("A lesson must end after it starts.")
+    if "description" in change:
+        lesson.description = change["description"]
+        changed.add("description")
+    if "location" in change:
+        # Checked like update_lesson does: the calendar sends "online", not the "on-line" choice
+        if not isinstance(change["location"], str) or not 0 < len(change["location"]) <= 10:
+            raise ValueError(f'"{change["location"]}" is not a valid location.')
+        lesson.location = change["location"]
+        changed.add("location")
+        if lesson.location != "online":
+            # Onsite lessons have no meeting link
+            lesson.meeting_link = None
+            changed.add("meeting_link")
+    if "meeting_link" in change and lesson.location == "online":
+        lesson.meeting_link = change["meeting_link"]
+        changed.add("meeting_link")
+    return changed
+
+
+def _save_lesson_changes(user, changes):
+    """
+    Apply, check and save changes to lessons, the way calendar moves are saved:
+    the lessons are loaded with one query, moves are checked for double-bookings
+    together, the valid changes are written with one bulk_update and the classes
+    are renumbered once.
+
+    Args:
+        user: The user making the changes.
+        changes: Dictionaries with the lesson 'id' and any of 'start', 'end',
+        'description', 'location' and 'meeting_link'.
+
+    Returns:
+        dict: The 'results', one per change ('id', 'status' and, for errors,
+        'message', the HTTP status 'code' and any 'conflicts'), the 'updated'
+        lessons and the model fields that 'changed' in each, by id, and the new
+        sequence numbers of every renumbered lesson by id ('ordinals'), the
+        updated ones included.
+    """
+    lesson_ids = set()
+    for item in changes:
+        try:
+            lesson_ids.add(int(item.get("id")))
+        except (TypeError, ValueError):
+            pass
+    lessons = Lesson.objects.select_related("english_class").in_bulk(lesson_ids)
+
+    results = []
+    updated = {}
+    changed = {}
+    moved = []
+    for item in changes:
+        try:
+            lesson = lessons.get(int(item.get("id")))
+        except (TypeError, ValueError):
+            lesson = None
+        if lesson is None:
+            results.append({
+                "id": item.get("id"),
+                "status": "error",
+                "message": "Lesson not found.",
+                "code": 404,
+            })
+            continue
+        if not (user.is_superuser or user.pk == lesson.english_class.teacher_id):
+            results.append({
+                "id": lesson.pk,
+                "status": "error",
+                "message": "You do not have permission to update this lesson.",
+                "code": 403,
+            })
+            continue
+        original = {field: getattr(lesson, field) for field in LESSON_BATCH_MODEL_FIELDS}
+        try:
+            fields = _apply_lesson_change(lesson, item)
+        except ValueError as error:
+            for field, value in original.items():
+                setattr(lesson, field, value)
+            results.append(
+                {"id": lesson.pk, "status": "error", "message": str(error), "code": 400}
+            )
+            continue
+        changed[lesson.pk] = {
+            field for field in fields if getattr(lesson, field) != original[field]
+        }
+        if changed[lesson.pk] & {"start_time", "end_time"}:
+            moved.append(lesson)
+        updated[lesson.pk] = lesson
+        results.append({"id": lesson.pk, "status": "success"})
+
+    # All moved lessons are checked together, against each other as well
+    conflicts = {}
+    for conflict in serialize_conflicts(find_conflicts(moved)):
+        conflicts.setdefault(conflict["lesson_id"], []).append(conflict)
+    for result in results:
+        if result["status"] == "success" and result["id"] in conflicts:
+            updated.pop(result["id"], None)
+            result.update(
+                status="error",
+                message=" ".join(conflict["message"] for conflict in conflicts[result["id"]]),
+                code=409,
+                conflicts=conflicts[result["id"]],
+            )
+
+    ordinals = {}
+    if updated:
+        fields = set().union(*(changed[pk] for pk in updated))
+        now = timezone.now()
+        for lesson in updated.values():
+            lesson.updated_at = now
+        with transaction.atomic():
+            Lesson.objects.bulk_update(updated.values(), sorted(fields | {"updated_at"}))
+            if "start_time" in fields:
+                renumbered = renumber_lessons(
+                    {lesson.english_class_id for lesson in updated.values()}
+                )
+                ordinals = {lesson.pk: lesson.sequence_number for lesson in renumbered}
+        bump_schedule_version()
+    return {"results": results, "updated": updated, "changed": changed, "ordinals": ordinals}
+
+
+@login_required
+@require_POST
+@query_budget(21)
+def update_lessons(request):
+    """
+    Update many lessons at once, e.g. after several of them were dragged or resized
+    on the calendar.
+
+    The body is a JSON object with a 'lessons' list of changes, each with the
+    lesson 'id' and any of 'start', 'end', 'description', 'location' and
+    'meeting_link'. Permissions are checked for all lessons with a single query
+    and the valid changes are written with one bulk_update in a single
+    transaction; invalid ones are reported without stopping the others. So are
+    moves that would double-book a teacher or a student, with their 'conflicts'.
+
+    Args:
+        request: The HttpRequest object.
+
+    Returns:
+        JsonResponse: A 'results' entry per change ('id', 'status' and, for
+        errors, 'message' and 'code'), the updated lessons as 'events' with their lookup
+        tables and the new sequence numbers of the other lessons renumbered by
+        the moves ('ordinals'), or a 400 response if the body is not a list of
+        changes.
+    """
+    changes = _json_body(request).get("lessons")
+    if not isinstance(changes, list) or not all(isinstance(item, dict) for item in changes):
+        return JsonResponse(
+            {"status": "error", "message": "Expected a 'lessons' list of changes."}, status=400
+        )
+    if len(changes) > LESSON_BATCH_MAX_SIZE:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f"At most {LESSON_BATCH_MAX_SIZE} lessons can be updated at once.",
+            },
+            status=400,
+        )
+
+    report = _save_lesson_changes(request.user, changes)
+    results, updated = report["results"], report["updated"]
+    # The updated lessons are sent whole in the events
+    ordinals = {pk: number for pk, number in report["ordinals"].items() if pk not in updated}
+
+    failed = len(results) - len(updated)
+    return JsonResponse(
+        {
+            "status": "error" if failed and not updated else "success",
+            "message": f"{len(updated)} lesson(s) updated, {failed} failed.",
+            "results": results,
+            "ordinals": ordinals,
+            **serialize_schedule(Lesson.objects.filter(pk__in=list(updated))),
+        }
+    )
+
+
+# Conflicts listed one by one in messages; the rest are counted
+MAX_CONFLICT_MESSAGES = 5
+
+
+def _warn_conflicts(request, conflicts):
+    """
+    Add a warning message per double-booking, e.g. after lessons were generated
+    or moved in bulk.
+
+    Args:
+        request: The HttpRequest object.
+        conflicts: The result of serialize_conflicts().
+    """
+    for conflict in conflicts[:MAX_CONFLICT_MESSAGES]:
+        messages.warning(request, conflict["message"])
+    if len(conflicts) > MAX_CONFLICT_MESSAGES:
+        messages.warning(
+            request, f"{len(conflicts) - MAX_CONFLICT_MESSAGES} more double-bookings."
+        )
+
+
+def _reject_conflicts(form):
+    """
+    Add an error to a valid lesson form whose times double-book the teacher or a
+    student of the lesson's class.
+
+    Args:
+        form: A bound LessonForm whose instance has its class.
+
+    Returns:
+        bool: Whether the form was rejected.
+    """
+    if not {"start_time", "end_time"} & set(form.changed_data):
+        return False
+    conflicts = serialize_conflicts(find_conflicts([form.instance]))
+    for conflict in conflicts:
+        form.add_error(None, conflict["message"])
+    return bool(conflicts)
+
+
 @login_required
+@query_budget(21)
 def create_english_class(request):
     """
     Create a new English class along with its schedule.
@@ -405,6 +907,10 @@ def create_english_class(request):
             new_schedule = schedule_form.save(commit=False)
             new_schedule.english_class = new_class
             new_schedule.save()
+            if new_schedule.recurrence:
+                report = generate_lessons(new_schedule)
+                messages.success(request, f"{report['created']} lessons scheduled.")
+                _warn_conflicts(request, report["conflicts"])
             messages.success(request, "Class created successfully.")
             return redirect("english_class_list")
     else:
@@ -419,6 +925,7 @@ def create_english_class(request):
 
 
 @login_required
+@query_budget(26)
 def update_english_class(request, pk):
     """
     Update an existing English class and its schedule.
@@ -456,7 +963,21 @@ def update_english_class(request, pk):
 
         if class_form.is_valid() and schedule_form.is_valid():
             class_form.save()
-            schedule_form.save()
+            schedule = schedule_form.save()
+            changed = set(schedule_form.changed_data)
+            if schedule.recurrence and changed & SCHEDULE_RULE_FIELDS:
+                # Past lessons are history: only the upcoming part of the series changes
+                report = generate_lessons(
+                    schedule,
+                    from_date=timezone.localdate(),
+                    reschedule=bool(changed & {"lesson_start", "lesson_duration"}),
+                )
+                messages.success(
+                    request,
+                    f"{report['created']} lessons added, {report['updated']} moved and "
+                    f"{report['deleted']} removed.",
+                )
+                _warn_conflicts(request, report["conflicts"])
 
             messages.success(request, "Class updated successfully.")
 
@@ -487,7 +1008,40 @@ def update_english_class(request, pk):
     return render(request, "scheduling/update_english_class.html", context)
 
 
+def _visible_schedules(user):
+    """
+    Return the schedules a user may see in the class list.
+
+    Args:
+        user: The requesting user.
+
+    Returns:
+        QuerySet: The visible schedules, or None if the user has no role.
+    """
+    if user.is_superuser:
+        return Schedule.objects.all()
+    if user.is_teacher:
+        return Schedule.objects.filter(english_class__teacher=user)
+    if user.is_student:
+        return Schedule.objects.filter(english_class__students=user)
+    return None
+
+
+def _english_class_list_last_modified(request):
+    """Return the latest modification time of the classes listed for the user."""
+    schedules = _visible_schedules(request.user)
+    if schedules is None:
+        return None
+    latest = schedules.aggregate(
+        schedule=Max("updated_at"), english_class=Max("english_class__updated_at")
+    )
+    return max(filter(None, latest.values()), default=None)
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=schedule_etag, last_modified_func=_english_class_list_last_modified)
+@query_budget(8)
 def english_class_list(request):
     """
     Display a list of English classes.
@@ -500,16 +1054,11 @@ def english_class_list(request):
     Returns:
         HttpResponse object with rendered list of classes.
     """
-    if request.user.is_superuser or request.user.is_teacher or request.user.is_student:
-        if request.user.is_superuser:
-            schedules = Schedule.objects.all()
-        else:
-            if request.user.is_teacher:
-                schedules = Schedule.objects.filter(english_class__teacher=request.user)
-            else:
-                schedules = Schedule.objects.filter(
-                    english_class__students=request.user
-                )
+    schedules = _visible_schedules(request.user)
+    if schedules is not None:
+        schedules = schedules.select_related("english_class__teacher").prefetch_related(
+            "english_class__students"
+        )
         return render(
             request, "scheduling/english_class_list.html", {"schedules": schedules}
         )
@@ -519,6 +1068,7 @@ def english_class_list(request):
 
 
 @login_required
+@query_budget(15)
 def delete_english_class(request, pk):
     """
     Delete an English class and its associated schedule.
@@ -552,7 +1102,9 @@ def delete_english_class(request, pk):
     )
 
 
+@accepts_material_uploads
 @login_required
+@query_budget(20)
 def create_lesson(request, class_id):
     """
     Create a new lesson for a specific English class.
@@ -575,27 +1127,18 @@ def create_lesson(request, class_id):
 
     if request.method == "POST":
         form = LessonForm(request.POST)
-        if form.is_valid():
+        form.instance.english_class = english_class
+        if form.is_valid() and not _reject_conflicts(form):
             lesson = form.save(commit=False)
-            lesson.english_class = english_class
             # Automatically assign user as teacher if they are a teacher
             if request.user.is_teacher:
                 lesson.teacher = request.user
             lesson.save()
             new_materials_files = request.FILES.getlist("new_materials")
-            for file in new_materials_files:
-                if not Material.objects.filter(title=file.name).exists():
-                    material = Material.objects.create(
-                        title=file.name,
-                        content=file.read(),
-                    )
-                    lesson.materials.add(material)
-                else:
-                    messages.error(
-                        request,
-                        f'A material with the name "{file.name}" already exists.',
-                    )
-                lesson.save()
+            if new_materials_files:
+                lesson.materials.add(*Material.objects.for_uploads(new_materials_files))
+            for rejection in upload_rejections(request):
+                messages.error(request, rejection)
             return redirect("update_lesson_view", pk=lesson.id)
         else:
             print(form.errors)
@@ -619,7 +1162,37 @@ def create_lesson(request, class_id):
     )
 
 
+def _apply_to_following(lesson):
+    """
+    Edit this and the following lessons of a series: the lesson's time of day,
+    duration, title, description and location become the rule of the rest of
+    the series, which is regenerated from the lesson's occurrence on.
+
+    Args:
+        lesson: A saved lesson generated from its schedule's recurrence rule.
+
+    Returns:
+        dict: The report of generate_lessons().
+    """
+    schedule = lesson.schedule
+    schedule.lesson_start = timezone.localtime(lesson.start_time).time()
+    schedule.lesson_duration = lesson.end_time - lesson.start_time
+    schedule.save(update_fields=["lesson_start", "lesson_duration", "updated_at"])
+    return generate_lessons(schedule, from_date=lesson.recurrence_date, template=lesson)
+
+
+def _lessons_list_last_modified(request, class_id):
+    """Return the latest modification time of a class and its lessons."""
+    latest = EnglishClass.objects.filter(pk=class_id).aggregate(
+        english_class=Max("updated_at"), lesson=Max("lessons__updated_at")
+    )
+    return max(filter(None, latest.values()), default=None)
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=schedule_etag, last_modified_func=_lessons_list_last_modified)
+@query_budget(8)
 def lessons_list(request, class_id):
     """
     Display a list of lessons for a specific English class.
@@ -634,8 +1207,8 @@ def lessons_list(request, class_id):
     # First, get the class to make sure it exists
     english_class = get_object_or_404(EnglishClass, pk=class_id)
     # Then, filter the lessons that are only related to this class
-    lessons = Lesson.objects.filter(english_class=english_class).prefetch_related(
-        "english_class__teacher", "english_class__students"
+    lessons = Lesson.objects.filter(english_class=english_class).select_related(
+        "english_class__teacher"
     )
     return render(
         request,
@@ -648,7 +1221,76 @@ def lessons_list(request, class_id):
     )
 
 
+# Largest shift of a lesson series, in days
+MAX_SHIFT_DAYS = 366
+
+
 @login_required
+@require_POST
+@query_budget(16)
+def shift_lesson_series(request, pk):
+    """
+    Move a lesson and all later lessons of its class by the same time, e.g. when
+    a class is delayed by a week.
+
+    The shift is read from 'days', 'hours' and 'minutes' (negative to move the
+    lessons earlier), in a JSON body or a form. JSON requests get the moved
+    lessons back as partial events ('start', 'end' and 'sequence_number') for
+    the calendar to patch; form posts are redirected to the lesson list. The
+    lessons are moved even when they double-book someone, who is warned about
+    in 'conflicts' (or messages).
+
+    Args:
+        request: The HttpRequest object.
+        pk: Primary key of the first lesson to move.
+
+    Returns:
+        JsonResponse with the moved lessons, or a redirect to the lesson list.
+    """
+    lesson = get_object_or_404(Lesson.objects.select_related("english_class"), pk=pk)
+    wants_json = request.content_type == "application/json"
+    data = _json_body(request) if wants_json else request.POST
+
+    def fail(message, status):
+        if wants_json:
+            return JsonResponse({"status": "error", "message": message}, status=status)
+        messages.error(request, message)
+        return redirect("lessons_list", class_id=lesson.english_class_id)
+
+    if not (request.user.is_superuser or request.user.pk == lesson.english_class.teacher_id):
+        return fail("You do not have permission to move these lessons.", 403)
+    try:
+        delta = datetime.timedelta(
+            days=int(data.get("days") or 0),
+            hours=int(data.get("hours") or 0),
+            minutes=int(data.get("minutes") or 0),
+        )
+    except (TypeError, ValueError):
+        return fail("The shift must be a whole number of days, hours or minutes.", 400)
+    if not delta or abs(delta) > datetime.timedelta(days=MAX_SHIFT_DAYS):
+        return fail(f"The shift must be non-zero and at most {MAX_SHIFT_DAYS} days.", 400)
+
+    moved = shift_lessons(lesson, delta)
+    bump_schedule_version()
+    conflicts = serialize_conflicts(find_conflicts(moved))
+    message = f"{len(moved)} lesson(s) moved."
+    if not wants_json:
+        messages.success(request, message)
+        _warn_conflicts(request, conflicts)
+        return redirect("lessons_list", class_id=lesson.english_class_id)
+    return JsonResponse({
+        "status": "success",
+        "message": message,
+        "conflicts": conflicts,
+        "events": [
+            serialize_lesson_changes(moved_lesson, ["start_time", "end_time", "sequence_number"])
+            for moved_lesson in moved
+        ],
+    })
+
+
+@login_required
+@query_budget(15)
 def delete_lesson(request, pk):
     """
     Delete a specific lesson.
@@ -677,7 +1319,9 @@ def delete_lesson(request, pk):
     return render(request, "scheduling/lesson_confirm_delete.html", {"lesson": lesson})
 
 
+@accepts_material_uploads
 @login_required
+@query_budget(35)
 def update_lesson_view(request, pk):
     """
     Update view for a specific lesson.
@@ -706,10 +1350,13 @@ def update_lesson_view(request, pk):
     else:
         if request.method == "POST":
             form = LessonForm(request.POST, request.FILES, instance=lesson)
-            if form.is_valid():
+            if form.is_valid() and not _reject_conflicts(form):
                 updated_lesson = form.save()
                 form.save_m2m()
 
+                if form.cleaned_data.get("apply_to_following"):
+                    _warn_conflicts(request, _apply_to_following(updated_lesson)["conflicts"])
+
                 if "students" in request.POST:
                     updated_lesson.english_class.students.set(
                         request.POST.getlist("students")
@@ -721,18 +1368,12 @@ def update_lesson_view(request, pk):
                     )
 
                 new_materials_files = request.FILES.getlist("new_materials")
-                for file in new_materials_files:
-                    if not Material.objects.filter(title=file.name).exists():
-                        material = Material.objects.create(
-                            title=file.name,
-                            content=file.read(),
-                        )
-                        updated_lesson.materials.add(material)
-                    else:
-                        messages.error(
-                            request,
-                            f'A material with the name "{file.name}" already exists.',
-                        )
+                if new_materials_files:
+                    updated_lesson.materials.add(
+                        *Material.objects.for_uploads(new_materials_files)
+                    )
+                for rejection in upload_rejections(request):
+                    messages.error(request, rejection)
 
                 if not messages.get_messages(request):
                     messages.success(request, "Lesson updated successfully!")
@@ -756,3 +1397,280 @@ def update_lesson_view(request, pk):
         "scheduling/lesson_form.html",
         {"form": form, "lesson": lesson, "is_student": is_student},
     )
+
+
+@login_required
+@require_http_methods(["GET", "HEAD"])
+@query_budget(6)
+def download_material(request, pk):
+    """
+    Download a lesson material, or its thumbnail with the 'preview' query parameter.
+
+    The file is streamed in chunks (or handed to the front-end server, see
+    scheduling/downloads.py), with support for byte ranges and conditional requests.
+    Materials are available to superusers and to the teachers and students of the
+    classes whose lessons use them.
+
+    Args:
+        request: The HttpRequest object.
+        pk: The primary key of the Material to download.
+
+    Returns:
+        The file response, or an error message if access is denied.
+    """
+    material = get_object_or_404(Material, pk=pk)
+    if not (material.file or material.content):
+        raise Http404("This material has no file.")
+
+    if not (
+        request.user.is_superuser
+        or Lesson.objects.filter(materials=material)
+        .filter(
+            Q(english_class__teacher=request.user)
+            | Q(english_class__students=request.user)
+        )
+        .exists()
+    ):
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": "You do not have permission to download this material.",
+            },
+            status=403,
+        )
+
+    if request.GET.get("preview"):
+        if not material.preview:
+            raise Http404("This material has no preview.")
+        return preview_response(material)
+    return material_response(request, material)
+
+
+def _json_body(request):
+    """
+    Decode the JSON body of a request.
+
+    Returns:
+        dict: The decoded object, or an empty dictionary if the body is empty or invalid.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@login_required
+@require_POST
+@query_budget(5)
+def start_material_upload(request):
+    """
+    Start a resumable, chunked upload of a material file.
+
+    The JSON body gives the 'file_name' and 'size' of the file and, optionally,
+    the 'chunk_size' it will be sent in.
+
+    Args:
+        request: The HttpRequest object.
+
+    Returns:
+        JsonResponse with the upload's progress (see scheduling/uploads.py), including
+        its id, or an error message.
+    """
+    if not (request.user.is_superuser or request.user.is_teacher):
+        return JsonResponse(
+            {"status": "error", "message": "Only teachers can upload materials."},
+            status=403,
+        )
+    data = _json_body(request)
+    try:
+        session = start_upload(
+            request.user,
+            data.get("file_name", ""),
+            int(data.get("size", 0)),
+            int(data.get("chunk_size") or 0),
+        )
+    except (TypeError, ValueError) as error:
+        return JsonResponse({"status": "error", "message": str(error)}, status=400)
+    return JsonResponse(
+        {"status": "success", "upload": upload_progress(session)}, status=201
+    )
+
+
+@login_required
+@require_GET
+@query_budget(4)
+def material_upload_progress(request, upload_id):
+    """
+    Report the progress of a chunked upload: bytes received and missing chunks.
+
+    Args:
+        request: The HttpRequest object.
+        upload_id: The id of the UploadSession, owned by the user.
+
+    Returns:
+        JsonResponse with the upload's progress.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id, owner=request.user)
+    return JsonResponse({"status": "success", "upload": upload_progress(session)})
+
+
+@login_required
+@require_http_methods(["PUT"])
+@query_budget(10)
+def upload_material_chunk(request, upload_id, index):
+    """
+    Receive one chunk of a chunked upload; the request body is the raw chunk.
+    Sending a chunk again replaces it, so failed chunks can simply be retried.
+
+    Args:
+        request: The HttpRequest object.
+        upload_id: The id of the UploadSession, owned by the user.
+        index: The position of the chunk, from 0.
+
+    Returns:
+        JsonResponse acknowledging the chunk, or an error message.
+    """
+    session = get_object_or_404(UploadSession, pk=upload_id, owner=request.user)
+    try:
+        store_chunk(session, index, request)
+    except ValueError as error:
+        return JsonResponse({"status": "error", "message": str(error)}, status=400)
+    return JsonResponse({"status": "success", "index": index})
+
+
+@login_required
+@require_POST
+@query_budget(25)
+def complete_material_upload(request, upload_id):
+    """
+    Assemble a fully received chunked upload into a Material, and attach it to
+    the lessons listed in the optional 'lessons' array of the JSON body.
+
+    Args:
+        request: The HttpRequest object.
+        upload_id: The id of the UploadSession, owned by the user.
+
+    Returns:
+        JsonResponse with the material's id and title, or an error message.
+    """
+    session = get_object_or_404(
+        UploadSession.objects.select_related("material"), pk=upload_id, owner=request.user
+    )
+    try:
+        lesson_ids = {int(pk) for pk in _json_body(request).get("lessons") or []}
+    except (TypeError, ValueError):
+        return JsonResponse(
+            {"status": "error", "message": "'lessons' must be a list of lesson ids."},
+            status=400,
+        )
+    lessons = Lesson.objects.filter(pk__in=lesson_ids)
+    if not request.user.is_superuser:
+        lessons = lessons.filter(english_class__teacher=request.user)
+    lessons = list(lessons)
+    if len(lessons) != len(lesson_ids):
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": "You do not have permission to update one or more lessons.",
+            },
+            status=403,
+        )
+
+    try:
+        material = complete_upload(session)
+    except ValueError as error:
+        return JsonResponse({"status": "error", "message": str(error)}, status=400)
+    material.lessons.add(*lessons)
+    return JsonResponse(
+        {
+            "status": "success",
+            "material": {"id": material.id, "title": material.title},
+            "lessons": [lesson.id for lesson in lessons],
+        }
+    )
+
+
+def _materials_bundle(request, english_class, lessons, file_name):
+    """
+    Stream a ZIP archive of the materials used by some lessons of a class.
+
+    Args:
+        request: The HttpRequest object.
+        english_class: The EnglishClass the lessons belong to.
+        lessons: A queryset of the class's lessons.
+        file_name: The name offered for the archive, without extension.
+
+    Returns:
+        The streamed archive, or an error message if the user is neither the
+        class's teacher, one of its students nor a superuser.
+    """
+    if not (
+        request.user.is_superuser
+        or request.user.pk == english_class.teacher_id
+        or english_class.students.filter(pk=request.user.pk).exists()
+    ):
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": "You do not have permission to download these materials.",
+            },
+            status=403,
+        )
+    materials = (
+        Material.objects.filter(lessons__in=lessons)
+        .distinct()
+        .order_by("title", "pk")
+        .iterator()
+    )
+    return zip_response(materials, f"{file_name} materials.zip")
+
+
+@login_required
+@require_GET
+@query_budget(5)
+def class_materials_zip(request, class_id):
+    """
+    Download every material used by the lessons of an English class as one ZIP
+    archive, streamed as it is built.
+
+    Args:
+        request: The HttpRequest object.
+        class_id: The primary key of the EnglishClass.
+
+    Returns:
+        The streamed archive, or an error message if access is denied.
+    """
+    english_class = get_object_or_404(EnglishClass, pk=class_id)
+    return _materials_bundle(
+        request, english_class, english_class.lessons.all(), english_class.title
+    )
+
+
+@login_required
+@require_GET
+@query_budget(5)
+def schedule_materials_zip(request, schedule_id):
+    """
+    Download every material used by the lessons of a schedule term (the class's
+    lessons between the term's start and end dates) as one streamed ZIP archive.
+
+    Args:
+        request: The HttpRequest object.
+        schedule_id: The primary key of the Schedule.
+
+    Returns:
+        The streamed archive, or an error message if access is denied.
+    """
+    schedule = get_object_or_404(
+        Schedule.objects.select_related("english_class"), pk=schedule_id
+    )
+    lessons = schedule.english_class.lessons.filter(
+        start_time__date__gte=schedule.start_date, start_time__date__lte=schedule.end_date
+    )
+    return _materials_bundle(
+        request,
+        schedule.english_class,
+        lessons,
+        f"{schedule.english_class.title} {schedule.term}",
+    )
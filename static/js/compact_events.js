@@ -0,0 +1,56 @@
+// static/js/compact_events.js
+
+// Expands the columnar ("compact") schedule payload produced with
+// format=compact back into the regular payload shape:
+// {events: [...], teachers: {...}, students: {...}, classes: {...}}.
+// Times arrive as epoch seconds (the end as a duration in seconds), and the
+// class and location columns hold indexes into payload.dictionaries. Lessons
+// list their materials by id; payload.materials holds the other fields of each.
+function decodeCompactEvents(payload) {
+    var columns = payload.columns;
+    var dictionaries = payload.dictionaries;
+    var events = [];
+
+    for (var i = 0; i < columns.id.length; i++) {
+        var start = columns.start[i];
+        events.push({
+            id: columns.id[i],
+            start: new Date(start * 1000).toISOString(),
+            end: new Date((start + columns.duration[i]) * 1000).toISOString(),
+            extendedProps: {
+                class_id: dictionaries.class[columns.class[i]],
+                sequence_number: columns.sequence[i],
+                class_topic: columns.topic[i],
+                description: columns.description[i],
+                meeting_link: columns.meeting_link[i],
+                location: dictionaries.location[columns.location[i]],
+                materials: columns.materials[i].map(function(materialId) {
+                    var material = {id: materialId};
+                    var details = payload.materials[materialId];
+                    for (var key in details) {
+                        material[key] = details[key];
+                    }
+                    return material;
+                })
+            }
+        });
+    }
+
+    return {
+        events: events,
+        teachers: payload.teachers,
+        students: payload.students,
+        classes: payload.classes
+    };
+}
+
+
+// Whether the browser reports a slow or data-saving connection, in which case
+// the calendar asks for the compact payload.
+function prefersCompactEvents() {
+    var connection = navigator.connection;
+    if (!connection) {
+        return false;
+    }
+    return Boolean(connection.saveData) || ['slow-2g', '2g', '3g'].indexOf(connection.effectiveType) !== -1;
+}
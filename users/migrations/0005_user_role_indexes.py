@@ -0,0 +1,21 @@
+# Generated by Django 4.2.9 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_enrollment_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_teacher', True)), fields=['username'], name='user_teacher_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_student', True)), fields=['username'], name='user_student_idx'),
+        ),
+    ]
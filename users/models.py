@@ -27,6 +27,15 @@ class User(AbstractUser):
     class Meta:
         app_label = 'users'
         verbose_name = "General User"
+        indexes = [
+            # Teacher and student rosters only ever read the users with the flag set
+            models.Index(
+                fields=["username"], condition=models.Q(is_teacher=True), name="user_teacher_idx"
+            ),
+            models.Index(
+                fields=["username"], condition=models.Q(is_student=True), name="user_student_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.username